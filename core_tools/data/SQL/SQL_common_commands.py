@@ -1,7 +1,10 @@
-from psycopg2.extras import RealDictCursor
+import weakref
+
+from psycopg2.extras import RealDictCursor, execute_values
 from psycopg2 import sql
 
-from core_tools.data.SQL.SQL_utility import sql_name_formatter, sql_value_formatter, name_value_formatter
+from core_tools.data.SQL.SQL_utility import (
+        sql_name_formatter, sql_value_formatter, sql_literal_formatter, name_value_formatter)
 
 def execute_statement(conn, statement, placeholders = []):
     try:
@@ -34,6 +37,52 @@ def execute_query(conn, query, dict_cursor=False, placeholders = []):
         raise
 
 
+# names of the statements that have been prepared per connection.
+# Prepared statements exist until the connection is closed. They are not removed by a rollback.
+_prepared_statements = weakref.WeakKeyDictionary()
+
+
+def execute_prepared(conn, name, arg_types, statement, args, fetch=True, dict_cursor=False):
+    '''
+    execute a recurring statement as prepared statement.
+    The statement is prepared once per connection. Subsequent calls only send
+    the name and the arguments of the statement, which saves parsing and planning of the statement.
+
+    Args:
+        conn (psycopg2.connect) : connection object from psycopg2 librabry
+        name (str) : unique name of the statement
+        arg_types (tuple<str>) : SQL types of the arguments $1, $2, ...
+        statement (str) : statement with arguments $1, $2, ...
+        args (tuple) : values of the arguments
+        fetch (bool) : return the result of the query
+        dict_cursor (bool) : return result as a dict
+    '''
+    try:
+        prepared = _prepared_statements.setdefault(conn, set())
+        if dict_cursor == False:
+            cursor = conn.cursor()
+        else:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+        if name not in prepared:
+            types = f"({', '.join(arg_types)})" if len(arg_types) > 0 else ""
+            cursor.execute(f"PREPARE {name} {types} AS {statement}")
+            prepared.add(name)
+
+        if len(args) > 0:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s']*len(args))})", args)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+        return_values = cursor.fetchall() if fetch else ((), )
+        cursor.close()
+        return return_values
+    except:
+        # After exception the connection cannot be used anymore.
+        # A new connection will automatically be opened for the next command.
+        conn.close()
+        raise
+
+
 def select_elements_in_table(conn, table_name, var_names, where=None, order_by = None, limit=None, dict_cursor=True):
     '''
     execute a query on a table
@@ -88,6 +137,94 @@ def insert_row_in_table(conn, table_name, var_names, var_values, returning=None,
         return execute_query(conn, statement + sql.SQL(custom_statement), placeholders=placeholders)
 
 
+def insert_rows_statement(table_name, var_names, rows, returning=None, custom_statement=''):
+    '''
+    generate a statement to insert multiple rows in a table with a single INSERT.
+    The values are inlined in the statement, such that it can be combined with other statements.
+
+    Args:
+        table_name (str) : name of the table to update
+        var_names (tuple<str>) : variable names of the table
+        rows (list<tuple<any>>) : values of the rows corresponding to the variable names
+        returning (tuple<str>) : name of a variables you want returned
+        custom_statement (str) : statement appended to the insert (e.g. 'ON CONFLICT DO NOTHING')
+
+    Returns:
+        sql.Composed : insert statement without terminating semicolon
+    '''
+    var_names_SQL = sql_name_formatter(var_names)
+    rows_SQL = [sql.SQL("({})").format(sql.SQL(', ').join(sql_literal_formatter(row)))
+                for row in rows]
+
+    statement = sql.SQL("INSERT INTO {} ({}) VALUES {} ").format(sql.SQL(table_name),
+            sql.SQL(', ').join(var_names_SQL),
+            sql.SQL(', ').join(rows_SQL))
+    statement += sql.SQL(custom_statement)
+    if returning is not None:
+        statement += sql.SQL(" RETURNING {} ").format(sql.SQL(", ").join([sql.Identifier(i) for i in returning]))
+    return statement
+
+
+def upsert_rows(conn, table_name, var_names, rows, key):
+    '''
+    insert multiple rows in a table with a single statement. Existing rows with the same key are updated.
+
+    Args:
+        conn (psycopg2.connect) : connection object from psycopg2 librabry
+        table_name (str) : name of the table to update
+        var_names (list<str>) : variable names of the table
+        rows (list<list<any>>) : values of the rows corresponding to the variable names
+        key (str) : name of the unique column that identifies the row
+    '''
+    statement = sql.SQL("INSERT INTO {} ({}) VALUES %s ON CONFLICT ({}) DO UPDATE SET {}").format(
+            sql.SQL(table_name),
+            sql.SQL(', ').join(sql.Identifier(name) for name in var_names),
+            sql.Identifier(key),
+            sql.SQL(', ').join(sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(name))
+                               for name in var_names if name != key))
+    try:
+        cursor = conn.cursor()
+        execute_values(cursor, statement, rows, page_size=max(1, len(rows)))
+        cursor.close()
+    except:
+        # After exception the connection cannot be used anymore.
+        # A new connection will automatically be opened for the next command.
+        conn.close()
+        raise
+
+
+def update_rows(conn, table_name, var_names, rows, key):
+    '''
+    update columns of multiple existing rows in a table with a single statement.
+
+    Args:
+        conn (psycopg2.connect) : connection object from psycopg2 librabry
+        table_name (str) : name of the table to update
+        var_names (list<str>) : variable names of the table including the key
+        rows (list<list<any>>) : values of the rows corresponding to the variable names
+        key (str) : name of the unique column that identifies the row
+
+    Returns:
+        list<any> : keys of the rows that were updated
+    '''
+    statement = sql.SQL("UPDATE {0} SET {1} FROM (VALUES %s) AS v ({2}) WHERE {0}.{3} = v.{3} RETURNING {0}.{3}").format(
+            sql.SQL(table_name),
+            sql.SQL(', ').join(sql.SQL("{0} = v.{0}").format(sql.Identifier(name))
+                               for name in var_names if name != key),
+            sql.SQL(', ').join(sql.Identifier(name) for name in var_names),
+            sql.Identifier(key))
+    try:
+        cursor = conn.cursor()
+        res = execute_values(cursor, statement, rows, page_size=max(1, len(rows)), fetch=True)
+        cursor.close()
+        return [row[0] for row in res]
+    except:
+        # After exception the connection cannot be used anymore.
+        # A new connection will automatically be opened for the next command.
+        conn.close()
+        raise
+
+
 def update_table(conn, table_name, var_names, var_values, condition=None):
     '''
     generate statement for updating an existing stable
@@ -126,4 +263,25 @@ def alter_table(conn, table_name, colums, dtypes):
     statement = sql.SQL("ALTER TABLE {} ADD COLUMN ").format(sql.SQL(table_name))
     statement += sql.SQL(" , ADD COLUMN ").join(sql.SQL(" {0} {1} ").format(sql.Identifier(i), sql.SQL(j)) for i, j in zip(colums, dtypes))
 
-    return execute_statement(conn, statement)
\ No newline at end of file
+    return execute_statement(conn, statement)
+
+def add_missing_columns(conn, table_name, columns):
+    '''
+    add columns to a table if they do not exist yet.
+
+    Note:
+        ALTER TABLE ... ADD COLUMN IF NOT EXISTS is not used, because it locks
+        the table even when the columns already exist.
+
+    Args:
+        conn (psycopg2.connect) : connection object from psycopg2 librabry
+        table_name (str) : name of the table to update
+        columns (dict<str, str>) : names and types of the columns
+    '''
+    res = execute_query(conn,
+        sql.SQL("SELECT column_name FROM information_schema.columns WHERE table_name = {};").format(
+            sql.Literal(table_name)))
+    existing = {row[0] for row in res}
+    missing = [name for name in columns if name not in existing]
+    if missing:
+        alter_table(conn, table_name, missing, [columns[name] for name in missing])
\ No newline at end of file
@@ -2,9 +2,13 @@ from core_tools.data.SQL.connect import SQL_conn_info_local, SQL_conn_info_remot
 from core_tools.data.SQL.queries.dataset_creation_queries import (
         sample_info_queries,
         measurement_overview_queries,
-        measurement_parameters_queries)
+        measurement_parameters_queries,
+        snapshot_store_queries,
+        measurement_chunks_queries)
 from core_tools.data.SQL.queries.dataset_sync_queries import sync_mgr_queries
+from core_tools.data.SQL.lobject_transfer import transfer_progress
 import psycopg2
+import threading
 import time
 import logging
 
@@ -48,26 +52,91 @@ class SQL_database_init:
         return False
 
 
+class connection_pool:
+    '''
+    Connections to a database per role.
+
+    Roles:
+        writer: writes the data of measurements.
+        reader: loads datasets and queries for the data browser. Every thread gets its own connection.
+            The connection is in autocommit mode.
+        metadata: variables, virtual gate matrices, AWG to DAC ratios and sample info.
+
+    An error on a connection closes only that connection. It is reopened when it is requested again.
+    '''
+    roles = ['writer', 'reader', 'metadata']
+
+    def __init__(self, conn_info):
+        '''
+        Args:
+            conn_info (type) : SQL_conn_info_local or SQL_conn_info_remote
+        '''
+        self.conn_info = conn_info
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        info = self.conn_info
+        return psycopg2.connect(dbname=info.dbname, user=info.user,
+                                password=info.passwd, host=info.host, port=info.port)
+
+    def get(self, role):
+        '''
+        Returns the connection for the role.
+        '''
+        if role not in connection_pool.roles:
+            raise ValueError(f"Unknown connection role '{role}'")
+        key = (role, threading.get_ident()) if role == 'reader' else (role, None)
+        with self._lock:
+            conn = self._connections.get(key)
+            if conn is not None and not conn.closed:
+                return conn
+            if conn is not None:
+                logger.warning(f'Closed {role} connection. Retry connection.')
+            elif role == 'reader':
+                self._close_unused_readers()
+            try:
+                conn = self._connect()
+            except Exception:
+                logger.error('Failed to connect to database', exc_info=True)
+                raise
+            if role == 'reader':
+                # reads do not keep a transaction open. An idle transaction holds locks
+                # on the tables and blocks vacuum.
+                conn.autocommit = True
+            self._connections[key] = conn
+            return conn
+
+    def _close_unused_readers(self):
+        # close reader connections of threads that have stopped.
+        thread_ids = {thread.ident for thread in threading.enumerate()}
+        for key in list(self._connections):
+            role, thread_id = key
+            if thread_id is not None and thread_id not in thread_ids:
+                self._connections.pop(key).close()
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections = {}
+
+
 class SQL_database_manager(SQL_database_init):
+    '''
+    Manages the connections to the local and remote database.
+    conn_local and conn_remote are the connections with role 'writer'.
+    Use get_connection() to get a connection for another role.
+    '''
     __instance = None
 
     def __new__(cls):
-        if SQL_database_manager.__instance is not None:
-            db_mgr = SQL_database_manager.__instance
-            # check connections not closed
-            if (db_mgr.conn_local is None or db_mgr.conn_local.closed
-                or db_mgr.conn_remote is None or db_mgr.conn_remote.closed):
-                db_mgr._disconnect()
-                SQL_database_manager.__instance = None
-                logger.warning('Closed connections. Retry connection.')
-
         if SQL_database_manager.__instance is None:
             SQL_database_manager.__instance = object.__new__(cls)
             db_mgr = SQL_database_manager.__instance
             try:
-                SQL_database_init._connect(db_mgr)
+                db_mgr._connect()
             except Exception:
-                logger.error('Failed to connect to database', exc_info=True)
                 # could not connect, for example wrong password, reset class instance
                 SQL_database_manager.__instance = None
                 raise
@@ -79,13 +148,50 @@ class SQL_database_manager(SQL_database_init):
 
                 measurement_overview_queries.generate_table(conn_local)
                 measurement_parameters_queries.generate_table(conn_local)
+                snapshot_store_queries.generate_table(conn_local)
+                measurement_chunks_queries.generate_table(conn_local)
                 conn_local.commit()
         return SQL_database_manager.__instance
 
+    def _connect(self):
+        self.SQL_conn_info_local = SQL_conn_info_local
+        self.SQL_conn_info_remote = SQL_conn_info_remote
+        self.sample_info = sample_info
+        self._pool_local = connection_pool(SQL_conn_info_local)
+        self._pool_remote = connection_pool(SQL_conn_info_remote)
+        # open the writer connections to check the configuration
+        self.conn_local
+        self.conn_remote
+
+    def _disconnect(self):
+        self._pool_local.close()
+        self._pool_remote.close()
+
+    @property
+    def conn_local(self):
+        return self._pool_local.get('writer')
+
+    @property
+    def conn_remote(self):
+        return self._pool_remote.get('writer')
+
+    def get_connection(self, role, remote=False):
+        '''
+        Returns the connection for the role.
+
+        Args:
+            role (str) : 'writer', 'reader' or 'metadata'
+            remote (bool) : if True return connection to remote database.
+        '''
+        pool = self._pool_remote if remote else self._pool_local
+        return pool.get(role)
+
 
 class SQL_sync_manager(SQL_database_init):
     __instance = None
     do_sync = True
+    # progress of the copy of the raw data in the current or last sync
+    progress = None
 
     def __new__(cls):
         if SQL_sync_manager.__instance is None:
@@ -99,10 +205,14 @@ class SQL_sync_manager(SQL_database_init):
             sample_info_queries.generate_table(SQL_sync_manager.__instance.conn_local)
             measurement_overview_queries.generate_table(SQL_sync_manager.__instance.conn_local)
             measurement_parameters_queries.generate_table(SQL_sync_manager.__instance.conn_local)
+            snapshot_store_queries.generate_table(SQL_sync_manager.__instance.conn_local)
+            measurement_chunks_queries.generate_table(SQL_sync_manager.__instance.conn_local)
 
             sample_info_queries.generate_table(SQL_sync_manager.__instance.conn_remote)
             measurement_overview_queries.generate_table(SQL_sync_manager.__instance.conn_remote)
             measurement_parameters_queries.generate_table(SQL_sync_manager.__instance.conn_remote)
+            snapshot_store_queries.generate_table(SQL_sync_manager.__instance.conn_remote)
+            measurement_chunks_queries.generate_table(SQL_sync_manager.__instance.conn_remote)
             SQL_sync_manager.__instance.conn_local.commit()
             SQL_sync_manager.__instance.conn_remote.commit()
 
@@ -119,30 +229,88 @@ class SQL_sync_manager(SQL_database_init):
             sample_info_queries.add_sample(conn, project, set_up, sample)
         conn.commit()
 
-    def run(self):
+    def run(self, poll_interval=60.0):
+        '''
+        Synchronizes the measurements to the remote database.
+        The sync manager waits for notifications of changes in the local database.
+        The local database is polled every poll_interval seconds in case a notification is missed.
+        Without notifications, e.g. when the triggers cannot be created, the database is polled every 2 seconds.
+
+        Args:
+            poll_interval (float) : maximum time between checks of the local database.
+        '''
+        listener = self._listen()
+        use_notify = listener is not None
         while self.do_sync == True:
-            sample_info_list = sync_mgr_queries.get_sample_info_list(self.conn_remote)
-            uuid_update_list = sync_mgr_queries.get_sync_items_raw_data(self)
+            self.sync()
+            if not use_notify:
+                time.sleep(2)
+                continue
+            if listener is None:
+                # reconnect after connection loss. Poll at the normal interval if it fails.
+                listener = self._listen()
+                if listener is None:
+                    time.sleep(2)
+                    continue
+            try:
+                sync_mgr_queries.wait_for_notification(listener, poll_interval)
+            except psycopg2.Error as ex:
+                logger.warning(f'Lost connection for sync notifications ({ex})')
+                listener.close()
+                listener = None
 
+    def sync(self):
+        '''
+        Synchronizes all measurements that changed to the remote database.
+        '''
+        sample_info_list = sync_mgr_queries.get_sample_info_list(self.conn_remote)
+        uuid_update_list = sync_mgr_queries.get_sync_items_raw_data(self)
 
-            for i in range(len(uuid_update_list)):
-                uuid = uuid_update_list[i]
-                self.log(f'updating raw data {i} of {len(uuid_update_list)}')
-                sync_mgr_queries.sync_raw_data(self, uuid)
+        if len(uuid_update_list) > 0:
+            self.progress = transfer_progress(
+                    sync_mgr_queries.get_pending_data_size(self, uuid_update_list),
+                    callback=lambda progress: self.log(f'raw data: {progress}'))
+        # the data of multiple measurements is copied concurrently.
+        batch_size = 20
+        for i in range(0, len(uuid_update_list), batch_size):
+            self.log(f'updating raw data {i} of {len(uuid_update_list)}: {self.progress}')
+            sync_mgr_queries.sync_raw_data_many(self, uuid_update_list[i:i+batch_size],
+                                                progress=self.progress)
 
-            if len(uuid_update_list) == 0:
-                self.log(f'no raw data to update')
+        if len(uuid_update_list) == 0:
+            self.log(f'no raw data to update')
 
-            uuid_update_list = sync_mgr_queries.get_sync_items_meas_table(self)
+        uuid_update_list = sync_mgr_queries.get_sync_items_meas_table(self)
 
-            for i in range(0,len(uuid_update_list)):
-                uuid = uuid_update_list[i]
-                self.log(f'updating table entry {i} of {len(uuid_update_list)}')
-                sync_mgr_queries.sync_table(self, uuid, sample_info_list=sample_info_list)
-            if len(uuid_update_list) == 0:
-                self.log(f'no entries to update')
+        batch_size = 100
+        for i in range(0, len(uuid_update_list), batch_size):
+            self.log(f'updating table entry {i} of {len(uuid_update_list)}')
+            sync_mgr_queries.sync_tables(self, uuid_update_list[i:i+batch_size],
+                                         sample_info_list=sample_info_list)
+        if len(uuid_update_list) == 0:
+            self.log(f'no entries to update')
 
-            time.sleep(2)
+    def _listen(self):
+        '''
+        Returns a connection that listens to the notifications of changes in the local database,
+        or None if notifications are not available.
+        '''
+        info = self.SQL_conn_info_local
+        try:
+            conn = psycopg2.connect(dbname=info.dbname, user=info.user,
+                                    password=info.passwd, host=info.host, port=info.port)
+            # notifications are only received outside a transaction
+            conn.autocommit = True
+        except psycopg2.Error as ex:
+            logger.warning(f'Cannot connect for sync notifications ({ex})')
+            return None
+        try:
+            sync_mgr_queries.listen(conn)
+        except psycopg2.Error as ex:
+            logger.warning(f'Sync notifications not available. Polling database. ({ex})')
+            conn.close()
+            return None
+        return conn
 
     def log(self, message):
         print(message)
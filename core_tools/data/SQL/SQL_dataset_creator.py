@@ -1,12 +1,15 @@
 from core_tools.data.SQL.queries.dataset_creation_queries import (
-        sample_info_queries,
         measurement_overview_queries,
-        measurement_parameters_queries
+        measurement_parameters_queries,
+        measurement_chunks_queries,
+        snapshot_store_queries,
         )
 from core_tools.data.SQL.queries.dataset_loading_queries import load_ds_queries
 from core_tools.data.SQL.queries.dataset_sync_queries import sync_mgr_queries
 
 from core_tools.data.SQL.SQL_connection_mgr import SQL_database_manager
+from core_tools.data.SQL.SQL_utility import generate_uuid
+from core_tools.data.SQL.buffer_writer import get_n_chunks
 
 import time
 
@@ -21,26 +24,51 @@ class SQL_dataset_creator(object):
             ds (data_set_raw) : raw dataset
         '''
         try:
-            # add a new entry in the measurements overiew table
-            sample_info_queries.add_sample(self.conn)
-
             ds.UNIX_start_time = time.time()
-            ds.exp_id, ds.exp_uuid = measurement_overview_queries.new_measurement(
-                    self.conn, ds.exp_name, ds.UNIX_start_time)
-            ds.running = True
+            ds.exp_uuid = generate_uuid()
 
-            measurement_overview_queries.update_measurement(
-                    self.conn, ds.exp_uuid,
+            # register the measurement, the getters/setters parameters and create the large objects
+            # with a single statement.
+            ds.exp_id, oids = measurement_overview_queries.register_measurement(
+                    self.conn, ds.exp_uuid, ds.exp_name, ds.UNIX_start_time,
                     metadata=ds.metadata,
-                    snapshot=ds.snapshot,
+                    snapshot=ds.snapshot_encoded,
                     keywords=ds.generate_keywords(),
-                    table_synchronized=False)
+                    data_items=ds.measurement_parameters_raw)
+            ds.running = True
 
-            # store of the getters/setters parameters
-            measurement_parameters_queries.insert_measurement_params(self.conn, ds.exp_uuid,
-                                                                     ds.measurement_parameters_raw)
+            chunked_params = []
+            for param_index, (data_item, oid) in enumerate(zip(ds.measurement_parameters_raw, oids)):
+                data_item.oid = oid
+                data_item.data_buffer.oid = oid
+                if data_item.chunk_size is not None:
+                    n_chunks = get_n_chunks(data_item.size, data_item.chunk_size)
+                    chunked_params.append((param_index, oid, n_chunks))
+            if chunked_params:
+                chunks = measurement_chunks_queries.create_chunks(self.conn, ds.exp_uuid, chunked_params)
+                for param_index, chunk_oids in chunks.items():
+                    ds.measurement_parameters_raw[param_index].data_buffer.chunk_oids = chunk_oids
 
             self.conn.commit()
+            if ds.snapshot_encoded is not None and ds.snapshot_encoded.station_hash is not None:
+                snapshot_store_queries.set_stored(self.conn, ds.snapshot_encoded)
+        except BaseException:
+            if not self.conn.closed:
+                self.conn.rollback()
+            raise
+
+    def update_snapshot(self, ds):
+        '''
+        Stores the snapshot of a measurement that was captured after registration.
+
+        Args:
+            ds (data_set_raw) : raw dataset
+        '''
+        try:
+            measurement_overview_queries.update_snapshot(self.conn, ds.exp_uuid, ds.snapshot_encoded)
+            self.conn.commit()
+            if ds.snapshot_encoded.station_hash is not None:
+                snapshot_store_queries.set_stored(self.conn, ds.snapshot_encoded)
         except BaseException:
             if not self.conn.closed:
                 self.conn.rollback()
@@ -54,8 +82,8 @@ class SQL_dataset_creator(object):
             ds (dataset_raw)
         '''
         measurement_parameters_queries.update_cursors_in_meas_tab(self.conn, ds.exp_uuid,
-                                                                  ds.measurement_parameters_raw)
-        measurement_overview_queries.update_measurement(self.conn, ds.exp_uuid, data_synchronized=False)
+                                                                  ds.measurement_parameters_raw,
+                                                                  flag_data_unsynchronized=True)
         self.conn.commit()
 
     def is_completed(self, exp_uuid):
@@ -65,7 +93,16 @@ class SQL_dataset_creator(object):
         Args:
             exp_uuid (int) : uuid of the experiment to check
         '''
-        return measurement_overview_queries.is_completed(self.conn, exp_uuid)
+        return measurement_overview_queries.is_completed(SQL_database_manager().get_connection('reader'), exp_uuid)
+
+    def get_sync_state(self, exp_uuid):
+        '''
+        returns the completed flag and the committed write cursors of the parameters.
+
+        Args:
+            exp_uuid (int) : uuid of the experiment to check
+        '''
+        return measurement_overview_queries.get_sync_state(SQL_database_manager().get_connection('reader'), exp_uuid)
 
     def finish_measurement(self, ds):
         '''
@@ -84,7 +121,8 @@ class SQL_dataset_creator(object):
             self.conn, ds.exp_uuid,
             stop_time=ds.UNIX_stop_time,
             completed=True,
-            data_size=ds.size(),
+            # NOTE: column data_size is INT.
+            data_size=min(ds.size(), 2**31-1),
             table_synchronized=False,
             data_synchronized=False)
 
@@ -101,10 +139,11 @@ class SQL_dataset_creator(object):
         Args:
             exp_id (int) : id of the measurment you want to get
         '''
-        if load_ds_queries.check_id(self.conn, exp_id) is False:
+        conn = SQL_database_manager().get_connection('reader')
+        if load_ds_queries.check_id(conn, exp_id) is False:
             raise ValueError("The id {}, does not exist in this database.".format(exp_id))
 
-        uuid = load_ds_queries.id_to_uuid(self.conn, exp_id)
+        uuid = load_ds_queries.id_to_uuid(conn, exp_id)
 
         return self.fetch_raw_dataset_by_UUID(uuid)
 
@@ -117,15 +156,19 @@ class SQL_dataset_creator(object):
             sync2local (bool): sync measurement to local database
         '''
         sync = False
-        if load_ds_queries.check_uuid(self.conn, exp_uuid):
-            conn = self.conn
-        elif load_ds_queries.check_uuid(SQL_database_manager().conn_remote, exp_uuid):
-            conn = SQL_database_manager().conn_remote
+        conn_local = SQL_database_manager().get_connection('reader')
+        conn_remote = SQL_database_manager().get_connection('reader', remote=True)
+        if load_ds_queries.check_uuid(conn_local, exp_uuid):
+            conn = conn_local
+            remote = False
+        elif load_ds_queries.check_uuid(conn_remote, exp_uuid):
+            conn = conn_remote
+            remote = True
             sync = sync2local
         else:
             raise ValueError("the uuid {}, does not exist in the local/remote database.".format(exp_uuid))
 
-        ds_raw = load_ds_queries.get_dataset_raw(conn, exp_uuid)
+        ds_raw = load_ds_queries.get_dataset_raw(conn, exp_uuid, remote)
         if sync:
             conn_mgr = SQL_database_manager()
             sample_info_list = sync_mgr_queries.get_sample_info_list(conn_mgr.conn_local)
@@ -134,3 +177,22 @@ class SQL_dataset_creator(object):
                                         sample_info_list=sample_info_list)
 
         return ds_raw
+
+    def fetch_raw_datasets_by_UUID(self, exp_uuids):
+        '''
+        Fetch multiple measurements with a single query per table.
+        Measurements that are not in the local database are fetched from the remote database.
+
+        Args:
+            exp_uuids (list[int]) : uuids of the measurments you want to get
+
+        Returns:
+            dict[int, data_set_raw] : raw datasets of the measurements that were found.
+        '''
+        conn_local = SQL_database_manager().get_connection('reader')
+        datasets = load_ds_queries.get_datasets_raw(conn_local, exp_uuids)
+        missing = [exp_uuid for exp_uuid in exp_uuids if exp_uuid not in datasets]
+        if missing:
+            conn_remote = SQL_database_manager().get_connection('reader', remote=True)
+            datasets.update(load_ds_queries.get_datasets_raw(conn_remote, missing, remote=True))
+        return datasets
@@ -52,6 +52,13 @@ def sql_value_formatter(var_values):
 	
 	return var_values_SQL, placeholders
 
+def sql_literal_formatter(var_values):
+	'''
+	convert values to literals that can be inlined in a statement.
+	'''
+	return [i if isinstance(i, (sql.SQL, sql.Composed, sql.Literal)) else sql.Literal(i)
+			for i in var_values]
+
 class name_value_formatter():
 	def __init__(self, var_names, var_values):
 		self.placeholders = []
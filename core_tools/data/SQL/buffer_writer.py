@@ -1,5 +1,201 @@
+import itertools
+
 import numpy as np
 
+# Parameters with more values are stored in multiple large objects (chunks) of CHUNK_SIZE values.
+# Chunked parameters are not kept in memory, but written and read per chunk.
+CHUNKED_STORAGE_MIN_SIZE = 20_000_000
+CHUNK_SIZE = 2**24
+# maximum number of bytes per write to a large object.
+WRITE_BLOCK_SIZE = 2**23
+# maximum number of bytes per query when reading multiple large objects.
+READ_BATCH_SIZE = 2**26
+# maximum number of ranges to read a slice of the data. If more ranges are needed all data is read.
+MAX_READ_RANGES = 10000
+
+
+def to_dtype(dtype_name):
+    '''
+    Returns the numpy dtype for the dtype stored in the database.
+    None is float64, the format of data stored by older versions.
+    '''
+    return np.dtype('float64' if dtype_name is None else dtype_name)
+
+
+def empty_buffer(shape, dtype='float64'):
+    '''
+    Returns a buffer for the data. Floating point and complex data is initialized with NaN,
+    integer data with 0.
+    '''
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'fc':
+        return np.full(shape, np.nan, dtype=dtype, order='C')
+    return np.zeros(shape, dtype=dtype, order='C')
+
+
+def write_lobject(lobject, data):
+    '''
+    Writes the data to the large object in blocks of WRITE_BLOCK_SIZE bytes.
+    lobject.write only accepts bytes. Writing in blocks limits the size of the temporary copy.
+
+    Args:
+        lobject (psycopg2.extensions.lobject) : large object positioned at the write location
+        data (np.ndarray, ndim=1) : data to write
+    '''
+    block_size = max(1, WRITE_BLOCK_SIZE // data.itemsize)
+    for start in range(0, data.size, block_size):
+        lobject.write(data[start:start+block_size].tobytes())
+
+
+def get_n_chunks(size, chunk_size):
+    return (size + chunk_size - 1) // chunk_size
+
+
+def read_lobject(conn, oid, offset, length):
+    '''
+    Reads bytes from a large object with a single query.
+    Unlike conn.lobject() this also works on connections in autocommit mode.
+
+    Args:
+        conn (psycopg2.connection) : connection to read the data from
+        oid (int) : oid of the large object
+        offset (int) : position of the first byte
+        length (int) : maximum number of bytes to read
+
+    Returns:
+        bytes: data. Less than length bytes when the large object is smaller.
+    '''
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT lo_get(%s, %s, %s)", (oid, offset, length))
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def lobject_size(conn, oid):
+    '''
+    Returns the size of a large object in bytes.
+    The large object is opened and closed within a single statement.
+    '''
+    cursor = conn.cursor()
+    try:
+        # 262144: INV_READ
+        cursor.execute("SELECT lo_lseek64(fd, 0, 2) FROM lo_open(%s, 262144) AS fd", (oid, ))
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def _get_reader_connection(remote):
+    # The connection is requested when the data is read, because reader connections of
+    # stopped threads are closed.
+    # NOTE: imported here to avoid circular import.
+    from core_tools.data.SQL.SQL_connection_mgr import SQL_database_manager
+    return SQL_database_manager().get_connection('reader', remote=remote)
+
+
+def read_chunks(conn, oids, chunk_size, start, out):
+    '''
+    Reads values from chunked storage.
+
+    Args:
+        conn (psycopg2.connection) : connection to read the data from
+        oids (list[int]) : oids of the chunks
+        chunk_size (int) : number of values per chunk
+        start (int) : index of first value to read
+        out (np.ndarray) : 1D array to store the values
+
+    Returns:
+        int: number of values read. This is less than out.size when not all data has been written.
+    '''
+    itemsize = out.itemsize
+    pos = start
+    stop = start + out.size
+    while pos < stop:
+        i_chunk, offset = divmod(pos, chunk_size)
+        n = min(stop - pos, chunk_size - offset)
+        data = np.frombuffer(read_lobject(conn, oids[i_chunk], offset*itemsize, n*itemsize), dtype=out.dtype)
+        out[pos-start:pos-start+data.size] = data
+        pos += data.size
+        if data.size < n:
+            break
+    return pos - start
+
+
+def index_to_ranges(shape, index, max_ranges=None):
+    '''
+    Converts a basic numpy index (integers and slices) on an array into ranges of the flattened array.
+    Dimensions at the end that are selected completely are combined in a single range.
+
+    Args:
+        shape (tuple[int]) : shape of the array
+        index (tuple[Union[int, slice]]) : index on the array
+        max_ranges (int) : maximum number of ranges.
+
+    Returns:
+        ranges, shape (list[tuple[int, int]], tuple[int]) : start and stop of the ranges in the
+            order of the result and the shape of the result. ranges is None if more than
+            max_ranges ranges are needed.
+    '''
+    if not isinstance(index, tuple):
+        index = (index, )
+    if len(index) > len(shape):
+        raise IndexError(f'too many indices for array: array is {len(shape)}-dimensional, '
+                         f'but {len(index)} were indexed')
+    index = index + (slice(None), ) * (len(shape) - len(index))
+    selections = []
+    out_shape = []
+    for n, i in zip(shape, index):
+        if isinstance(i, slice):
+            selection = range(*i.indices(n))
+            out_shape.append(len(selection))
+        else:
+            i = int(i)
+            if i < -n or i >= n:
+                raise IndexError(f'index {i} is out of bounds for axis with size {n}')
+            i = i % n
+            selection = range(i, i+1)
+        selections.append(selection)
+
+    if 0 in out_shape:
+        # empty or reversed slice: nothing is selected.
+        return [], tuple(out_shape)
+
+    strides = [int(np.prod(shape[dim+1:])) for dim in range(len(shape))]
+    # last dimension that is not selected completely
+    last = len(shape) - 1
+    while last >= 0 and selections[last] == range(shape[last]):
+        last -= 1
+    if last < 0:
+        return [(0, int(np.prod(shape)))], tuple(out_shape)
+
+    selection = selections[last]
+    stride = strides[last]
+    n_ranges = int(np.prod([len(outer) for outer in selections[:last]]))
+    if selection.step != 1:
+        n_ranges *= len(selection)
+    if max_ranges is not None and n_ranges > max_ranges:
+        return None, tuple(out_shape)
+
+    ranges = []
+    for outer in itertools.product(*selections[:last]):
+        offset = sum(i*strides[dim] for dim, i in enumerate(outer))
+        if selection.step == 1:
+            ranges.append((offset + selection.start*stride, offset + selection.stop*stride))
+        else:
+            ranges += [(offset + i*stride, offset + (i+1)*stride) for i in selection]
+    # merge adjacent ranges
+    merged = []
+    for start, stop in ranges:
+        if start == stop:
+            continue
+        if merged and merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], stop)
+        else:
+            merged.append((start, stop))
+    return merged, tuple(out_shape)
+
 
 class buffer_reference:
     '''
@@ -7,14 +203,26 @@ class buffer_reference:
     '''
     def __init__(self, data):
         self.buffer = data
-        self.buffer_lambda = buffer_reference.__empty_lambda
+        self.buffer_lambda = buffer_reference.empty_lambda
 
     @property
     def data(self):
         return self.buffer_lambda(self.buffer)
 
+    def read_index(self, index):
+        '''
+        Returns data[index].
+        '''
+        return self.data[index]
+
+    def reference(self):
+        '''
+        Returns a view on the data for slicing and averaging without changing this buffer.
+        '''
+        return buffer_view(self)
+
     @staticmethod
-    def __empty_lambda(data):
+    def empty_lambda(data):
         return data
 
     @staticmethod
@@ -27,6 +235,8 @@ class buffer_reference:
     def slice_lambda(args):
         def slice_lambda(data):
             return data[tuple(args)]
+        # the index is used to read only the selected data from the database.
+        slice_lambda.index = tuple(args)
         return slice_lambda
 
     @staticmethod
@@ -36,15 +246,25 @@ class buffer_reference:
         return reshape
 
 class buffer_writer(buffer_reference):
-    def __init__(self, SQL_conn, input_buffer):
+    def __init__(self, SQL_conn, input_buffer, oid=None):
+        '''
+        Args:
+            SQL_conn (psycopg2.connection) : connection to write the data to
+            input_buffer (np.ndarray) : buffer for the data
+            oid (int) : oid of the large object. If None the large object must be
+                allocated in the database before the first sync, or it will be created at first sync.
+        '''
         self.conn = SQL_conn
         self.buffer = input_buffer.ravel()
         self.buffer_lambda = buffer_reference.reshaper(input_buffer.shape)
+        self.shape = input_buffer.shape
+        self.dtype = input_buffer.dtype
 
-        self.lobject = self.conn.lobject(0,'w')
-        self.oid = self.lobject.oid
+        self.lobject = None
+        self.oid = oid
         self.cursor = 0
         self.cursor_db = 0
+        self.cursor_committed = 0
         self.blocks_written = 0
 
     def write(self, data):
@@ -52,26 +272,46 @@ class buffer_writer(buffer_reference):
         write n points to the buffer (no upload yet)
 
         Args:
-            data (np.ndarray, ndim=1, dtype=double) : data to write
+            data (np.ndarray) : data to write. It is converted to the dtype of the buffer.
         '''
-        self.buffer[self.cursor:self.cursor+data.size] = data
+        # copy directly into the buffer without flattening the data first.
+        self.buffer[self.cursor:self.cursor+data.size].reshape(data.shape)[...] = data
         self.cursor += data.size
 
     def sync(self):
-        try:
-            if self.cursor - self.cursor_db != 0:
-                # self.__load_blocks(self.cursor - self.cursor_db)
-                self.lobject.write((self.buffer[self.cursor_db:self.cursor]).tobytes())
-                self.cursor_db += self.cursor - self.cursor_db
-        except:
-            # NOTE: After a commit the lobject is not valid anymore and must be created again.
+        if self.oid is None:
+            self.lobject = self.conn.lobject(0, 'w')
+            self.oid = self.lobject.oid
+        # NOTE: the cursor can be incremented by another thread while writing.
+        cursor = self.cursor
+        if cursor - self.cursor_db != 0:
+            # NOTE: After a commit the lobject is not valid anymore and must be opened again.
             #       The overhead for this is very small.
             self.lobject = self.conn.lobject(self.oid, 'w')
-            self.lobject.seek(self.cursor_db*8)
-            self.sync()
+            self.lobject.seek(self.cursor_db*self.buffer.itemsize)
+            write_lobject(self.lobject, self.buffer[self.cursor_db:cursor])
+            self.cursor_db = cursor
+
+    def commit(self):
+        '''
+        Must be called after the transaction with the written data has been committed.
+        '''
+        self.cursor_committed = self.cursor_db
+
+    def rollback(self):
+        '''
+        Resets the database cursor to the last commit. The data will be written again on the next sync.
+        '''
+        self.cursor_db = self.cursor_committed
+        self.lobject = None
+
+    def set_connection(self, conn):
+        self.conn = conn
+        self.lobject = None
 
     def close(self):
-        self.lobject.close()
+        if self.lobject is not None:
+            self.lobject.close()
 
     '''
     not sure if this is needed, this complicates things and makes things less clean
@@ -102,29 +342,483 @@ class buffer_writer(buffer_reference):
     #         # reset writing position
     #         self.lobject.seek(self.cursor_db*8)
 
-class buffer_reader(buffer_reference):
-    def __init__(self, SQL_conn, oid, shape):
+class chunked_buffer_writer(buffer_reference):
+    '''
+    Writes the data of a parameter to multiple large objects (chunks).
+    Only the data that has not been written to the database is kept in memory.
+    '''
+    def __init__(self, SQL_conn, shape, dtype='float64', chunk_size=CHUNK_SIZE, spool_buffer=None):
+        '''
+        Args:
+            SQL_conn (psycopg2.connection) : connection to write the data to
+            shape (tuple[int]) : shape of the data
+            dtype (str) : numpy dtype of the data
+            chunk_size (int) : number of values per chunk
+            spool_buffer (np.ndarray) : 1D memory mapped file for all values. If not None
+                the chunks are views on this buffer and written data can be rolled back.
+        '''
         self.conn = SQL_conn
-        self.buffer = np.full(shape, np.nan).ravel()
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.size = int(np.prod(shape))
+        self.chunk_size = chunk_size
         self.buffer_lambda = buffer_reference.reshaper(shape)
-        self.oid = oid
 
-        self.lobject = self.conn.lobject(oid,'rb')
+        # oid of first chunk and all chunks. They are set when the measurement is registered.
+        self.oid = None
+        self.chunk_oids = None
         self.cursor = 0
-        self.sync()
+        self.cursor_db = 0
+        self.cursor_committed = 0
+        self.spool_buffer = spool_buffer
+        # chunks with data that has not yet been written to the database.
+        self._chunks = {}
+        self._buffer = None
+        self._buffer_cursor = None
+
+    @property
+    def n_chunks(self):
+        return get_n_chunks(self.size, self.chunk_size)
+
+    @property
+    def buffer(self):
+        # NOTE: loads all data in memory. It is cached until new data is written.
+        cursor = self.cursor
+        if self._buffer is None or self._buffer_cursor != cursor:
+            self._buffer = self.read(0, self.size)
+            self._buffer_cursor = cursor
+        return self._buffer
+
+    def write(self, data):
+        '''
+        write n points to the buffer (no upload yet)
+
+        Args:
+            data (np.ndarray) : data to write. It is converted to the dtype of the buffer.
+        '''
+        data = data.reshape(-1)
+        if self.cursor + data.size > self.size:
+            raise ValueError(f'Cannot write {data.size} values at position {self.cursor} '
+                             f'in buffer with size {self.size}')
+        pos = self.cursor
+        written = 0
+        while written < data.size:
+            i_chunk, offset = divmod(pos, self.chunk_size)
+            chunk = self._chunks.get(i_chunk)
+            if chunk is None:
+                chunk = self._new_chunk(i_chunk)
+                self._chunks[i_chunk] = chunk
+            n = min(data.size - written, chunk.size - offset)
+            chunk[offset:offset+n] = data[written:written+n]
+            written += n
+            pos += n
+        self.cursor = pos
 
     def sync(self):
+        # NOTE: the cursor can be incremented by another thread while writing.
+        cursor = self.cursor
+        pos = self.cursor_db
+        while pos < cursor:
+            i_chunk, offset = divmod(pos, self.chunk_size)
+            chunk = self._chunks[i_chunk]
+            n = min(cursor - pos, chunk.size - offset)
+            lobject = self.conn.lobject(self.chunk_oids[i_chunk], 'wb')
+            try:
+                lobject.seek(offset*self.dtype.itemsize)
+                write_lobject(lobject, chunk[offset:offset+n])
+            finally:
+                lobject.close()
+            pos += n
+            self.cursor_db = pos
+            if offset + n == chunk.size:
+                # chunk completely written to database
+                del self._chunks[i_chunk]
+
+    def _new_chunk(self, i_chunk):
+        start = i_chunk*self.chunk_size
+        n = min(self.chunk_size, self.size - start)
+        if self.spool_buffer is None:
+            return empty_buffer(n, self.dtype)
+        chunk = self.spool_buffer[start:start+n]
+        chunk[:] = empty_buffer(1, self.dtype)
+        return chunk
+
+    def commit(self):
+        '''
+        Must be called after the transaction with the written data has been committed.
+        '''
+        self.cursor_committed = self.cursor_db
+
+    def rollback(self):
+        '''
+        Resets the database cursor to the last commit. The data will be written again on the next sync.
+        The chunks are restored from the spool buffer.
+        '''
+        if self.cursor_db == self.cursor_committed:
+            return
+        if self.spool_buffer is None:
+            raise Exception('Cannot rollback chunked data without spool buffer')
+        for i_chunk in range(self.cursor_committed // self.chunk_size,
+                             get_n_chunks(self.cursor_db, self.chunk_size)):
+            if i_chunk not in self._chunks:
+                start = i_chunk*self.chunk_size
+                self._chunks[i_chunk] = self.spool_buffer[start:start+min(self.chunk_size, self.size-start)]
+        self.cursor_db = self.cursor_committed
+
+    def set_connection(self, conn):
+        self.conn = conn
+
+    def read(self, start, stop):
+        '''
+        Returns the values start until stop of the flattened data.
+        Values that have not been written yet are NaN.
+        '''
+        out = empty_buffer(stop - start, self.dtype)
+        # copy data from memory before reading from the database, because
+        # the chunks are removed from memory after writing them to the database.
+        for i_chunk, chunk in list(self._chunks.items()):
+            chunk_start = i_chunk * self.chunk_size
+            first = max(start, chunk_start)
+            last = min(stop, chunk_start + chunk.size)
+            if first < last:
+                out[first-start:last-start] = chunk[first-chunk_start:last-chunk_start]
+        cursor_db = self.cursor_db
+        if start < cursor_db and self.chunk_oids is not None:
+            read_chunks(self.conn, self.chunk_oids, self.chunk_size, start,
+                        out[:min(stop, cursor_db)-start])
+        return out
+
+    def close(self):
+        pass
+
+
+class chunked_buffer_reader(buffer_reference):
+    '''
+    Reads the data of a parameter that is stored in multiple large objects (chunks).
+    The data is only loaded in memory when it is accessed via buffer or data.
+    Use read() or iter_chunks() to load part of the data.
+    The data is read with the reader connection of the thread that accesses the data.
+    '''
+    def __init__(self, oids, shape, dtype='float64', chunk_size=CHUNK_SIZE, write_cursor=None, remote=False):
+        self.remote = remote
+        self.oids = oids
+        self.oid = oids[0]
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.size = int(np.prod(shape))
+        self.chunk_size = chunk_size
+        self.buffer_lambda = buffer_reference.reshaper(shape)
+        self._buffer = None
+        self._index_cache = None
+        if write_cursor is not None:
+            self.cursor = min(write_cursor, self.size)
+        else:
+            self.cursor = self._get_n_written()
+
+    @property
+    def buffer(self):
+        if self._buffer is None:
+            self._buffer = self.read(0, self.size)
+        return self._buffer
+
+    @property
+    def conn(self):
+        return _get_reader_connection(self.remote)
+
+    def _get_n_written(self):
+        n_written = 0
+        for oid in self.oids:
+            n = lobject_size(self.conn, oid) // self.dtype.itemsize
+            n_written += n
+            if n < self.chunk_size:
+                break
+        return n_written
+
+    def sync(self, write_cursor=None):
         '''
         update the buffer (for datasets that are still being written)
+
+        Args:
+            write_cursor (int) : number of values committed in the database.
+                Only the values after the current cursor are read. If None the
+                number of values is determined from the size of the large objects.
+        '''
+        if write_cursor is not None:
+            write_cursor = min(write_cursor, self.size)
+            if write_cursor <= self.cursor:
+                return
+            if self._buffer is not None:
+                self.cursor += read_chunks(self.conn, self.oids, self.chunk_size, self.cursor,
+                                           self._buffer[self.cursor:write_cursor])
+            else:
+                self.cursor = write_cursor
+        elif self._buffer is not None:
+            self.cursor += read_chunks(self.conn, self.oids, self.chunk_size, self.cursor,
+                                       self._buffer[self.cursor:])
+        else:
+            self.cursor = self._get_n_written()
+
+    def read(self, start, stop):
+        '''
+        Returns the values start until stop of the flattened data.
+        Values that have not been written yet are NaN.
+        '''
+        if self._buffer is not None:
+            return self._buffer[start:stop]
+        out = empty_buffer(stop - start, self.dtype)
+        read_chunks(self.conn, self.oids, self.chunk_size, start, out)
+        return out
+
+    def read_index(self, index):
+        '''
+        Returns data[index]. If the data is not in memory only the selected ranges are read.
+        '''
+        if self._buffer is not None:
+            return self.data[index]
+        # the last result is cached until new data has been written.
+        if self._index_cache is not None and self._index_cache[:2] == (index, self.cursor):
+            return self._index_cache[2]
+        ranges, shape = index_to_ranges(self.shape, index, MAX_READ_RANGES)
+        if ranges is None:
+            return self.data[index]
+        out = empty_buffer(sum(stop - start for start, stop in ranges), self.dtype)
+        pos = 0
+        for start, stop in ranges:
+            out[pos:pos+stop-start] = self.read(start, stop)
+            pos += stop - start
+        out = out.reshape(shape)
+        self._index_cache = (index, self.cursor, out)
+        return out
+
+    def iter_chunks(self):
+        '''
+        Iterates over the flattened data per chunk.
+
+        Yields:
+            start, data (int, np.ndarray) : index of the first value and values of the chunk.
+        '''
+        for start in range(0, self.size, self.chunk_size):
+            yield start, self.read(start, min(start + self.chunk_size, self.size))
+
+
+class buffer_reader(buffer_reference):
+    '''
+    Reads the data of a parameter that is stored in a single large object.
+    The data is only read from the database when it is accessed via buffer or data.
+    The data is read with the reader connection of the thread that accesses the data.
+    '''
+    def __init__(self, oid, shape, dtype='float64', write_cursor=None, remote=False):
+        '''
+        Args:
+            oid (int) : oid of the large object
+            shape (tuple[int]) : shape of the data
+            dtype (str) : numpy dtype of the data
+            write_cursor (int) : number of values committed in the database. If None, the
+                number of values is determined from the size of the large object.
+            remote (bool) : read the data from the remote database
         '''
-        self.lobject = self.conn.lobject(self.oid, 'rb')
-        self.lobject.seek(self.cursor*8)
-        binary_data = self.lobject.read()
-        data = np.frombuffer(binary_data)
+        self.remote = remote
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.size = int(np.prod(shape))
+        self.buffer_lambda = buffer_reference.reshaper(shape)
+        self.oid = oid
+        self._buffer = None
+        self._cursor = min(write_cursor, self.size) if write_cursor is not None else None
+        self._index_cache = None
+
+    @property
+    def loaded(self):
+        return self._buffer is not None
+
+    @property
+    def conn(self):
+        return _get_reader_connection(self.remote)
+
+    @property
+    def buffer(self):
+        if self._buffer is None:
+            self._buffer = empty_buffer(self.size, self.dtype)
+            cursor = self._cursor
+            self._cursor = 0
+            self._read(cursor)
+        return self._buffer
+
+    @property
+    def cursor(self):
+        if self._cursor is None:
+            self._cursor = min(lobject_size(self.conn, self.oid) // self.dtype.itemsize, self.size)
+        return self._cursor
+
+    def read_index(self, index):
+        '''
+        Returns data[index]. If the data is not in memory only the selected ranges are read
+        with a single query.
+        '''
+        if self._buffer is not None:
+            return self.data[index]
+        # the last result is cached until new data has been written.
+        cursor = self.cursor
+        if self._index_cache is not None and self._index_cache[:2] == (index, cursor):
+            return self._index_cache[2]
+        ranges, shape = index_to_ranges(self.shape, index, MAX_READ_RANGES)
+        if ranges is None:
+            return self.data[index]
+        # values after the cursor have not been written.
+        itemsize = self.dtype.itemsize
+        offsets = [start*itemsize for start, stop in ranges]
+        lengths = [max(0, min(stop, cursor) - start)*itemsize for start, stop in ranges]
+        out = empty_buffer(sum(stop - start for start, stop in ranges), self.dtype)
+        sql_cursor = self.conn.cursor()
+        try:
+            sql_cursor.execute("SELECT lo_get(%s, t.start, t.length) "
+                               "FROM unnest(%s::bigint[], %s::int[]) WITH ORDINALITY AS t(start, length, i) "
+                               "ORDER BY t.i", (self.oid, offsets, lengths))
+            pos = 0
+            for (start, stop), (binary_data, ) in zip(ranges, sql_cursor.fetchall()):
+                data = np.frombuffer(binary_data, dtype=self.dtype)
+                out[pos:pos+data.size] = data
+                pos += stop - start
+        finally:
+            sql_cursor.close()
+        out = out.reshape(shape)
+        self._index_cache = (index, cursor, out)
+        return out
+
+    def set_data(self, binary_data):
+        '''
+        Sets the data read from the database.
+
+        Args:
+            binary_data (bytes) : data from the start of the large object.
+        '''
+        data = np.frombuffer(binary_data, dtype=self.dtype)[:self.size]
+        buffer = empty_buffer(self.size, self.dtype)
+        buffer[:data.size] = data
+        self._buffer = buffer
+        self._cursor = data.size
+
+    def _read(self, write_cursor):
+        if write_cursor is None:
+            write_cursor = self.size
+        if write_cursor <= self._cursor:
+            return
+        binary_data = read_lobject(self.conn, self.oid, self._cursor*self.dtype.itemsize,
+                                   (write_cursor - self._cursor)*self.dtype.itemsize)
+        data = np.frombuffer(binary_data, dtype=self.dtype)[:self.size-self._cursor]
+
+        self._buffer[self._cursor:self._cursor+data.size] = data
+        self._cursor = self._cursor+data.size
+
+    def sync(self, write_cursor=None):
+        '''
+        update the buffer (for datasets that are still being written)
+
+        Args:
+            write_cursor (int) : number of values committed in the database.
+                Only the values after the current cursor are read. The large object is not accessed
+                when there is no new data. If None all data in the large object is read.
+        '''
+        if write_cursor is not None:
+            write_cursor = min(write_cursor, self.size)
+        if self._buffer is None:
+            # data will be read up to the cursor when it is accessed.
+            self._cursor = write_cursor
+            return
+        self._read(write_cursor)
+
+
+class buffer_view(buffer_reference):
+    '''
+    View on the data of a buffer for slicing and averaging. The data of the buffer is not copied.
+    The result is cached until the cursor of the buffer changes.
+    When the data of a reader is not in memory only the selected slice is read.
+    '''
+    def __init__(self, data_buffer):
+        self.source = data_buffer
+        self.buffer_lambda = buffer_reference.empty_lambda
+        self._cache = None
+
+    @property
+    def buffer(self):
+        return self.source.data
+
+    @property
+    def cursor(self):
+        return getattr(self.source, 'cursor', None)
+
+    @property
+    def shape(self):
+        if self.buffer_lambda is buffer_reference.empty_lambda and hasattr(self.source, 'shape'):
+            return tuple(self.source.shape)
+        return self.data.shape
+
+    @property
+    def data(self):
+        key = (self.buffer_lambda, self.cursor)
+        if self._cache is not None and self._cache[0] == key:
+            return self._cache[1]
+        index = getattr(self.buffer_lambda, 'index', None)
+        if index is None:
+            data = self.buffer_lambda(self.buffer)
+        else:
+            data = self.source.read_index(index)
+        self._cache = (key, data)
+        return data
+
+    def read_index(self, index):
+        if self.buffer_lambda is buffer_reference.empty_lambda:
+            return self.source.read_index(index)
+        return self.data[index]
+
+
+def load_buffers(buffers):
+    '''
+    Reads the data of multiple parameters with a minimal number of queries.
+    The large objects are read with lo_get in batches of at most READ_BATCH_SIZE bytes.
+    Buffers that have already been loaded are skipped.
+
+    Args:
+        buffers (list[buffer_reference]) : buffers to load
+    '''
+    batches = {}
+    for data_buffer in buffers:
+        if isinstance(data_buffer, chunked_buffer_reader):
+            # chunked data is read per chunk
+            data_buffer.buffer
+            continue
+        if not isinstance(data_buffer, buffer_reader) or data_buffer.loaded:
+            continue
+        n_bytes = data_buffer.cursor * data_buffer.dtype.itemsize
+        if n_bytes > READ_BATCH_SIZE:
+            data_buffer.buffer
+            continue
+        batch, batch_size = batches.get(data_buffer.conn, ([], 0))
+        if batch_size + n_bytes > READ_BATCH_SIZE:
+            _load_batch(data_buffer.conn, batch)
+            batch, batch_size = [], 0
+        batch.append(data_buffer)
+        batches[data_buffer.conn] = (batch, batch_size + n_bytes)
+
+    for conn, (batch, _) in batches.items():
+        if batch:
+            _load_batch(conn, batch)
 
-        self.buffer[self.cursor:self.cursor+data.size] = data
-        self.cursor = self.cursor+data.size
 
+def _load_batch(conn, buffers):
+    # remove duplicates. A buffer can be requested multiple times via the setpoints.
+    buffers = list({id(data_buffer): data_buffer for data_buffer in buffers}.values())
+    oids = [data_buffer.oid for data_buffer in buffers]
+    lengths = [data_buffer.cursor * data_buffer.dtype.itemsize for data_buffer in buffers]
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT lo_get(t.oid, 0, t.length) "
+                       "FROM unnest(%s::oid[], %s::int[]) WITH ORDINALITY AS t(oid, length, i) "
+                       "ORDER BY t.i", (oids, lengths))
+        for data_buffer, (binary_data, ) in zip(buffers, cursor.fetchall()):
+            data_buffer.set_data(binary_data)
+    finally:
+        cursor.close()
 
 
 if __name__ == '__main__':
@@ -147,5 +841,5 @@ if __name__ == '__main__':
     print(bw.oid)
     conn_local.commit()
 
-    br = buffer_reader(conn_local, bw.oid, a.shape)
+    br = buffer_reader(bw.oid, a.shape)
     print(br.data)
\ No newline at end of file
@@ -0,0 +1,348 @@
+'''
+Transfer of large objects between databases.
+
+The data of a large object is read from the source and written to the destination in blocks.
+Reading and writing are overlapped: a thread reads the blocks from the source into a bounded queue
+while the blocks are written to the destination. The data of multiple parameters is copied concurrently,
+each worker with its own connections to the source and destination database.
+The copied data is committed in steps, such that an interrupted copy can be resumed.
+'''
+import contextlib
+import logging
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+
+class transfer_settings:
+    # number of bytes per read and write
+    block_size = 2**21
+    # maximum number of blocks read ahead of the write
+    queue_size = 4
+    # number of large objects copied concurrently
+    n_connections = 4
+    # maximum number of bytes copied before the data is committed
+    commit_size = 2**26
+    # calculate a checksum of the copied data
+    checksum = False
+
+
+def set_transfer_settings(block_size=None, queue_size=None, n_connections=None,
+                          commit_size=None, checksum=None):
+    '''
+    Sets the parameters for the transfer of data between databases.
+
+    Args:
+        block_size (int) : number of bytes per read and write. Default: 2 MB
+        queue_size (int) : maximum number of blocks read ahead of the write. Default: 4
+        n_connections (int) : number of large objects copied concurrently. Default: 4
+        commit_size (int) : maximum number of bytes copied before the data is committed. Default: 64 MB
+        checksum (bool) : calculate a crc32 checksum of the copied data and verify it
+            when the measurement is complete. Default: False
+    '''
+    if block_size is not None:
+        transfer_settings.block_size = int(block_size)
+    if queue_size is not None:
+        transfer_settings.queue_size = int(queue_size)
+    if n_connections is not None:
+        transfer_settings.n_connections = int(n_connections)
+    if commit_size is not None:
+        transfer_settings.commit_size = int(commit_size)
+    if checksum is not None:
+        transfer_settings.checksum = bool(checksum)
+
+
+def _connect(conn_info):
+    return psycopg2.connect(dbname=conn_info.dbname, user=conn_info.user,
+                            password=conn_info.passwd, host=conn_info.host, port=conn_info.port)
+
+
+class transfer_progress:
+    '''
+    Progress of the transfer of data.
+    '''
+    def __init__(self, bytes_total, callback=None, interval=10.0):
+        '''
+        Args:
+            bytes_total (int) : number of bytes to transfer
+            callback (Callable[[transfer_progress], None]) : function called with the progress
+                during the transfer.
+            interval (float) : minimum time in seconds between calls of the callback.
+        '''
+        self.bytes_total = bytes_total
+        self.bytes_done = 0
+        self.start_time = time.perf_counter()
+        self._callback = callback
+        self._interval = interval
+        self._last_report = self.start_time
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_pending(self):
+        return max(0, self.bytes_total - self.bytes_done)
+
+    @property
+    def rate(self):
+        '''
+        Average number of bytes per second.
+        '''
+        duration = time.perf_counter() - self.start_time
+        return self.bytes_done / duration if duration > 0 else 0.0
+
+    @property
+    def eta(self):
+        '''
+        Estimated time in seconds until the transfer is complete, or None if unknown.
+        '''
+        rate = self.rate
+        if rate == 0:
+            return None
+        return self.bytes_pending / rate
+
+    def add(self, n_bytes):
+        with self._lock:
+            self.bytes_done += n_bytes
+            now = time.perf_counter()
+            report = self._callback is not None and now - self._last_report > self._interval
+            if report:
+                self._last_report = now
+        if report:
+            self._callback(self)
+
+    def __str__(self):
+        eta = self.eta
+        eta = f'{eta:.0f} s' if eta is not None else '?'
+        return (f'{self.bytes_done*1e-6:.1f} of {self.bytes_total*1e-6:.1f} MB, '
+                f'{self.bytes_pending*1e-6:.1f} MB pending, {self.rate*1e-6:.1f} MB/s, ETA {eta}')
+
+
+class copy_task:
+    '''
+    Copy of the data of a parameter. The ranges are copied in order.
+    '''
+    def __init__(self, items, checkpoint=None, checksum=None, itemsize=1):
+        '''
+        Args:
+            items (list[tuple[int, int, int, int]]) :
+                source oid, destination oid, first byte and end byte to copy.
+            checkpoint (Callable[[psycopg2.connection, int, int], None]) :
+                function called with the destination connection, the number of bytes copied
+                and the checksum. It is called in the transaction of the copied data before commit.
+            checksum (int) : crc32 of the data in the destination before the first byte.
+                If None the checksum is not calculated.
+            itemsize (int) : size of a value in bytes. The data is only committed after
+                a whole number of values, such that the checkpoint never contains a partial value.
+        '''
+        self.items = [item for item in items if item[3] > item[2]]
+        self.checkpoint = checkpoint
+        self.checksum = checksum
+        self.itemsize = itemsize
+        self.n_bytes = sum(item[3] - item[2] for item in self.items)
+
+
+class lobject_transfer:
+    '''
+    Copies data of large objects from the source to the destination database.
+    '''
+    __transfers = {}
+
+    def __init__(self, conn_info_src, conn_info_dest):
+        '''
+        Args:
+            conn_info_src (type) : SQL_conn_info_local or SQL_conn_info_remote
+            conn_info_dest (type) : SQL_conn_info_local or SQL_conn_info_remote
+        '''
+        self.conn_info_src = conn_info_src
+        self.conn_info_dest = conn_info_dest
+        # idle pairs of connections (source, destination)
+        self._connections = queue.SimpleQueue()
+
+    @staticmethod
+    def get(conn_info_src, conn_info_dest):
+        '''
+        Returns the transfer from source to destination. The connections of the transfer are reused.
+        '''
+        key = (conn_info_src, conn_info_dest)
+        transfer = lobject_transfer.__transfers.get(key)
+        if transfer is None:
+            transfer = lobject_transfer(conn_info_src, conn_info_dest)
+            lobject_transfer.__transfers[key] = transfer
+        return transfer
+
+    def copy(self, tasks, progress=None):
+        '''
+        Copies the data of the tasks. The data is committed at least every commit_size bytes
+        together with the checkpoints of the tasks. All data is committed when copy returns.
+
+        Args:
+            tasks (list[copy_task]) : data to copy
+            progress (transfer_progress) : progress to update with the copied bytes
+
+        Returns:
+            int: number of bytes copied
+        '''
+        tasks = [task for task in tasks if task.n_bytes > 0]
+        if not tasks:
+            return 0
+        start = time.perf_counter()
+        n_workers = max(1, min(transfer_settings.n_connections, len(tasks)))
+        if n_workers == 1:
+            n_bytes = self._copy_tasks(tasks, progress)
+        else:
+            with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix='lobject_transfer') as executor:
+                # the largest tasks first for a better distribution over the workers.
+                tasks = sorted(tasks, key=lambda task: task.n_bytes, reverse=True)
+                futures = [executor.submit(self._copy_tasks, tasks[i::n_workers], progress)
+                           for i in range(n_workers)]
+                n_bytes = sum(future.result() for future in futures)
+        duration = time.perf_counter() - start
+        logger.info(f'Copied {len(tasks)} parameters, {n_bytes*1e-6:.1f} MB in {duration:.2f} s '
+                    f'({n_bytes*1e-6/duration:.1f} MB/s)')
+        return n_bytes
+
+    def _copy_tasks(self, tasks, progress):
+        try:
+            conn_src, conn_dest = self._connections.get_nowait()
+        except queue.Empty:
+            conn_src = _connect(self.conn_info_src)
+            conn_dest = _connect(self.conn_info_dest)
+        try:
+            worker = _copy_worker(conn_src, conn_dest, progress)
+            n_bytes = sum(worker.copy(task) for task in tasks)
+            conn_dest.commit()
+            # end the read transaction
+            conn_src.rollback()
+        except BaseException:
+            conn_src.close()
+            conn_dest.close()
+            raise
+        self._connections.put((conn_src, conn_dest))
+        return n_bytes
+
+
+class _copy_worker:
+    def __init__(self, conn_src, conn_dest, progress):
+        self.conn_src = conn_src
+        self.conn_dest = conn_dest
+        self.progress = progress
+        # number of bytes written since the last commit
+        self.uncommitted = 0
+
+    def copy(self, task):
+        '''
+        Copies the data of the task. The checkpoint of the task is called before every commit
+        and when all data has been copied.
+
+        Returns:
+            int: number of bytes copied
+        '''
+        n_bytes = 0
+        checksum = task.checksum
+        for src_oid, dest_oid, start, stop in task.items:
+            pos = start
+            dest_lobject = self.conn_dest.lobject(dest_oid, 'wb')
+            try:
+                dest_lobject.seek(pos)
+                with contextlib.closing(_read_blocks(self.conn_src, src_oid, start, stop)) as blocks:
+                    for data in blocks:
+                        dest_lobject.write(data)
+                        pos += len(data)
+                        n_bytes += len(data)
+                        self.uncommitted += len(data)
+                        if checksum is not None:
+                            checksum = zlib.crc32(data, checksum)
+                        if self.progress is not None:
+                            self.progress.add(len(data))
+                        if (self.uncommitted >= transfer_settings.commit_size
+                                and n_bytes % task.itemsize == 0):
+                            # large objects are closed at the end of the transaction.
+                            dest_lobject.close()
+                            self.commit(task, n_bytes, checksum)
+                            dest_lobject = self.conn_dest.lobject(dest_oid, 'wb')
+                            dest_lobject.seek(pos)
+            finally:
+                dest_lobject.close()
+        if task.checkpoint is not None:
+            task.checkpoint(self.conn_dest, n_bytes, checksum)
+        if self.uncommitted >= transfer_settings.commit_size:
+            self.conn_dest.commit()
+            self.uncommitted = 0
+        return n_bytes
+
+    def commit(self, task, n_bytes, checksum):
+        if task.checkpoint is not None:
+            task.checkpoint(self.conn_dest, n_bytes, checksum)
+        self.conn_dest.commit()
+        self.uncommitted = 0
+
+
+def _read_blocks(conn, oid, start, stop):
+    '''
+    Generates the blocks with bytes start until stop of the large object.
+    The next blocks are read in a separate thread while a block is processed.
+    '''
+    blocks = queue.Queue(maxsize=transfer_settings.queue_size)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read():
+        try:
+            src_lobject = conn.lobject(oid, 'rb')
+            try:
+                src_lobject.seek(start)
+                pos = start
+                while pos < stop and not stopped.is_set():
+                    data = src_lobject.read(min(transfer_settings.block_size, stop - pos))
+                    if len(data) == 0:
+                        break
+                    put(data)
+                    pos += len(data)
+            finally:
+                src_lobject.close()
+        except BaseException as ex:
+            put(ex)
+            return
+        put(None)
+
+    reader = threading.Thread(target=read, name='lobject_reader', daemon=True)
+    reader.start()
+    try:
+        while True:
+            data = blocks.get()
+            if data is None:
+                break
+            if isinstance(data, BaseException):
+                raise data
+            yield data
+    finally:
+        stopped.set()
+        reader.join()
+
+
+def read_checksum(conn, items):
+    '''
+    Calculates the crc32 checksum of the data of the large objects.
+
+    Args:
+        conn (psycopg2.connection) : connection to the database
+        items (list[tuple[int, int, int]]) : oid, first byte and end byte
+    '''
+    checksum = 0
+    for oid, start, stop in items:
+        with contextlib.closing(_read_blocks(conn, oid, start, stop)) as blocks:
+            for data in blocks:
+                checksum = zlib.crc32(data, checksum)
+    return checksum
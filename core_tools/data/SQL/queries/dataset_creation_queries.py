@@ -1,5 +1,6 @@
-from core_tools.data.SQL.SQL_common_commands import execute_statement, execute_query
-from core_tools.data.SQL.SQL_common_commands import insert_row_in_table, update_table
+from core_tools.data.SQL.SQL_common_commands import (
+        execute_statement, execute_query, execute_prepared, add_missing_columns)
+from core_tools.data.SQL.SQL_common_commands import insert_row_in_table, insert_rows_statement
 
 from core_tools.data.SQL.SQL_utility import generate_uuid
 from core_tools.data.SQL.connect import SQL_conn_info_local, sample_info
@@ -31,13 +32,24 @@ class sample_info_queries:
 
     @staticmethod
     def add_sample(conn, project=None, set_up=None, sample=None):
+        statement = sample_info_queries.add_sample_statement(project, set_up, sample)
+        if statement is not None:
+            execute_statement(conn, statement)
+
+    @staticmethod
+    def add_sample_statement(project=None, set_up=None, sample=None):
+        '''
+        Returns:
+            sql.Composed : statement to add the sample, or None if the sample info is not valid.
+        '''
         if project is None and set_up is None and sample is None:
             sample, set_up, project = sample_info.sample, sample_info.set_up, sample_info.project
         if is_valid_info(sample) and is_valid_info(set_up) and is_valid_info(project):
             var_names = ('sample_info_hash', 'sample', 'set_up', 'project')
             var_values = (set_up+project+sample, sample, set_up, project)
-            insert_row_in_table(conn, sample_info_queries.table_name, var_names, var_values,
-                custom_statement='ON CONFLICT DO NOTHING')
+            return insert_rows_statement(sample_info_queries.table_name, var_names, [var_values],
+                custom_statement='ON CONFLICT DO NOTHING') + psycopg2.sql.SQL(';')
+        return None
 
 class measurement_overview_queries:
     '''
@@ -47,6 +59,13 @@ class measurement_overview_queries:
     '''
     table_name="global_measurement_overview"
 
+    # groups of columns that are synchronized without the rest of the row.
+    # The bit of the group is set in column sync_columns when a column of the group changes.
+    sync_column_groups = {
+        1: ('exp_name', ),
+        2: ('starred', ),
+        }
+
     @staticmethod
     def generate_table(conn):
         statement = "CREATE TABLE if not EXISTS {} (".format(measurement_overview_queries.table_name)
@@ -86,6 +105,16 @@ class measurement_overview_queries:
 
         execute_statement(conn, statement)
 
+        # columns added for compressed and deduplicated snapshots.
+        add_missing_columns(conn, measurement_overview_queries.table_name, {
+            'snapshot_format': 'text', # NULL: uncompressed JSON
+            'station_snapshot_hash': 'text', # key in snapshot_store
+            })
+        # column added for the sync of changed columns only.
+        add_missing_columns(conn, measurement_overview_queries.table_name, {
+            'sync_columns': 'int', # bitmask of sync_column_groups changed. NULL: all columns
+            })
+
     @staticmethod
     def new_measurement(conn, exp_name, start_time):
         '''
@@ -97,30 +126,110 @@ class measurement_overview_queries:
         Returns:
             id, uuid, SQL_datatable : id and uuid of the new measurement and the tablename for raw data storage
         '''
+        uuid = generate_uuid()
+        statement = measurement_overview_queries.new_measurement_statement(uuid, exp_name, start_time)
+        query_outcome = execute_query(conn, statement)
+
+        # NOTE: SQL_datatable name is not used anymore for new measurements
+
+        return query_outcome[0][0], query_outcome[0][1]
+
+    @staticmethod
+    def new_measurement_statement(uuid, exp_name, start_time,
+                                  metadata=None, snapshot=None, keywords=None):
+        '''
+        generate the statement to insert a new measurement in the measurement table.
+
+        Args:
+            uuid (int) : unique id of the new measurement
+            exp_name (str) : name of the experiment to be executed
+            start_time (float) : time in unix seconds since the epoch
+            metadata (dict) : json string to be saved in the database
+            snapshot (stored_snapshot) : encoded snapshot of the exprimental set up
+            keywords (list) : keywords describing the measurement
+
+        Returns:
+            sql.Composed : insert statement returning id and uuid
+        '''
         if (not is_valid_info(sample_info.project)
             or not is_valid_info(sample_info.set_up)
             or not is_valid_info(sample_info.sample)):
             raise Exception(f'Sample info not valid: {sample_info}')
 
-        uuid = generate_uuid()
         # NOTE: column sync_location is abused for migration to new format
-        var_names = (
+        var_names = [
                 'uuid', 'set_up', 'project', 'sample',
                 'creasted_by', 'exp_name', 'sync_location', 'exp_data_location',
-                'start_time')
-        var_values = (
+                'start_time', 'metadata', 'keywords']
+        var_values = [
                 uuid, str(sample_info.set_up), str(sample_info.project), str(sample_info.sample),
                 SQL_conn_info_local.user, exp_name, 'New measurement_parameters', '',
-                psycopg2.sql.SQL("TO_TIMESTAMP({})").format(psycopg2.sql.Literal(start_time))
-                )
+                psycopg2.sql.SQL("TO_TIMESTAMP({})").format(psycopg2.sql.Literal(start_time)),
+                measurement_overview_queries._to_json_bytea(metadata),
+                psycopg2.extras.Json(keywords) if keywords is not None else None,
+                ]
+        if snapshot is not None:
+            var_names += ['snapshot']
+            var_values += [psycopg2.Binary(snapshot.data)]
+            # only write the new columns when needed. Keeps compatibility with old databases.
+            if snapshot.data_format is not None:
+                var_names += ['snapshot_format']
+                var_values += [snapshot.data_format]
+            if snapshot.station_hash is not None:
+                var_names += ['station_snapshot_hash']
+                var_values += [snapshot.station_hash]
 
         returning = ('id', 'uuid')
-        query_outcome = insert_row_in_table(conn, measurement_overview_queries.table_name,
-                                            var_names, var_values, returning)
+        return insert_rows_statement(measurement_overview_queries.table_name,
+                                     var_names, [var_values], returning)
 
-        # NOTE: SQL_datatable name is not used anymore for new measurements
+    @staticmethod
+    def register_measurement(conn, uuid, exp_name, start_time, metadata, snapshot, keywords, data_items):
+        '''
+        Registers a new measurement with all its parameters in one round trip.
+        The large objects for the parameters are created by the database.
 
-        return query_outcome[0][0], query_outcome[0][1]
+        Args:
+            uuid (int) : unique id of the new measurement
+            exp_name (str) : name of the experiment to be executed
+            start_time (float) : time in unix seconds since the epoch
+            metadata (dict) : json string to be saved in the database
+            snapshot (stored_snapshot) : encoded snapshot of the exprimental set up
+            keywords (list) : keywords describing the measurement
+            data_items (list[m_param_raw]) : raw format of the measurement parameters
+
+        Returns:
+            exp_id, oids (int, list[int]) : id of the measurement and oids of the parameters.
+        '''
+        new_measurement = measurement_overview_queries.new_measurement_statement(
+                uuid, exp_name, start_time,
+                metadata=metadata, snapshot=snapshot, keywords=keywords)
+        if len(data_items) == 0:
+            statement = psycopg2.sql.SQL(
+                    "WITH overview AS ({0}) SELECT overview.id FROM overview;").format(new_measurement)
+        else:
+            statement = psycopg2.sql.SQL(
+                    "WITH params AS ({0}), overview AS ({1}) "
+                    "SELECT overview.id, params.oid "
+                    "FROM overview, params ORDER BY params.param_index;").format(
+                        measurement_parameters_queries.insert_measurement_params_statement(uuid, data_items),
+                        new_measurement)
+        if snapshot is not None and snapshot.station_hash is not None:
+            statement = snapshot_store_queries.insert_statement(conn, snapshot) + statement
+        add_sample = sample_info_queries.add_sample_statement()
+        if add_sample is not None:
+            statement = add_sample + statement
+
+        res = execute_query(conn, statement)
+        if len(data_items) == 0:
+            return res[0][0], []
+        return res[0][0], [row[1] for row in res]
+
+    @staticmethod
+    def _to_json_bytea(value):
+        if value is None:
+            return None
+        return psycopg2.Binary(str(json.dumps(value)).encode('ascii'))
 
     def update_measurement(conn, meas_uuid,
                            stop_time=None, metadata=None, snapshot=None,
@@ -137,41 +246,215 @@ class measurement_overview_queries:
             keywords (list) : keywords describing the measurement
             completed (bool) : tell that the measurement is completed.
         '''
-        var_pairs = []
-        if stop_time is not None:
-            var_pairs.append(('stop_time',
-                              psycopg2.sql.SQL("TO_TIMESTAMP({})").format(psycopg2.sql.Literal(stop_time))
-                              ))
-        if metadata is not None:
-            var_pairs.append(('metadata',
-                              psycopg2.Binary(str(json.dumps(metadata)).encode('ascii'))
-                              ))
-        if snapshot is not None:
-            var_pairs.append(('snapshot',
-                              psycopg2.Binary(str(json.dumps(snapshot)).encode('ascii'))
-                              ))
-        if keywords is not None:
-            var_pairs.append(('keywords', psycopg2.extras.Json(keywords)))
-        if data_size is not None:
-            var_pairs.append(('data_size', data_size))
-        if data_synchronized is not None:
-            var_pairs.append(('data_synchronized', str(data_synchronized)))
-        if completed is not None:
-            var_pairs.append(('completed', str(completed)))
-        if table_synchronized is not None:
-            var_pairs.append(('table_synchronized', str(table_synchronized)))
-        var_names = [name for name, value in var_pairs]
-        var_values = [value for name, value in var_pairs]
-
-        condition = ('uuid', meas_uuid)
-        update_table(conn, measurement_overview_queries.table_name, var_names, var_values, condition)
+        # (name, SQL type, value expression, value)
+        columns = [
+            ('stop_time', 'double precision', 'TO_TIMESTAMP({})', stop_time),
+            ('metadata', 'bytea', '{}', measurement_overview_queries._to_json_bytea(metadata)),
+            ('snapshot', 'bytea', '{}', measurement_overview_queries._to_json_bytea(snapshot)),
+            ('keywords', 'jsonb', '{}', psycopg2.extras.Json(keywords) if keywords is not None else None),
+            ('data_size', 'int', '{}', int(data_size) if data_size is not None else None),
+            ('data_synchronized', 'bool', '{}', data_synchronized),
+            ('completed', 'bool', '{}', completed),
+            ('table_synchronized', 'bool', '{}', table_synchronized),
+            ]
+        # a statement is prepared per combination of updated columns.
+        mask = 0
+        arg_types = ['bigint']
+        args = [meas_uuid]
+        assignments = []
+        for i, (name, sql_type, expression, value) in enumerate(columns):
+            if value is None:
+                continue
+            mask |= 1 << i
+            arg_types.append(sql_type)
+            args.append(value)
+            assignments.append(f"{name} = " + expression.format(f"${len(args)}"))
+        if len(assignments) == 0:
+            return
+        if table_synchronized is False:
+            # the complete row must be synchronized. This changes the statement.
+            mask |= 1 << len(columns)
+            assignments.append("sync_columns = NULL")
+
+        statement = (f"UPDATE {measurement_overview_queries.table_name} "
+                     f"SET {', '.join(assignments)} WHERE uuid = $1")
+        execute_prepared(conn, f'update_overview_{mask}', arg_types, statement, args, fetch=False)
+
+    @staticmethod
+    def update_sync_columns(conn, meas_uuid, values):
+        '''
+        Updates columns of the sync_column_groups. Only the changed groups of columns
+        are sent with the next sync of the table.
+
+        Args:
+            meas_uuid (int) : record that needs to be updated
+            values (dict<str, any>) : names and values of the columns
+        '''
+        mask = 0
+        for name in values:
+            bits = [bit for bit, names in measurement_overview_queries.sync_column_groups.items()
+                    if name in names]
+            if len(bits) == 0:
+                raise ValueError(f"Column '{name}' is not in a sync column group")
+            mask |= bits[0]
+
+        # NOTE: sync_columns stays NULL when the complete row must be synchronized.
+        statement = psycopg2.sql.SQL(
+                "UPDATE {} SET {}, table_synchronized = False, sync_columns = sync_columns | {} "
+                "WHERE uuid = {};").format(
+            psycopg2.sql.SQL(measurement_overview_queries.table_name),
+            psycopg2.sql.SQL(', ').join(
+                psycopg2.sql.SQL("{} = {}").format(psycopg2.sql.Identifier(name), psycopg2.sql.Literal(value))
+                for name, value in values.items()),
+            psycopg2.sql.Literal(mask),
+            psycopg2.sql.Literal(meas_uuid))
+        execute_statement(conn, statement)
+
+    @staticmethod
+    def update_snapshot(conn, meas_uuid, snapshot):
+        '''
+        Stores the snapshot of a measurement that has already been registered.
+
+        Args:
+            meas_uuid (int) : record that needs to be updated
+            snapshot (stored_snapshot) : encoded snapshot
+        '''
+        statement = psycopg2.sql.SQL('')
+        var_pairs = [
+            ('snapshot', psycopg2.Binary(snapshot.data)),
+            ('table_synchronized', False),
+            ('sync_columns', None),
+            ]
+        if snapshot.data_format is not None:
+            var_pairs.append(('snapshot_format', snapshot.data_format))
+        if snapshot.station_hash is not None:
+            statement += snapshot_store_queries.insert_statement(conn, snapshot)
+            var_pairs.append(('station_snapshot_hash', snapshot.station_hash))
+
+        statement += psycopg2.sql.SQL("UPDATE {} SET {} WHERE uuid = {};").format(
+            psycopg2.sql.SQL(measurement_overview_queries.table_name),
+            psycopg2.sql.SQL(', ').join(
+                psycopg2.sql.SQL("{} = {}").format(psycopg2.sql.Identifier(name), psycopg2.sql.Literal(value))
+                for name, value in var_pairs),
+            psycopg2.sql.Literal(meas_uuid))
+        execute_statement(conn, statement)
 
     @staticmethod
     def is_completed(conn, uuid):
-        completed =  execute_query(conn,
-            "SELECT completed FROM {} where uuid = {};".format(measurement_overview_queries.table_name, uuid))
+        completed = execute_prepared(conn, 'is_completed', ('bigint', ),
+            "SELECT completed FROM {} WHERE uuid = $1".format(measurement_overview_queries.table_name),
+            (uuid, ))
         return completed[0][0]
 
+    @staticmethod
+    def get_sync_state(conn, uuid):
+        '''
+        Returns the completed flag and the committed write cursors of all parameters of a measurement
+        with a single query.
+
+        Args:
+            uuid (int) : uuid of the measurement
+
+        Returns:
+            completed, write_cursors (bool, list[int]) : write cursors ordered by parameter index.
+                The list is empty for measurements in the old format.
+        '''
+        res = execute_prepared(conn, 'get_sync_state', ('bigint', ),
+            "SELECT completed, ARRAY(SELECT write_cursor FROM measurement_parameters "
+            "WHERE exp_uuid = $1 ORDER BY param_index) "
+            "FROM {} WHERE uuid = $1".format(measurement_overview_queries.table_name),
+            (uuid, ))
+        return res[0]
+
+class snapshot_store_queries:
+    '''
+    table with station snapshots. Every unique station snapshot is stored once.
+    The measurement overview refers to it with column station_snapshot_hash.
+    If base_hash is not NULL, then data contains a JSON patch on the snapshot with base_hash.
+    '''
+    table_name = 'snapshot_store'
+    # hashes of snapshots stored in the database per connection dsn.
+    _stored_hashes = {}
+
+    @staticmethod
+    def generate_table(conn):
+        statement = "CREATE TABLE if not EXISTS {} (".format(snapshot_store_queries.table_name)
+        statement += "hash text NOT NULL primary key,"
+        statement += "format text,"
+        statement += "base_hash text,"
+        statement += "data BYTEA NOT NULL );"
+
+        execute_statement(conn, statement)
+
+    @staticmethod
+    def insert_statement(conn, snapshot):
+        '''
+        Returns statement to store the station snapshot and its base if they have not been stored yet.
+
+        Args:
+            snapshot (stored_snapshot) : encoded snapshot with station hash
+        '''
+        stored_hashes = snapshot_store_queries._stored_hashes.get(conn.dsn, set())
+        rows = []
+        if snapshot.base_hash is not None and snapshot.base_hash not in stored_hashes:
+            rows.append((snapshot.base_hash, snapshot.base_format, None,
+                         psycopg2.Binary(snapshot.base_data)))
+        if snapshot.station_hash not in stored_hashes:
+            rows.append((snapshot.station_hash, snapshot.station_format, snapshot.base_hash,
+                         psycopg2.Binary(snapshot.station_data)))
+        if len(rows) == 0:
+            return psycopg2.sql.SQL('')
+        var_names = ('hash', 'format', 'base_hash', 'data')
+        return insert_rows_statement(snapshot_store_queries.table_name, var_names, rows,
+            custom_statement='ON CONFLICT DO NOTHING') + psycopg2.sql.SQL(';')
+
+    @staticmethod
+    def set_stored(conn, snapshot):
+        '''
+        Registers that the station snapshot and its base have been committed to the database.
+        '''
+        stored_hashes = snapshot_store_queries._stored_hashes.setdefault(conn.dsn, set())
+        stored_hashes.add(snapshot.station_hash)
+        if snapshot.base_hash is not None:
+            stored_hashes.add(snapshot.base_hash)
+
+    @staticmethod
+    def get(conn, station_hash):
+        '''
+        Returns:
+            format, data, base_hash (str, bytes, str) : stored snapshot or (None, None, None) if not found.
+        '''
+        res = execute_query(conn,
+            psycopg2.sql.SQL("SELECT format, data, base_hash FROM {} WHERE hash = {};").format(
+                psycopg2.sql.SQL(snapshot_store_queries.table_name),
+                psycopg2.sql.Literal(station_hash)))
+        if len(res) == 0:
+            return None, None, None
+        return res[0][0], res[0][1].tobytes(), res[0][2]
+
+    @staticmethod
+    def copy(conn_src, conn_dest, station_hash):
+        '''
+        Copies the snapshot and its base from source to destination database
+        if it does not exist there.
+        '''
+        exists = execute_query(conn_dest,
+            psycopg2.sql.SQL("SELECT 1 FROM {} WHERE hash = {};").format(
+                psycopg2.sql.SQL(snapshot_store_queries.table_name),
+                psycopg2.sql.Literal(station_hash)))
+        if len(exists) > 0:
+            return
+        data_format, data, base_hash = snapshot_store_queries.get(conn_src, station_hash)
+        if data is None:
+            raise Exception(f'Snapshot {station_hash} not found')
+        if base_hash is not None:
+            snapshot_store_queries.copy(conn_src, conn_dest, base_hash)
+        insert_row_in_table(conn_dest, snapshot_store_queries.table_name,
+            ('hash', 'format', 'base_hash', 'data'),
+            (station_hash, data_format, base_hash, psycopg2.Binary(data)),
+            custom_statement='ON CONFLICT DO NOTHING')
+
+
 class data_table_queries:
     '''
     these tables contain the raw data of every measurement parameter.
@@ -260,6 +543,14 @@ class measurement_parameters_queries:
         statement += "CREATE INDEX IF NOT EXISTS oid_index ON measurement_parameters USING BTREE (oid) ;"
         execute_statement(conn, statement)
 
+        add_missing_columns(conn, 'measurement_parameters', {
+            'dtype': 'text', # numpy dtype of the data. NULL: float64
+            'chunk_size': 'INT', # number of values per chunk in measurement_chunks. NULL: not chunked
+            })
+        add_missing_columns(conn, 'measurement_parameters', {
+            'sync_checksum': 'BIGINT', # crc32 of the data up to write_cursor copied by the sync. NULL: unknown
+            })
+
     @staticmethod
     def insert_measurement_params(conn, exp_uuid, data_items):
         '''
@@ -269,31 +560,189 @@ class measurement_parameters_queries:
             exp_uuid (int) : unique id of dataset
             data_items (list[m_param_raw]) : raw format of the measurement parameter
         '''
+        statement = measurement_parameters_queries.insert_measurement_params_statement(exp_uuid, data_items)
+        execute_query(conn, statement)
+
+    @staticmethod
+    def insert_measurement_params_statement(exp_uuid, data_items):
+        '''
+        generate the statement to insert all the parameters with a single multi-row insert.
+        A large object is created for every parameter without oid.
+
+        Args:
+            exp_uuid (int) : unique id of dataset
+            data_items (list[m_param_raw]) : raw format of the measurement parameter
+
+        Returns:
+            sql.Composed : insert statement returning param_index and oid.
+        '''
         var_names = (
             "exp_uuid","param_index",
             "param_id", "nth_set", "nth_dim", "param_id_m_param",
             "setpoint", "setpoint_local", "name_gobal", "name",
             "label", "unit", "depencies", "shape",
-            "write_cursor", "total_size", "oid")
+            "write_cursor", "total_size", "oid", "dtype", "chunk_size")
 
+        rows = []
         for index, item in enumerate(data_items):
-            var_values = (
+            oid = item.oid if item.oid is not None else psycopg2.sql.SQL('lo_create(0)')
+            # float64 is stored as NULL for compatibility with older versions.
+            dtype = item.dtype if item.dtype != 'float64' else None
+            rows.append((
                 exp_uuid, index,
                 item.param_id, item.nth_set, item.nth_dim,
                 item.param_id_m_param, item.setpoint, item.setpoint_local,
                 item.name_gobal, item.name, item.label,
                 item.unit, psycopg2.extras.Json(item.dependency), psycopg2.extras.Json(item.shape),
-                0, item.size, item.oid)
+                0, item.size, oid, dtype, item.chunk_size))
 
-            insert_row_in_table(conn, 'measurement_parameters', var_names, var_values)
+        return insert_rows_statement('measurement_parameters', var_names, rows,
+                                     returning=('param_index', 'oid'))
 
     @staticmethod
-    def update_cursors_in_meas_tab(conn, exp_uuid, data_items):
-        statement = ""
-        for index, item in enumerate(data_items):
-            statement += (
-                    "UPDATE measurement_parameters "
-                    f"SET write_cursor = {item.data_buffer.cursor} "
-                    f"WHERE exp_uuid = {exp_uuid} AND param_index = {index}; ")
+    def update_cursors_in_meas_tab(conn, exp_uuid, data_items, flag_data_unsynchronized=False):
+        '''
+        update the write cursors of all parameters of a measurement with a single statement.
+
+        Args:
+            exp_uuid (int) : unique id of dataset
+            data_items (list[m_param_raw]) : raw format of the measurement parameters
+            flag_data_unsynchronized (bool) : set data_synchronized to False in the measurement overview
+                in the same round trip.
+        '''
+        measurement_parameters_queries.update_cursors(
+                conn, exp_uuid,
+                [item.data_buffer.cursor_db for item in data_items],
+                flag_data_unsynchronized)
 
+    @staticmethod
+    def update_cursors(conn, exp_uuid, cursors, flag_data_unsynchronized=False):
+        '''
+        update the write cursors of all parameters of a measurement with a single statement.
+
+        Args:
+            exp_uuid (int) : unique id of dataset
+            cursors (list[int]) : write cursor per parameter index
+            flag_data_unsynchronized (bool) : set data_synchronized to False in the measurement overview
+                in the same round trip.
+        '''
+        cursors = [int(cursor) for cursor in cursors]
+        param_indices = list(range(len(cursors)))
+        # NOTE: rows with unchanged cursor are not updated. This avoids dead rows in the table.
+        statement = (
+                "UPDATE measurement_parameters AS p "
+                "SET write_cursor = c.write_cursor "
+                "FROM unnest($2::int[], $3::int[]) AS c(param_index, write_cursor) "
+                "WHERE p.exp_uuid = $1 AND p.param_index = c.param_index "
+                "AND p.write_cursor IS DISTINCT FROM c.write_cursor ")
+        if flag_data_unsynchronized:
+            # data-modifying statement in WITH is always executed.
+            statement = (
+                    f"WITH cursors AS ({statement}) "
+                    f"UPDATE {measurement_overview_queries.table_name} "
+                    "SET data_synchronized = False "
+                    "WHERE uuid = $1 AND data_synchronized IS NOT False ")
+            name = 'update_cursors_flag_unsync'
+        else:
+            name = 'update_cursors'
+
+        execute_prepared(conn, name, ('bigint', 'int[]', 'int[]'), statement,
+                         (exp_uuid, param_indices, cursors), fetch=False)
+
+    @staticmethod
+    def update_sync_cursor(conn, exp_uuid, param_index, cursor, checksum):
+        '''
+        update the write cursor and the checksum of a parameter copied by the sync.
+
+        Args:
+            exp_uuid (int) : unique id of dataset
+            param_index (int) : index of the parameter
+            cursor (int) : write cursor
+            checksum (int) : crc32 of the data up to the write cursor or None if unknown.
+        '''
+        statement = (
+                "UPDATE measurement_parameters "
+                "SET write_cursor = $3, sync_checksum = $4 "
+                "WHERE exp_uuid = $1 AND param_index = $2 ")
+        execute_prepared(conn, 'update_sync_cursor', ('bigint', 'int', 'int', 'bigint'), statement,
+                         (exp_uuid, param_index, int(cursor), checksum), fetch=False)
+
+
+class measurement_chunks_queries:
+    '''
+    table with the large objects of parameters that are stored in chunks.
+    The first chunk is the large object in measurement_parameters.
+    '''
+    table_name = 'measurement_chunks'
+
+    @staticmethod
+    def generate_table(conn):
+        statement = "CREATE TABLE if not EXISTS {} (".format(measurement_chunks_queries.table_name)
+        statement += "exp_uuid BIGINT NOT NULL, "
+        statement += "param_index INT NOT NULL, "
+        statement += "chunk_index INT NOT NULL, "
+        statement += "oid INT NOT NULL, "
+        statement += "primary key (exp_uuid, param_index, chunk_index));"
         execute_statement(conn, statement)
+
+    @staticmethod
+    def create_chunks(conn, exp_uuid, chunked_params):
+        '''
+        Registers the chunks of the parameters and creates the large objects for the chunks.
+
+        Args:
+            exp_uuid (int) : unique id of dataset
+            chunked_params (list[tuple[int, int, int]]) : param_index, oid of first chunk
+                and number of chunks of the chunked parameters.
+
+        Returns:
+            dict[int, list[int]] : oids of the chunks per param_index
+        '''
+        statement = psycopg2.sql.SQL(
+            "INSERT INTO {0} (exp_uuid, param_index, chunk_index, oid) "
+            "SELECT {1}, c.param_index, i, CASE WHEN i = 0 THEN c.oid ELSE lo_create(0) END "
+            "FROM (VALUES {2}) AS c(param_index, oid, n_chunks), generate_series(0, c.n_chunks-1) AS i "
+            "RETURNING param_index, chunk_index, oid;").format(
+                psycopg2.sql.SQL(measurement_chunks_queries.table_name),
+                psycopg2.sql.Literal(exp_uuid),
+                psycopg2.sql.SQL(', ').join(
+                    psycopg2.sql.SQL("({}, {}, {})").format(*map(psycopg2.sql.Literal, param))
+                    for param in chunked_params))
+        res = execute_query(conn, statement)
+        return measurement_chunks_queries._to_dict(res)
+
+    @staticmethod
+    def get_chunks(conn, exp_uuid):
+        '''
+        Returns:
+            dict[int, list[int]] : oids of the chunks per param_index
+        '''
+        res = execute_query(conn,
+            psycopg2.sql.SQL("SELECT param_index, chunk_index, oid FROM {} WHERE exp_uuid = {} "
+                             "ORDER BY param_index, chunk_index;").format(
+                psycopg2.sql.SQL(measurement_chunks_queries.table_name),
+                psycopg2.sql.Literal(exp_uuid)))
+        return measurement_chunks_queries._to_dict(res)
+
+    @staticmethod
+    def get_chunks_many(conn, exp_uuids):
+        '''
+        Returns:
+            dict[int, dict[int, list[int]]] : oids of the chunks per param_index per exp_uuid
+        '''
+        res = execute_query(conn,
+            psycopg2.sql.SQL("SELECT exp_uuid, param_index, chunk_index, oid FROM {} "
+                             "WHERE exp_uuid = ANY(%s::bigint[]);").format(
+                psycopg2.sql.SQL(measurement_chunks_queries.table_name)),
+            placeholders=([int(exp_uuid) for exp_uuid in exp_uuids], ))
+        rows = {}
+        for exp_uuid, param_index, chunk_index, oid in res:
+            rows.setdefault(exp_uuid, []).append((param_index, chunk_index, oid))
+        return {exp_uuid: measurement_chunks_queries._to_dict(res) for exp_uuid, res in rows.items()}
+
+    @staticmethod
+    def _to_dict(res):
+        chunks = {}
+        for param_index, chunk_index, oid in sorted(res):
+            chunks.setdefault(param_index, []).append(oid)
+        return chunks
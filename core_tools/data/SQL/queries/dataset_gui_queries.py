@@ -2,26 +2,23 @@ from typing import List
 from dataclasses import dataclass
 import datetime
 
-from core_tools.data.SQL.SQL_common_commands import update_table
+from core_tools.data.SQL.SQL_common_commands import execute_query, execute_prepared
 from core_tools.data.SQL.SQL_connection_mgr import SQL_database_manager
+from core_tools.data.SQL.queries.dataset_creation_queries import measurement_overview_queries
 
 
 class alter_dataset:
 
     @staticmethod
     def update_name(uuid, name):
-        conn = SQL_database_manager().conn_local
-        update_table(conn, 'global_measurement_overview',
-                     ('exp_name', 'table_synchronized'), (name, False),
-                     condition=('uuid', uuid))
+        conn = SQL_database_manager().get_connection('metadata')
+        measurement_overview_queries.update_sync_columns(conn, uuid, {'exp_name': name})
         conn.commit()
 
     @staticmethod
     def star_measurement(uuid, state):
-        conn = SQL_database_manager().conn_local
-        update_table(conn, 'global_measurement_overview',
-                     ('starred', 'table_synchronized'), (state, False),
-                     condition=('uuid', uuid))
+        conn = SQL_database_manager().get_connection('metadata')
+        measurement_overview_queries.update_sync_columns(conn, uuid, {'starred': state})
         conn.commit()
 
 
@@ -56,17 +53,11 @@ class query_for_samples():
         else:
             statement += ";"
 
-        cur = SQL_database_manager().conn_local.cursor()
-        cur.execute(statement)
-        res = cur.fetchall()
+        res = execute_query(SQL_database_manager().get_connection('reader'), statement)
         result = set(sum(res, ()))
-        cur.close()
 
-        cur = SQL_database_manager().conn_remote.cursor()
-        cur.execute(statement)
-        res = cur.fetchall()
+        res = execute_query(SQL_database_manager().get_connection('reader', remote=True), statement)
         result |= set(sum(res, ()))
-        cur.close()
         return sorted(list(result))
 
 
@@ -178,21 +169,30 @@ class query_for_measurement_results:
     @staticmethod
     def detect_new_meaurements(max_measurement_id=None, remote=False,
                                project=None, set_up=None, sample=None):
-        statement = "SELECT max(id) from global_measurement_overview"
+        # a statement is prepared per combination of filters.
+        filters = [
+            ('id >= {}', 'int', max_measurement_id),
+            ('sample = {}', 'text', sample),
+            ('set_up = {}', 'text', set_up),
+            ('project = {}', 'text', project),
+            ]
+        mask = 0
+        arg_types = []
+        args = []
         where = []
-        if max_measurement_id is not None:
-            where.append(f"id >= {max_measurement_id}")
-        if sample is not None:
-            where.append(f"sample =  '{sample}'")
-        if set_up is not None:
-            where.append(f"set_up = '{set_up}'")
-        if project is not None:
-            where.append(f"project = '{project}'")
+        for i, (condition, sql_type, value) in enumerate(filters):
+            if value is None:
+                continue
+            mask |= 1 << i
+            arg_types.append(sql_type)
+            args.append(value)
+            where.append(condition.format(f"${len(args)}"))
+        statement = "SELECT max(id) FROM global_measurement_overview"
         if len(where) > 0:
             statement += " WHERE " + ' AND '.join(where)
-        statement += " ;"
 
-        res = query_for_measurement_results._execute(statement, remote)
+        connection = SQL_database_manager().get_connection('reader', remote=remote)
+        res = execute_prepared(connection, f'detect_new_measurements_{mask}', arg_types, statement, args)
 
         update = False
         max_id = res[0][0]
@@ -204,12 +204,8 @@ class query_for_measurement_results:
 
     @staticmethod
     def _execute(statement, remote):
-        connection = SQL_database_manager().conn_remote if remote else SQL_database_manager().conn_local
-        cur = connection.cursor()
-        cur.execute(statement)
-        res = cur.fetchall()
-        cur.close()
-        return res
+        connection = SQL_database_manager().get_connection('reader', remote=remote)
+        return execute_query(connection, statement)
 
     @staticmethod
     def _to_measurement_results(res):
@@ -1,14 +1,20 @@
 import json
 import numpy as np
 
-from core_tools.data.SQL.SQL_common_commands import execute_query, select_elements_in_table
+from core_tools.data.SQL.SQL_common_commands import execute_query, execute_prepared, select_elements_in_table
 from core_tools.data.ds.data_set_raw import data_set_raw, m_param_raw
 
-from core_tools.data.SQL.buffer_writer import buffer_reader
+from core_tools.data.SQL.buffer_writer import buffer_reader, chunked_buffer_reader, to_dtype
+from core_tools.data.SQL.queries.dataset_creation_queries import snapshot_store_queries, measurement_chunks_queries
+from core_tools.data.SQL.snapshot_storage import stored_snapshot
 
 
 class load_ds_queries:
     table_name = "global_measurement_overview"
+    var_names_parameters = ("param_id", "nth_set", "nth_dim", "param_id_m_param",
+                            "setpoint", "setpoint_local", "name_gobal", "name", "label",
+                            "unit", "depencies", "shape", "total_size", "oid",
+                            "dtype", "chunk_size", "write_cursor")
 
     @staticmethod
     def check_uuid(conn, exp_uuid):
@@ -27,8 +33,8 @@ class load_ds_queries:
 
     @staticmethod
     def id_to_uuid(conn, exp_id):
-        statement = "SELECT id, uuid FROM {} WHERE id = {};".format(load_ds_queries.table_name, exp_id);
-        return_data = execute_query(conn, statement)
+        statement = "SELECT id, uuid FROM {} WHERE id = $1".format(load_ds_queries.table_name)
+        return_data = execute_prepared(conn, 'id_to_uuid', ('int', ), statement, (int(exp_id), ))
 
         if len(return_data) != 0 and len(return_data[0]) == 2:
             return return_data[0][1]
@@ -43,52 +49,170 @@ class load_ds_queries:
         return return_data[0][0]
 
     @staticmethod
-    def get_dataset_raw(conn, exp_uuid):
+    def get_dataset_raw(conn, exp_uuid, remote=False):
+        '''
+        Args:
+            conn (psycopg2.connection) : connection to the database of the measurement
+            exp_uuid (int) : uuid of the measurement
+            remote (bool) : measurement is in the remote database
+        '''
         data = select_elements_in_table(conn, load_ds_queries.table_name, var_names=('*',),
             where = ("uuid", exp_uuid))[0]
 
+        ds = load_ds_queries.__to_dataset_raw(conn, data)
+        # NOTE: column sync_location is abused for migration to new format
+        new_format = data['sync_location'] == 'New measurement_parameters'
+        ds.measurement_parameters_raw = load_ds_queries.__get_dataset_raw_dataclasses(
+                conn, ds.SQL_datatable, new_format, ds.exp_uuid, remote)
+        return ds
+
+    @staticmethod
+    def get_datasets_raw(conn, exp_uuids, remote=False):
+        '''
+        Returns the raw datasets of multiple measurements. The measurements, parameters and chunks
+        are fetched with a single query each.
+
+        Args:
+            exp_uuids (list[int]) : uuids of the measurements
+            remote (bool) : conn is the connection to the remote database
+
+        Returns:
+            dict[int, data_set_raw] : raw datasets of the measurements found in the database.
+        '''
+        exp_uuids = [int(exp_uuid) for exp_uuid in exp_uuids]
+        overview = execute_query(conn,
+            "SELECT * FROM {} WHERE uuid = ANY(%s::bigint[]);".format(load_ds_queries.table_name),
+            dict_cursor=True, placeholders=(exp_uuids, ))
+
+        datasets = {}
+        new_format = []
+        snapshot_cache = {}
+        for data in overview:
+            ds = load_ds_queries.__to_dataset_raw(conn, data, snapshot_cache)
+            datasets[ds.exp_uuid] = ds
+            # NOTE: column sync_location is abused for migration to new format
+            if data['sync_location'] == 'New measurement_parameters':
+                new_format.append(ds.exp_uuid)
+            else:
+                ds.measurement_parameters_raw = load_ds_queries.__get_dataset_raw_dataclasses(
+                        conn, ds.SQL_datatable, False, ds.exp_uuid, remote)
+
+        if new_format:
+            return_data = execute_query(conn,
+                "SELECT exp_uuid, {} FROM measurement_parameters WHERE exp_uuid = ANY(%s::bigint[]) "
+                "ORDER BY exp_uuid, param_index;".format(", ".join(load_ds_queries.var_names_parameters)),
+                placeholders=(new_format, ))
+            rows = {}
+            for row in return_data:
+                rows.setdefault(row[0], []).append(row[1:])
+            chunked = [exp_uuid for exp_uuid, ds_rows in rows.items()
+                       if any(row[-2] is not None for row in ds_rows)]
+            chunks = measurement_chunks_queries.get_chunks_many(conn, chunked) if chunked else {}
+            for exp_uuid in new_format:
+                datasets[exp_uuid].measurement_parameters_raw = load_ds_queries.__to_dataclasses(
+                        rows.get(exp_uuid, []), chunks.get(exp_uuid), remote)
+
+        return datasets
+
+    @staticmethod
+    def __to_dataset_raw(conn, data, snapshot_cache=None):
+        # creates the raw dataset without parameters from a row of the measurement overview.
         if data['stop_time'] is None:
             data['stop_time'] = data['start_time']
 
-        if data['snapshot'] is not None:
-            data['snapshot'] = json.loads(data['snapshot'].tobytes())
-
         if data['metadata'] is not None:
             data['metadata'] = json.loads(data['metadata'].tobytes())
 
-        ds = data_set_raw(exp_id=data['id'], exp_uuid=data['uuid'], exp_name=data['exp_name'],
+        return data_set_raw(exp_id=data['id'], exp_uuid=data['uuid'], exp_name=data['exp_name'],
             set_up = data['set_up'], project = data['project'], sample = data['sample'],
             UNIX_start_time=data['start_time'].timestamp(), UNIX_stop_time=data['stop_time'].timestamp(),
-            SQL_datatable=data['exp_data_location'],snapshot=data['snapshot'], metadata=data['metadata'],
+            SQL_datatable=data['exp_data_location'], metadata=data['metadata'],
+            snapshot_encoded=load_ds_queries.get_snapshot(conn, data, snapshot_cache),
             keywords=data['keywords'], completed=data['completed'], starred=data['starred'], )
 
-        # NOTE: column sync_location is abused for migration to new format
-        new_format = data['sync_location'] == 'New measurement_parameters'
-        exp_uuid = data['uuid']
-        ds.measurement_parameters_raw = load_ds_queries.__get_dataset_raw_dataclasses(
-                conn, ds.SQL_datatable, new_format, exp_uuid)
-        return ds
+    @staticmethod
+    def get_snapshot(conn, data, snapshot_cache=None):
+        '''
+        Returns the stored snapshot. The snapshot is decompressed when it is decoded.
+
+        Args:
+            data (dict[str, Any]) : row of the measurement overview table
+            snapshot_cache (dict[str, tuple]) : stored station snapshots that have already been read.
+
+        Returns:
+            stored_snapshot or None
+        '''
+        if data['snapshot'] is None:
+            return None
+        snapshot = stored_snapshot(data['snapshot'].tobytes(),
+                                   data.get('snapshot_format'),
+                                   data.get('station_snapshot_hash'))
+        if snapshot.station_hash is not None:
+            snapshot.station_format, snapshot.station_data, snapshot.base_hash = \
+                load_ds_queries.__get_stored_snapshot(conn, snapshot.station_hash, snapshot_cache)
+        if snapshot.base_hash is not None:
+            snapshot.base_format, snapshot.base_data, _ = \
+                load_ds_queries.__get_stored_snapshot(conn, snapshot.base_hash, snapshot_cache)
+        return snapshot
+
+    @staticmethod
+    def __get_stored_snapshot(conn, station_hash, snapshot_cache):
+        if snapshot_cache is None:
+            return snapshot_store_queries.get(conn, station_hash)
+        # many measurements share the same base snapshot.
+        if station_hash not in snapshot_cache:
+            snapshot_cache[station_hash] = snapshot_store_queries.get(conn, station_hash)
+        return snapshot_cache[station_hash]
 
     @staticmethod
-    def __get_dataset_raw_dataclasses(conn, table_name, new_format, exp_uuid):
-        var_names =    ("param_id", "nth_set", "nth_dim", "param_id_m_param",
-                    "setpoint", "setpoint_local", "name_gobal", "name", "label",
-                    "unit", "depencies", "shape", "total_size", "oid")
+    def get_parameter_rows(conn, exp_uuid, var_names):
+        '''
+        Returns the rows of the parameters of a measurement ordered by parameter index.
+
+        Args:
+            exp_uuid (int) : uuid of the measurement
+            var_names (tuple[str]) : columns to return
+        '''
+        statement = ("SELECT {} FROM measurement_parameters WHERE exp_uuid = $1 "
+                     "ORDER BY param_index ASC").format(", ".join(var_names))
+        # the statement is prepared per set of columns.
+        name = 'get_parameter_rows_{}'.format(abs(hash(var_names)))
+        return execute_prepared(conn, name, ('bigint', ), statement, (exp_uuid, ))
 
+    @staticmethod
+    def __get_dataset_raw_dataclasses(conn, table_name, new_format, exp_uuid, remote):
         if new_format:
-            return_data = select_elements_in_table(conn, 'measurement_parameters', var_names,
-                                                   where=("exp_uuid", exp_uuid),
-                                                   order_by=("param_index", "ASC"),
-                                                   dict_cursor=False)
+            return_data = load_ds_queries.get_parameter_rows(
+                    conn, exp_uuid, load_ds_queries.var_names_parameters)
+            chunks = None
+            if any(row[-2] is not None for row in return_data):
+                chunks = measurement_chunks_queries.get_chunks(conn, exp_uuid)
         else:
-            return_data = select_elements_in_table(conn, table_name, var_names, dict_cursor=False)
+            # old format only stores float64 in a single large object
+            return_data = select_elements_in_table(conn, table_name, load_ds_queries.var_names_parameters[:-3],
+                                                   dict_cursor=False)
+            return_data = [row + (None, None, None) for row in return_data]
+            chunks = None
+
+        return load_ds_queries.__to_dataclasses(return_data, chunks, remote)
 
+    @staticmethod
+    def __to_dataclasses(return_data, chunks, remote):
+        # NOTE: the data is read when it is accessed with the reader connection of the accessing thread.
         data_raw = []
-        for row in return_data:
-            raw_data_row = m_param_raw(*row)
-            if np.prod(raw_data_row.shape) >= 2**28:
-                raise Exception(f"Dataset too big. Var '{raw_data_row.name}'{tuple(raw_data_row.shape)} >= 2 GB.")
-            raw_data_row.data_buffer = buffer_reader(conn, raw_data_row.oid, raw_data_row.shape)
+        for param_index, row in enumerate(return_data):
+            write_cursor = row[-1]
+            raw_data_row = m_param_raw(*row[:-3], dtype=to_dtype(row[-3]).name, chunk_size=row[-2])
+            if raw_data_row.chunk_size is not None:
+                raw_data_row.data_buffer = chunked_buffer_reader(
+                        chunks[param_index], raw_data_row.shape,
+                        raw_data_row.dtype, raw_data_row.chunk_size, write_cursor=write_cursor, remote=remote)
+            else:
+                if np.prod(raw_data_row.shape) * np.dtype(raw_data_row.dtype).itemsize >= 2**31:
+                    raise Exception(f"Dataset too big. Var '{raw_data_row.name}'{tuple(raw_data_row.shape)} >= 2 GB.")
+                raw_data_row.data_buffer = buffer_reader(raw_data_row.oid, raw_data_row.shape,
+                                                         raw_data_row.dtype, write_cursor=write_cursor,
+                                                         remote=remote)
             data_raw.append(raw_data_row)
 
         return data_raw
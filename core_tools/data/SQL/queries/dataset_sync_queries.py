@@ -1,11 +1,85 @@
 from core_tools.data.SQL.SQL_common_commands import execute_statement, execute_query
-from core_tools.data.SQL.SQL_common_commands import select_elements_in_table, insert_row_in_table, update_table
-from core_tools.data.SQL.queries.dataset_creation_queries import data_table_queries, sample_info_queries
+from core_tools.data.SQL.SQL_common_commands import (
+        select_elements_in_table, insert_row_in_table, update_table, upsert_rows, update_rows)
+from core_tools.data.SQL.queries.dataset_creation_queries import (
+        data_table_queries, sample_info_queries, snapshot_store_queries, measurement_overview_queries,
+        measurement_parameters_queries, measurement_chunks_queries)
+from core_tools.data.SQL.buffer_writer import to_dtype, get_n_chunks
+from core_tools.data.SQL.lobject_transfer import lobject_transfer, transfer_settings, copy_task, read_checksum
 
 import psycopg2, json
-import numpy as np
+import functools
+import logging
+import select
+
+logger = logging.getLogger(__name__)
+
+
+class SyncError(Exception):
+    '''
+    The data of a measurement cannot be synchronized.
+    '''
+
 
 class sync_mgr_queries:
+    # channel for the notifications of measurements that need to be synchronized.
+    notify_channel = "core_tools_sync"
+
+    @staticmethod
+    def create_sync_triggers(conn):
+        '''
+        Creates the triggers that notify the sync manager of changes.
+        A notification is sent when a measurement is flagged as not synchronized and
+        when write cursors are updated.
+        '''
+        statement = (
+            "CREATE OR REPLACE FUNCTION core_tools_notify_sync() RETURNS trigger AS $$ "
+            "BEGIN "
+            # NOTE: notifications with the same payload are sent once per transaction.
+            f"PERFORM pg_notify('{sync_mgr_queries.notify_channel}', ''); "
+            "RETURN NULL; "
+            "END; $$ LANGUAGE plpgsql; "
+            "DO $$ BEGIN "
+            "IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'notify_sync' "
+            "               AND tgrelid = 'global_measurement_overview'::regclass) THEN "
+            "  CREATE TRIGGER notify_sync AFTER INSERT OR UPDATE ON global_measurement_overview "
+            "  FOR EACH ROW WHEN (NEW.data_synchronized = False OR NEW.table_synchronized = False) "
+            "  EXECUTE PROCEDURE core_tools_notify_sync(); "
+            "END IF; "
+            "IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'notify_sync' "
+            "               AND tgrelid = 'measurement_parameters'::regclass) THEN "
+            "  CREATE TRIGGER notify_sync AFTER UPDATE OF write_cursor ON measurement_parameters "
+            "  FOR EACH STATEMENT EXECUTE PROCEDURE core_tools_notify_sync(); "
+            "END IF; "
+            "END $$; ")
+        execute_statement(conn, statement)
+
+    @staticmethod
+    def listen(conn):
+        '''
+        Creates the triggers and listens to the notifications of changes.
+
+        Args:
+            conn (psycopg2.connection) : connection in autocommit mode
+        '''
+        sync_mgr_queries.create_sync_triggers(conn)
+        execute_statement(conn, f"LISTEN {sync_mgr_queries.notify_channel};")
+
+    @staticmethod
+    def wait_for_notification(conn, timeout):
+        '''
+        Waits until a change is notified or the timeout expires.
+        All pending notifications are removed.
+
+        Args:
+            conn (psycopg2.connection) : connection listening to the notifications
+            timeout (float) : maximum time to wait in seconds
+        '''
+        if not conn.notifies:
+            select.select([conn], [], [], timeout)
+        conn.poll()
+        conn.notifies.clear()
+
     @staticmethod
     def get_sample_info_list(conn):
         '''
@@ -59,6 +133,22 @@ class sync_mgr_queries:
             uuid (int): unique id of measurement
             to_local (bool): if True syncs from remote to local server
         '''
+        sync_mgr_queries.sync_tables(sync_agent, [uuid], to_local, sample_info_list)
+
+    @staticmethod
+    def sync_tables(sync_agent, uuids, to_local=False, sample_info_list=None):
+        '''
+        syncs the rows in the table of the given uuids with a single upsert.
+        The snapshot and metadata are copied as is.
+        Of rows where only columns in a sync column group changed, only these columns are sent.
+
+        Args:
+            sync_agent: class holding local and remote connection
+            uuids (list[int]): unique ids of measurements
+            to_local (bool): if True syncs from remote to local server
+            sample_info_list (list[tuple[str,str,str]]): sample info in destination.
+                Missing sample info is added to the destination and the list.
+        '''
         if to_local:
             conn_src = sync_agent.conn_remote
             conn_dest = sync_agent.conn_local
@@ -66,55 +156,99 @@ class sync_mgr_queries:
             conn_src = sync_agent.conn_local
             conn_dest = sync_agent.conn_remote
 
-        # check if uuid exists
-        entry_exists = select_elements_in_table(conn_dest, "global_measurement_overview",
-            ('uuid', ), where=("uuid",uuid), dict_cursor=False)
+        uuids = [int(uuid) for uuid in uuids]
+        # (uuid, xmin) of the rows that have been synchronized.
+        # xmin changes when the row is updated. It is used to detect changes during the sync.
+        synced = []
+        if not to_local:
+            updated = sync_mgr_queries._sync_changed_columns(conn_src, conn_dest, uuids)
+            synced += updated
+            updated_uuids = {uuid for uuid, sync_xmin in updated}
+            uuids = [uuid for uuid in uuids if uuid not in updated_uuids]
+
+        if len(uuids) > 0:
+            synced += sync_mgr_queries._sync_rows(conn_src, conn_dest, uuids, sample_info_list)
+        conn_dest.commit()
 
-        source_content = select_elements_in_table(conn_src, "global_measurement_overview",
-            ('*', ), where=("uuid",uuid), dict_cursor=True)[0]
-        sync_mgr_queries.convert_SQL_raw_table_entry_to_python(source_content)
+        if not to_local and len(synced) > 0:
+            # rows that changed during the sync are synchronized in the next pass.
+            execute_statement(conn_src,
+                "UPDATE global_measurement_overview AS m "
+                "SET table_synchronized = True, sync_columns = 0 "
+                "FROM unnest(%s::bigint[], %s::text[]) AS s(uuid, sync_xmin) "
+                "WHERE m.uuid = s.uuid AND m.xmin::text = s.sync_xmin;",
+                ([uuid for uuid, sync_xmin in synced], [sync_xmin for uuid, sync_xmin in synced]))
+            conn_src.commit()
 
-        del source_content['id']
-        source_content['table_synchronized'] = True
+    @staticmethod
+    def _sync_changed_columns(conn_src, conn_dest, uuids):
+        '''
+        Updates the changed sync column groups of the rows in the destination.
 
+        Returns:
+            list[tuple[int, str]]: uuid and xmin of the rows that were updated.
+        '''
+        column_groups = measurement_overview_queries.sync_column_groups
+        group_columns = [name for names in column_groups.values() for name in names]
+        rows = execute_query(conn_src,
+            psycopg2.sql.SQL(
+                "SELECT xmin::text AS sync_xmin, uuid, sync_columns, {} FROM global_measurement_overview "
+                "WHERE uuid = ANY(%s::bigint[]) AND sync_columns > 0;").format(
+                psycopg2.sql.SQL(', ').join(psycopg2.sql.Identifier(name) for name in group_columns)),
+            dict_cursor=True, placeholders=(uuids, ))
+
+        rows_per_mask = {}
+        for row in rows:
+            rows_per_mask.setdefault(row['sync_columns'], []).append(row)
+
+        updated = []
+        for mask, mask_rows in rows_per_mask.items():
+            columns = ['uuid'] + [name for bit, names in column_groups.items() if mask & bit for name in names]
+            print(f'update {", ".join(columns[1:])} of {len(mask_rows)} measurement rows')
+            updated_uuids = set(update_rows(conn_dest, 'global_measurement_overview', columns,
+                                            [[row[name] for name in columns] for row in mask_rows],
+                                            'uuid'))
+            # rows missing in the destination are synchronized completely.
+            updated += [(row['uuid'], row['sync_xmin']) for row in mask_rows if row['uuid'] in updated_uuids]
+        return updated
 
-        if len(entry_exists) == 0:
-            print('create measurement row', uuid)
-            if sample_info_list:
-                sample_info = (source_content['project'],
-                               source_content['set_up'],
-                               source_content['sample'])
+    @staticmethod
+    def _sync_rows(conn_src, conn_dest, uuids, sample_info_list):
+        '''
+        Upserts the complete rows in the destination.
+
+        Returns:
+            list[tuple[int, str]]: uuid and xmin of the rows that were synchronized.
+        '''
+        rows = execute_query(conn_src,
+            "SELECT xmin::text AS sync_xmin, * FROM global_measurement_overview "
+            "WHERE uuid = ANY(%s::bigint[]);",
+            dict_cursor=True, placeholders=(uuids, ))
+        if len(rows) == 0:
+            return []
+        print(f'update {len(rows)} measurement rows')
+
+        station_hashes = {row.get('station_snapshot_hash') for row in rows}
+        for station_hash in station_hashes - {None}:
+            snapshot_store_queries.copy(conn_src, conn_dest, station_hash)
+
+        if sample_info_list is not None:
+            for row in rows:
+                sample_info = (row['project'], row['set_up'], row['sample'])
                 if sample_info not in sample_info_list:
                     print('add sample info:', sample_info)
                     sample_info_queries.add_sample(conn_dest, *sample_info)
                     sample_info_list.append(sample_info)
 
-            insert_row_in_table(conn_dest, 'global_measurement_overview',
-                tuple(source_content.keys()), tuple(source_content.values()))
-        else:
-            print('update measurement row', uuid)
-            dest_content = select_elements_in_table(conn_dest, "global_measurement_overview",
-                ('*', ), where=("uuid",uuid), dict_cursor=True)[0]
-            sync_mgr_queries.convert_SQL_raw_table_entry_to_python(dest_content)
-
-            del dest_content['id']
-
-            content_to_update = dict()
+        for row in rows:
+            row['table_synchronized'] = True
+            row['sync_columns'] = 0
+            row['keywords'] = psycopg2.extras.Json(row['keywords'])
+        columns = [name for name in rows[0].keys() if name not in ('id', 'sync_xmin')]
+        values = [[row[name] for name in columns] for row in rows]
+        upsert_rows(conn_dest, 'global_measurement_overview', columns, values, 'uuid')
 
-            for key in dest_content.keys():
-                if source_content[key] != dest_content[key]:
-                    content_to_update[key] = source_content[key]
-
-            update_table(conn_dest, 'global_measurement_overview',
-                content_to_update.keys(), content_to_update.values(),
-                condition=("uuid",uuid))
-
-        update_table(sync_agent.conn_local, 'global_measurement_overview',
-                ('table_synchronized', ), (True, ),
-                condition=("uuid",uuid))
-
-        conn_src.commit()
-        conn_dest.commit()
+        return [(row['uuid'], row['sync_xmin']) for row in rows]
 
     @staticmethod
     def get_sync_items_raw_data(sync_agent):
@@ -131,34 +265,99 @@ class sync_mgr_queries:
 
     @staticmethod
     def sync_raw_data(sync_agent, uuid, to_local=False):
+        sync_mgr_queries.sync_raw_data_many(sync_agent, [uuid], to_local)
+
+    @staticmethod
+    def sync_raw_data_many(sync_agent, uuids, to_local=False, progress=None):
+        '''
+        syncs the raw data of the measurements. The large objects of all measurements are
+        copied concurrently. The write cursors in the destination are updated when the data
+        is committed. An interrupted sync continues from the committed write cursors.
+
+        Args:
+            sync_agent: class holding local and remote connection
+            uuids (list[int]): unique ids of measurements
+            to_local (bool): if True syncs from remote to local server
+            progress (transfer_progress): progress to update with the copied bytes
+        '''
         if to_local:
             conn_src = sync_agent.conn_remote
             conn_dest = sync_agent.conn_local
+            transfer = lobject_transfer.get(sync_agent.SQL_conn_info_remote, sync_agent.SQL_conn_info_local)
         else:
             conn_src = sync_agent.conn_local
             conn_dest = sync_agent.conn_remote
+            transfer = lobject_transfer.get(sync_agent.SQL_conn_info_local, sync_agent.SQL_conn_info_remote)
+
+        copy_tasks = []
+        completed_uuids = []
+        failed_uuids = set()
+        for uuid in uuids:
+            raw_data_table_name, sync_location, completed = select_elements_in_table(conn_src,
+                'global_measurement_overview',
+                ('exp_data_location', 'sync_location', 'completed'),
+                where=("uuid", uuid),
+                dict_cursor=False)[0]
+
+            # NOTE: column sync_location is abused for migration to new format
+            new_format = sync_location == 'New measurement_parameters'
+
+            if new_format:
+                sync_mgr_queries._sync_raw_data_table(conn_src, conn_dest, uuid)
+                try:
+                    copy_tasks += sync_mgr_queries._get_copy_tasks(conn_src, conn_dest, uuid)
+                except SyncError as ex:
+                    # continue with the other measurements.
+                    logger.error(f'Raw data of measurement {uuid} not synchronized: {ex}')
+                    failed_uuids.add(uuid)
+                    continue
+                if completed:
+                    completed_uuids.append(uuid)
+            else:
+                sync_mgr_queries._sync_raw_data_table_old(conn_src, conn_dest, raw_data_table_name)
+                sync_mgr_queries._sync_raw_data_lobj_old(conn_src, conn_dest, raw_data_table_name)
+        # end the read transaction. The copy uses other connections.
+        conn_dest.commit()
 
-        raw_data_table_name, sync_location = select_elements_in_table(conn_src,
-            'global_measurement_overview',
-            ('exp_data_location', 'sync_location'),
-            where=("uuid", uuid),
-            dict_cursor=False)[0]
-
-        # NOTE: column sync_location is abused for migration to new format
-        new_format = sync_location == 'New measurement_parameters'
+        transfer.copy(copy_tasks, progress)
 
-        if new_format:
-            sync_mgr_queries._sync_raw_data_table(conn_src, conn_dest, uuid)
-            sync_mgr_queries._sync_raw_data_lobj(conn_src, conn_dest, uuid)
-        else:
-            sync_mgr_queries._sync_raw_data_table_old(conn_src, conn_dest, raw_data_table_name)
-            sync_mgr_queries._sync_raw_data_lobj_old(conn_src, conn_dest, raw_data_table_name)
+        synchronized = set(uuids) - failed_uuids
+        if transfer_settings.checksum:
+            for uuid in completed_uuids:
+                if not sync_mgr_queries._verify_checksums(conn_dest, uuid):
+                    synchronized.remove(uuid)
+            conn_dest.commit()
 
-        update_table(sync_agent.conn_local, 'global_measurement_overview',
-                ('data_synchronized', ), (True, ),
-                condition=("uuid",uuid))
+        for uuid in uuids:
+            if uuid in synchronized:
+                update_table(sync_agent.conn_local, 'global_measurement_overview',
+                        ('data_synchronized', ), (True, ),
+                        condition=("uuid",uuid))
         sync_agent.conn_local.commit()
 
+    @staticmethod
+    def get_pending_data_size(sync_agent, uuids):
+        '''
+        Returns the number of bytes of the parameters that are not yet copied to the remote database.
+        Measurements in the old format are not included.
+
+        Args:
+            sync_agent: class holding local and remote connection
+            uuids (list[int]): unique ids of measurements
+        '''
+        uuids = [int(uuid) for uuid in uuids]
+        query = ("SELECT exp_uuid, param_index, write_cursor, dtype FROM measurement_parameters "
+                 "WHERE exp_uuid = ANY(%s::bigint[]);")
+        res_src = execute_query(sync_agent.conn_local, query, placeholders=(uuids, ))
+        res_dest = execute_query(sync_agent.conn_remote, query, placeholders=(uuids, ))
+        dest_cursors = {(exp_uuid, param_index): cursor for exp_uuid, param_index, cursor, _ in res_dest}
+        n_bytes = 0
+        for exp_uuid, param_index, cursor, dtype in res_src:
+            n_values = (cursor or 0) - (dest_cursors.get((exp_uuid, param_index)) or 0)
+            if n_values > 0:
+                n_bytes += n_values * to_dtype(dtype).itemsize
+        return n_bytes
+
     @staticmethod
     def _sync_raw_data_table(conn_src, conn_dest, exp_uuid):
         n_row_src = select_elements_in_table(
@@ -184,62 +383,154 @@ class sync_mgr_queries:
                     where=('exp_uuid', exp_uuid),
                     order_by=('param_index', ''))
 
+            chunked_params = []
             for result in res_src:
                 lobject = conn_dest.lobject(0,'w')
                 del result['id']
                 result['oid'] = lobject.oid
                 result['write_cursor'] = 0
+                # checksum of no data
+                result['sync_checksum'] = 0
                 result['depencies'] = json.dumps(result['depencies'])
                 result['shape'] = json.dumps(result['shape'])
                 insert_row_in_table(
                         conn_dest, 'measurement_parameters',
                         result.keys(), result.values())
+                if result.get('chunk_size') is not None:
+                    n_chunks = get_n_chunks(result['total_size'], result['chunk_size'])
+                    chunked_params.append((result['param_index'], lobject.oid, n_chunks))
+
+            if chunked_params:
+                execute_statement(conn_dest,
+                    f"DELETE FROM measurement_chunks WHERE exp_uuid={exp_uuid}")
+                measurement_chunks_queries.create_chunks(conn_dest, exp_uuid, chunked_params)
 
         conn_dest.commit()
 
     @staticmethod
-    def _sync_raw_data_lobj(conn_src, conn_dest, exp_uuid):
+    def _get_copy_tasks(conn_src, conn_dest, exp_uuid):
+        '''
+        Returns the tasks to copy the data of the parameters from the destination write cursor
+        to the source write cursor.
+        '''
         res_src = select_elements_in_table(
                 conn_src, 'measurement_parameters',
-                ('write_cursor', 'total_size', 'oid'),
+                ('param_index', 'write_cursor', 'total_size', 'oid', 'dtype', 'chunk_size'),
                 where=('exp_uuid', exp_uuid),
                 order_by=('param_index', ''))
         res_dest = select_elements_in_table(
                 conn_dest, 'measurement_parameters',
-                ('write_cursor', 'total_size', 'oid'),
+                ('param_index', 'write_cursor', 'total_size', 'oid', 'sync_checksum'),
                 where=('exp_uuid', exp_uuid),
                 order_by=('param_index', ''))
+        # match the parameters on param_index, not on the order of the rows.
+        res_dest = {row['param_index']: row for row in res_dest}
+        if set(res_dest) != {row['param_index'] for row in res_src}:
+            raise SyncError(f'Parameters of measurement {exp_uuid} in source and destination differ')
 
+        chunks_src = None
+        chunks_dest = None
         print('update large object', exp_uuid)
-        for i in range(len(res_src)):
-            dest_cursor = res_dest[i]['write_cursor']
-            src_cursor = res_src[i]['write_cursor']
-            dest_oid = res_dest[i]['oid']
-            src_oid = res_src[i]['oid']
-            src_lobject = conn_src.lobject(src_oid,'rb')
-            dest_lobject = conn_dest.lobject(dest_oid,'wb')
-
-            while (dest_cursor != src_cursor):
-                src_lobject.seek(dest_cursor*8)
-                dest_lobject.seek(dest_cursor*8)
-                if src_cursor*8 - dest_cursor*8 < 2_000_000:
-                    mybuffer = np.frombuffer(src_lobject.read(src_cursor*8-dest_cursor*8))
-                    dest_cursor = src_cursor
-                else:
-                    print(f'large dataset, {(src_cursor*8-dest_cursor*8)*1e-9}GB')
-                    mybuffer = np.frombuffer(src_lobject.read(2_000_000))
-                    dest_cursor += int(2_000_000/8)
-                dest_lobject.write(mybuffer.tobytes())
-
-            dest_lobject.close()
-            src_lobject.close()
-
-            update_table(
-                    conn_dest, 'measurement_parameters',
-                    ('write_cursor',), (src_cursor,),
-                    condition=('oid',dest_oid))
+        tasks = []
+        for row_src in res_src:
+            param_index = row_src['param_index']
+            row_dest = res_dest[param_index]
+            dest_cursor = row_dest['write_cursor']
+            src_cursor = row_src['write_cursor']
+            if src_cursor <= dest_cursor:
+                continue
+            itemsize = to_dtype(row_src['dtype']).itemsize
+            chunk_size = row_src['chunk_size']
+
+            if chunk_size is None:
+                items = [(row_src['oid'], row_dest['oid'], dest_cursor*itemsize, src_cursor*itemsize)]
+            else:
+                if chunks_src is None:
+                    chunks_src = measurement_chunks_queries.get_chunks(conn_src, exp_uuid)
+                    chunks_dest = measurement_chunks_queries.get_chunks(conn_dest, exp_uuid)
+                items = []
+                pos = dest_cursor
+                while pos < src_cursor:
+                    i_chunk, offset = divmod(pos, chunk_size)
+                    n = min(src_cursor - pos, chunk_size - offset)
+                    items.append((chunks_src[param_index][i_chunk], chunks_dest[param_index][i_chunk],
+                                  offset*itemsize, (offset+n)*itemsize))
+                    pos += n
+
+            checkpoint = functools.partial(sync_mgr_queries._checkpoint,
+                                           exp_uuid, param_index, dest_cursor, itemsize)
+            # the checksum is continued from the checksum of the data in the destination.
+            checksum = row_dest['sync_checksum'] if transfer_settings.checksum else None
+            tasks.append(copy_task(items, checkpoint, checksum, itemsize))
+
+        return tasks
 
-        conn_dest.commit()
+    @staticmethod
+    def _checkpoint(exp_uuid, param_index, start_cursor, itemsize, conn_dest, n_bytes, checksum):
+        measurement_parameters_queries.update_sync_cursor(
+                conn_dest, exp_uuid, param_index, start_cursor + n_bytes // itemsize, checksum)
+
+    @staticmethod
+    def _verify_checksums(conn_dest, exp_uuid):
+        '''
+        Verifies the data in the destination with the checksums calculated during the copy.
+        The write cursor of parameters with invalid data is reset, such that the data
+        is copied again.
+
+        Returns:
+            bool: False if the data of a parameter is invalid.
+        '''
+        res_dest = select_elements_in_table(
+                conn_dest, 'measurement_parameters',
+                ('param_index', 'write_cursor', 'oid', 'dtype', 'chunk_size', 'sync_checksum'),
+                where=('exp_uuid', exp_uuid),
+                order_by=('param_index', ''))
+        chunks = None
+        valid = True
+        for row in res_dest:
+            if row['sync_checksum'] is None or not row['write_cursor']:
+                continue
+            itemsize = to_dtype(row['dtype']).itemsize
+            chunk_size = row['chunk_size']
+            n_values = row['write_cursor']
+            if chunk_size is None:
+                items = [(row['oid'], 0, n_values*itemsize)]
+            else:
+                if chunks is None:
+                    chunks = measurement_chunks_queries.get_chunks(conn_dest, exp_uuid)
+                items = []
+                for i_chunk, oid in enumerate(chunks[row['param_index']]):
+                    n = min(chunk_size, n_values - i_chunk*chunk_size)
+                    if n <= 0:
+                        break
+                    items.append((oid, 0, n*itemsize))
+            checksum = read_checksum(conn_dest, items)
+            if checksum != row['sync_checksum']:
+                logger.error(f'Checksum error in data of measurement {exp_uuid} parameter {row["param_index"]}. '
+                             'Data will be copied again.')
+                measurement_parameters_queries.update_sync_cursor(conn_dest, exp_uuid, row['param_index'], 0, 0)
+                valid = False
+        return valid
+
+    @staticmethod
+    def _copy_lobject_data(conn_src, conn_dest, src_oid, dest_oid, start, stop):
+        '''
+        Copies bytes start until stop from source to destination large object.
+        '''
+        src_lobject = conn_src.lobject(src_oid,'rb')
+        dest_lobject = conn_dest.lobject(dest_oid,'wb')
+
+        src_lobject.seek(start)
+        dest_lobject.seek(start)
+        while start < stop:
+            mybuffer = src_lobject.read(min(stop - start, transfer_settings.block_size))
+            if len(mybuffer) == 0:
+                break
+            start += len(mybuffer)
+            dest_lobject.write(mybuffer)
+
+        dest_lobject.close()
+        src_lobject.close()
 
     @staticmethod
     def _sync_raw_data_table_old(conn_src, conn_dest, raw_data_table_name):
@@ -288,49 +579,10 @@ class sync_mgr_queries:
             src_cursor = res_src[i]['write_cursor']
             dest_oid = res_dest[i]['oid']
             src_oid = res_src[i]['oid']
-            src_lobject = conn_src.lobject(src_oid,'rb')
-            dest_lobject = conn_dest.lobject(dest_oid,'wb')
-
-            while (dest_cursor != src_cursor):
-                src_lobject.seek(dest_cursor*8)
-                dest_lobject.seek(dest_cursor*8)
-                if src_cursor*8 - dest_cursor*8 < 2_000_000:
-                    mybuffer = np.frombuffer(src_lobject.read(src_cursor*8-dest_cursor*8))
-                    dest_cursor = src_cursor
-                else:
-                    print(f'large dataset, {(src_cursor*8-dest_cursor*8)*1e-9}GB')
-                    mybuffer = np.frombuffer(src_lobject.read(2_000_000))
-                    dest_cursor += int(2_000_000/8)
-                dest_lobject.write(mybuffer.tobytes())
-
-            dest_lobject.close()
-            src_lobject.close()
+            sync_mgr_queries._copy_lobject_data(conn_src, conn_dest, src_oid, dest_oid,
+                                                dest_cursor*8, src_cursor*8)
 
             update_table(conn_dest, raw_data_table_name,
                 ('write_cursor',), (src_cursor,), condition=('oid',dest_oid))
 
         conn_dest.commit()
-
-    @staticmethod
-    def convert_SQL_raw_table_entry_to_python(content):
-        content['keywords'] = psycopg2.extras.Json(content['keywords'])
-        content['start_time'] = psycopg2.sql.SQL("TO_TIMESTAMP({})").format(psycopg2.sql.Literal(content['start_time'].timestamp()))
-
-        if content['snapshot'] is not None:
-            content['snapshot'] = str(content['snapshot'].tobytes()).replace('\\\'', '').replace('\\\\\"', '')
-            if content['snapshot'].startswith('b'):
-                content['snapshot'] = content['snapshot'][1:]
-            if content['snapshot'].startswith('\''):
-                content['snapshot'] = content['snapshot'][1:-1]
-            content['snapshot'] = psycopg2.extras.Json(json.loads(content['snapshot']))
-        if content['metadata'] is not None:
-            content['metadata'] = str(content['metadata'].tobytes()).replace('\\\'', '')
-            if content['metadata'].startswith('b'):
-                content['metadata'] = content['metadata'][1:]
-            if content['metadata'].startswith('\''):
-                content['metadata'] = content['metadata'][1:-1]
-            content['metadata'] = psycopg2.extras.Json(json.loads(content['metadata']))
-
-        if content['stop_time'] is not None:
-            content['stop_time'] = psycopg2.sql.SQL("TO_TIMESTAMP({})").format(psycopg2.sql.Literal(content['stop_time'].timestamp()))
-
@@ -0,0 +1,293 @@
+'''
+Storage format of the snapshot in the measurement overview table.
+
+The snapshot is stored as JSON in the BYTEA column snapshot. The column snapshot_format
+specifies the compression of the JSON data. NULL means uncompressed JSON (the original format).
+
+With deduplication the station snapshot is stored in the table snapshot_store with the
+hash of the JSON data as key. The overview table then only contains the other parts of the snapshot
+and the hash in column station_snapshot_hash.
+
+With delta snapshots the station snapshot in snapshot_store can be a JSON patch (RFC 6902)
+on a full base snapshot. Column base_hash refers to the base snapshot. A new full base snapshot
+is stored after a fixed number of deltas or when the delta is not much smaller than
+the full snapshot. The patch is only applied when the snapshot is accessed.
+'''
+from dataclasses import dataclass, fields
+import base64
+import hashlib
+import json
+import logging
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+class snapshot_storage_settings:
+    compression = None
+    deduplicate = False
+    delta = False
+    delta_base_interval = 50
+
+
+class _delta_base:
+    '''
+    Last full station snapshot stored by this process.
+    '''
+    snapshot = None
+    # decoded station snapshot of snapshot
+    station = None
+    n_deltas = 0
+
+
+def set_snapshot_storage(compression=None, deduplicate=False, delta=False, delta_base_interval=50):
+    '''
+    Sets the storage format for the snapshot of new measurements.
+
+    Note:
+        Compressed and deduplicated snapshots cannot be read by older versions of core-tools.
+
+    Args:
+        compression (str) : None, 'zlib' or 'zstd'
+        deduplicate (bool) : store identical station snapshots only once.
+        delta (bool) : store the station snapshot as difference with the previous
+            full station snapshot. Implies deduplicate.
+        delta_base_interval (int) : number of delta snapshots after which a new
+            full station snapshot is stored.
+    '''
+    if compression not in [None, 'zlib', 'zstd']:
+        raise ValueError(f"Unknown snapshot compression '{compression}'")
+    if compression == 'zstd' and zstandard is None:
+        raise ImportError("Package 'zstandard' is required for zstd compression")
+    snapshot_storage_settings.compression = compression
+    snapshot_storage_settings.deduplicate = deduplicate or delta
+    snapshot_storage_settings.delta = delta
+    snapshot_storage_settings.delta_base_interval = delta_base_interval
+    _delta_base.snapshot = None
+    _delta_base.station = None
+
+
+def compress(data, data_format):
+    if data_format is None:
+        return data
+    if data_format == 'zlib':
+        return zlib.compress(data)
+    if data_format == 'zstd':
+        return zstandard.ZstdCompressor().compress(data)
+    raise ValueError(f"Unknown snapshot format '{data_format}'")
+
+
+def decompress(data, data_format):
+    if data_format is None:
+        return data
+    if data_format == 'zlib':
+        return zlib.decompress(data)
+    if data_format == 'zstd':
+        if zstandard is None:
+            raise ImportError("Package 'zstandard' is required to read this snapshot")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown snapshot format '{data_format}'")
+
+
+def _escape(key):
+    return key.replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(key):
+    return key.replace('~1', '/').replace('~0', '~')
+
+
+def _diff(base, new, path, patch):
+    for key in base:
+        if key not in new:
+            patch.append({'op': 'remove', 'path': path + '/' + _escape(key)})
+    for key, value in new.items():
+        key_path = path + '/' + _escape(key)
+        if key not in base:
+            patch.append({'op': 'add', 'path': key_path, 'value': value})
+            continue
+        base_value = base[key]
+        if isinstance(value, dict) and isinstance(base_value, dict):
+            _diff(base_value, value, key_path, patch)
+        elif type(value) != type(base_value) or value != base_value:
+            patch.append({'op': 'replace', 'path': key_path, 'value': value})
+
+
+def json_diff(base, new):
+    '''
+    Returns the JSON patch (RFC 6902) to convert base into new.
+    Only dictionaries are compared recursively. Lists are replaced as a whole.
+
+    Args:
+        base (Any) : JSON compatible object
+        new (Any) : JSON compatible object
+
+    Returns:
+        list[dict[str, Any]] : patch operations
+    '''
+    if not isinstance(base, dict) or not isinstance(new, dict):
+        return [{'op': 'replace', 'path': '', 'value': new}]
+    patch = []
+    _diff(base, new, '', patch)
+    return patch
+
+
+def json_patch(doc, patch):
+    '''
+    Applies the JSON patch operations add, replace and remove on doc.
+    The doc is modified in place.
+
+    Args:
+        doc (Any) : JSON compatible object
+        patch (list[dict[str, Any]]) : patch operations
+
+    Returns:
+        Any : the patched object
+    '''
+    for operation in patch:
+        path = operation['path']
+        if path == '':
+            doc = operation['value']
+            continue
+        keys = [_unescape(key) for key in path.split('/')[1:]]
+        parent = doc
+        for key in keys[:-1]:
+            parent = parent[key]
+        if operation['op'] == 'remove':
+            del parent[keys[-1]]
+        else:
+            parent[keys[-1]] = operation['value']
+    return doc
+
+
+def _encode_delta(station_json, station_hash, compression):
+    station = json.loads(station_json)
+    base = _delta_base.snapshot
+    if (base is not None
+            and base.station_hash != station_hash
+            and _delta_base.n_deltas < snapshot_storage_settings.delta_base_interval):
+        patch = json.dumps(json_diff(_delta_base.station, station)).encode('ascii')
+        if len(patch) < len(station_json) // 2:
+            _delta_base.n_deltas += 1
+            return patch, base
+    if base is None or base.station_hash != station_hash:
+        _delta_base.snapshot = stored_snapshot(
+                None, None,
+                station_hash, compress(station_json, compression), compression)
+        _delta_base.station = station
+        _delta_base.n_deltas = 0
+    return None, None
+
+
+@dataclass
+class stored_snapshot:
+    '''
+    Snapshot as stored in the database.
+
+    Args:
+        data (bytes) : content of column snapshot
+        data_format (str) : content of column snapshot_format
+        station_hash (str) : hash of the station snapshot in snapshot_store
+        station_data (bytes) : content of snapshot_store.data
+        station_format (str) : content of snapshot_store.format
+        base_hash (str) : hash of the full station snapshot if station_data is a delta.
+        base_data (bytes) : content of snapshot_store.data of the base snapshot
+        base_format (str) : content of snapshot_store.format of the base snapshot
+    '''
+    data: bytes
+    data_format: str = None
+    station_hash: str = None
+    station_data: bytes = None
+    station_format: str = None
+    base_hash: str = None
+    base_data: bytes = None
+    base_format: str = None
+
+    @staticmethod
+    def encode(station_json, measurement_json):
+        '''
+        Encodes the snapshot using the storage settings.
+
+        Args:
+            station_json (bytes) : JSON encoded station snapshot
+            measurement_json (bytes) : JSON encoded measurement snapshot
+        '''
+        compression = snapshot_storage_settings.compression
+        if snapshot_storage_settings.deduplicate:
+            station_hash = hashlib.sha256(station_json).hexdigest()
+            snapshot = stored_snapshot(
+                    compress(b'{"measurement": ' + measurement_json + b'}', compression),
+                    compression,
+                    station_hash)
+            patch, base = None, None
+            if snapshot_storage_settings.delta:
+                patch, base = _encode_delta(station_json, station_hash, compression)
+            if patch is not None:
+                snapshot.station_data = compress(patch, compression)
+                snapshot.station_format = compression
+                snapshot.base_hash = base.station_hash
+                snapshot.base_data = base.station_data
+                snapshot.base_format = base.station_format
+            else:
+                snapshot.station_data = compress(station_json, compression)
+                snapshot.station_format = compression
+            return snapshot
+
+        snapshot_json = b'{"station": ' + station_json + b', "measurement": ' + measurement_json + b'}'
+        return stored_snapshot(compress(snapshot_json, compression), compression)
+
+    def decode(self):
+        '''
+        Returns:
+            dict[str, Any] : the snapshot
+        '''
+        snapshot = json.loads(decompress(self.data, self.data_format))
+        if self.station_hash is not None:
+            station = None
+            if self.station_data is None:
+                logger.error(f'Station snapshot {self.station_hash} not found')
+            elif self.base_hash is None:
+                station = json.loads(decompress(self.station_data, self.station_format))
+            elif self.base_data is None:
+                logger.error(f'Base of station snapshot {self.station_hash} not found')
+            else:
+                base = json.loads(decompress(self.base_data, self.base_format))
+                patch = json.loads(decompress(self.station_data, self.station_format))
+                station = json_patch(base, patch)
+            snapshot = {'station': station, **snapshot}
+        return snapshot
+
+    def to_json(self):
+        '''
+        Returns the stored snapshot as JSON. The bytes fields are base64 encoded.
+
+        Returns:
+            str : JSON representation
+        '''
+        values = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                value = base64.b64encode(value).decode('ascii')
+            values[field.name] = value
+        return json.dumps(values)
+
+    @staticmethod
+    def from_json(data):
+        '''
+        Creates the stored snapshot from the JSON representation returned by to_json().
+
+        Args:
+            data (str) : JSON representation
+        '''
+        values = json.loads(data)
+        for field in fields(stored_snapshot):
+            value = values.get(field.name)
+            if field.type is bytes and value is not None:
+                values[field.name] = base64.b64decode(value)
+        return stored_snapshot(**values)
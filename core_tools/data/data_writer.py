@@ -1,6 +1,6 @@
 import logging
 from dataclasses import dataclass
-from typing import List, Union
+from typing import List, Optional, Union
 
 import numpy as np
 from numpy import ndarray
@@ -11,6 +11,9 @@ from qcodes import ManualParameter
 
 logger = logging.getLogger(__name__)
 
+# maximum number of values per parameter added to the dataset in one call in bulk mode.
+BULK_BLOCK_SIZE = 2**20
+
 
 @dataclass
 class Axis:
@@ -32,6 +35,7 @@ class Data:
     label: str
     unit: str
     values: Union[ndarray, List[float]]
+    dtype: Optional[str] = None # if None: complex128 for complex values, otherwise float64
 
 
 @dataclass
@@ -66,15 +70,32 @@ class DataWriter:
 
     def _add_data(self, data):
         param  = ManualParameter(data.name, label=data.label, unit=data.unit)
-        self._measurement.register_get_parameter(param, *self._set_params)
-        self._actions.append(_Action('get', param, np.asarray(data.values)))
-
-    def run(self):
+        values = np.asarray(data.values)
+        shape = tuple(len(action.values) for action in self._actions if action.action == 'set')
+        if values.shape != shape:
+            raise ValueError(f"Shape of data '{data.name}' {values.shape} does not match shape of axes {shape}")
+        dtype = data.dtype
+        if dtype is None:
+            dtype = 'complex128' if np.iscomplexobj(values) else 'float64'
+        self._measurement.register_get_parameter(param, *self._set_params, dtype=dtype)
+        self._actions.append(_Action('get', param, values))
+
+    def run(self, bulk=True):
+        '''
+        Writes the data to the dataset.
+
+        Args:
+            bulk (bool): if True the arrays are written in blocks directly to the buffers of the dataset.
+                If False the values are added one by one.
+        '''
         try:
-            self._setpoints = [[param, None] for param in self._set_params]
-            self._index = [0] * len(self._setpoints)
             with self._measurement:
-                self._loop()
+                if bulk:
+                    self._write_bulk()
+                else:
+                    self._setpoints = [[param, None] for param in self._set_params]
+                    self._index = [0] * len(self._setpoints)
+                    self._loop()
         except KeyboardInterrupt:
             logger.debug('Data saving interrupted', exc_info=True)
             logger.warning('Data saving interrupted')
@@ -100,6 +121,31 @@ class DataWriter:
             self._measurement.add_result((action.param, action.values[index]), *self._setpoints)
             self._loop(iaction + 1, isetpoint)
 
+    def _write_bulk(self):
+        axes = []
+        for action in self._actions:
+            if action.action == 'set':
+                axes.append(action)
+                continue
+            shape = tuple(len(axis.values) for axis in axes)
+            values = action.values
+            if len(shape) == 0:
+                self._measurement.add_result((action.param, values))
+                continue
+            # setpoint values with the shape of the data. These are views, not copies.
+            setpoints = []
+            for i, axis in enumerate(axes):
+                axis_shape = [1] * len(shape)
+                axis_shape[i] = -1
+                setpoints.append((axis.param, np.broadcast_to(axis.values.reshape(axis_shape), shape)))
+            # write blocks of rows to limit the size of temporary copies.
+            n_rows = max(1, BULK_BLOCK_SIZE // int(np.prod(shape[1:])))
+            for start in range(0, shape[0], n_rows):
+                rows = slice(start, start + n_rows)
+                self._measurement.add_result(
+                        (action.param, values[rows]),
+                        *[(param, setpoint_values[rows]) for param, setpoint_values in setpoints])
+
 
 def write_data(name: str, *args):
     '''
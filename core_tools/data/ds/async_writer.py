@@ -0,0 +1,94 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# maximum number of values in the buffers that is not yet written to the database.
+MAX_PENDING_POINTS = 10_000_000
+
+
+class async_writer:
+    '''
+    Writes the data of a running measurement to the database in a separate thread.
+
+    The measurement thread only copies the results into the numpy buffers.
+    The writer thread periodically writes the new data to the large objects
+    and commits the write cursors.
+    '''
+    def __init__(self, name, flush, flush_interval, pending_points,
+                 max_pending=MAX_PENDING_POINTS):
+        '''
+        Args:
+            name (str) : name of the thread
+            flush (Callable[[], None]) : writes the buffered data to the database.
+            flush_interval (Callable[[], float]) : returns the time [s] between two flushes.
+            pending_points (Callable[[], int]) : returns the number of values not yet written.
+            max_pending (int) : maximum number of values not yet written. When this number is
+                exceeded add_result blocks until the writer has caught up. None: no maximum.
+        '''
+        self._flush = flush
+        self._flush_interval = flush_interval
+        self._pending_points = pending_points
+        self.max_pending = max_pending
+
+        self._condition = threading.Condition()
+        self._stop = False
+        self._flush_requested = False
+        self._exception = None
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def data_added(self):
+        '''
+        Must be called by the measurement thread after data has been added to the buffers.
+        Raises the exception of the writer thread, if any.
+        Blocks when the writer thread lags too much behind (backpressure).
+        '''
+        self._check_exception()
+        if self.max_pending is not None and self._pending_points() > self.max_pending:
+            logger.debug('Waiting for database writer')
+            with self._condition:
+                self._flush_requested = True
+                self._condition.notify_all()
+                self._condition.wait_for(
+                    lambda: (self._exception is not None
+                             or not self._thread.is_alive()
+                             or self._pending_points() <= self.max_pending))
+            self._check_exception()
+
+    def stop(self):
+        '''
+        Writes all remaining data and stops the writer thread.
+        Raises the exception of the writer thread, if any.
+        '''
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._check_exception()
+
+    def _check_exception(self):
+        if self._exception is not None:
+            raise Exception('Writing data to the database failed') from self._exception
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stop or self._flush_requested,
+                                         timeout=self._flush_interval())
+                stop = self._stop
+                self._flush_requested = False
+            try:
+                if stop or self._pending_points() > 0:
+                    self._flush()
+            except BaseException as ex:
+                logger.error('Exception writing data to database', exc_info=True)
+                with self._condition:
+                    self._exception = ex
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self._condition.notify_all()
+            if stop:
+                return
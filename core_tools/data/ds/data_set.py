@@ -1,17 +1,31 @@
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from core_tools.data.ds.data_set_core import  data_set
 from core_tools.data.ds.data_set_raw import data_set_raw
+from core_tools.data.ds.flush_policy import get_flush_policy
+from core_tools.data.ds.data_spool import data_spool, spool_settings, start_spool_replay
+from core_tools.data.SQL.buffer_writer import buffer_writer, load_buffers
 from core_tools.data.SQL.SQL_dataset_creator import SQL_dataset_creator
+from core_tools.data.SQL.snapshot_storage import stored_snapshot
+from core_tools.utility.snapshot_state import snapshot_from_cache
 import json
+import time
 import qcodes as qc
 from qcodes.utils.helpers import NumpyJSONEncoder
 
 logger = logging.getLogger(__name__)
 
-DATA_POINTS_MAX = 20_000_000
+# NOTE: the write cursor in the database is a 32 bit integer.
+DATA_POINTS_MAX = 2**31 - 1
+# maximum number of values of the dataset in memory. Large parameters are stored in chunks
+# and are not kept in memory.
 DATASET_SIZE_WARNING = 50_000_000
 DATASET_SIZE_MAX = 200_000_000
 
+# thread to capture station snapshots while the measurement is running
+_snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='station_snapshot')
+
 def load_by_id(exp_id):
     '''
     load a dataset by specifying its id (search in local db)
@@ -33,7 +47,97 @@ def load_by_uuid(exp_uuid, copy2localdb=False):
     SQL_mgr = SQL_dataset_creator()
     return data_set(SQL_mgr.fetch_raw_dataset_by_UUID(exp_uuid, copy2localdb))
 
-def create_new_data_set(experiment_name, measurement_snapshot, *m_params):
+def load_many(exp_uuids, parameters=None, batch_size=100, n_workers=1):
+    '''
+    load multiple datasets by specifying their uuids (searches in local and remote db).
+    The measurements are fetched in batches with a single query per table and
+    the data is read with a minimal number of queries.
+
+    args:
+        exp_uuids (list[int]) : uuids of the experiments you want to load
+        parameters (list[str]) : names or labels of the parameters to load with the datasets.
+            The data of the other parameters is read when it is accessed. If None all data is loaded.
+        batch_size (int) : number of datasets fetched per batch
+        n_workers (int) : number of threads loading batches, each with its own database connection.
+
+    yields:
+        data_set: the datasets in the order of exp_uuids
+    '''
+    exp_uuids = list(exp_uuids)
+    batches = [exp_uuids[i:i+batch_size] for i in range(0, len(exp_uuids), batch_size)]
+    if n_workers <= 1:
+        for batch in batches:
+            yield from _get_datasets(batch, _load_batch(batch, parameters))
+        return
+
+    # the batches are loaded in worker threads while the previous batches are processed.
+    # At most n_workers batches are loaded ahead to limit the memory use.
+    executor = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix='load_many')
+    pending = deque()
+    try:
+        for batch in batches:
+            pending.append((batch, executor.submit(_load_batch, batch, parameters)))
+            if len(pending) < n_workers:
+                continue
+            batch, future = pending.popleft()
+            yield from _get_datasets(batch, future.result())
+        while pending:
+            batch, future = pending.popleft()
+            yield from _get_datasets(batch, future.result())
+    finally:
+        for batch, future in pending:
+            future.cancel()
+        executor.shutdown()
+
+def _load_batch(exp_uuids, parameters):
+    datasets = SQL_dataset_creator().fetch_raw_datasets_by_UUID(exp_uuids)
+    result = {}
+    data_buffers = []
+    for exp_uuid, ds_raw in datasets.items():
+        ds = data_set(ds_raw)
+        data_buffers += ds._get_data_buffers(parameters)
+        result[exp_uuid] = ds
+    load_buffers(data_buffers)
+    return result
+
+def _get_datasets(exp_uuids, datasets):
+    for exp_uuid in exp_uuids:
+        if exp_uuid not in datasets:
+            raise ValueError("the uuid {}, does not exist in the local/remote database.".format(exp_uuid))
+        yield datasets[exp_uuid]
+
+def capture_snapshot(measurement_snapshot, cached=False):
+    '''
+    Captures the snapshot of the default station and encodes it for storage.
+
+    Args:
+        measurement_snapshot (dict[str,Any]) : snapshot of measurement parameters
+        cached (bool) : use the cached values of the parameters instead of getting them.
+
+    Returns:
+        stored_snapshot: encoded snapshot
+    '''
+    start = time.perf_counter()
+    if qc.Station.default is not None:
+        with snapshot_from_cache(cached):
+            station_snapshot = qc.Station.default.snapshot(update=False)
+    else:
+        logger.warning('No station configured. No snapshot will be stored.')
+        station_snapshot = None
+    duration = time.perf_counter() - start
+
+    # encode once. NumpyJSONEncoder converts all numpy arrays and complex numbers to jsonable lists and dictionaries.
+    # The snapshot is decoded from the JSON when it is accessed.
+    snapshot = stored_snapshot.encode(
+            json.dumps(station_snapshot, cls=NumpyJSONEncoder).encode('ascii'),
+            json.dumps(measurement_snapshot, cls=NumpyJSONEncoder).encode('ascii'))
+    logger.info(f'Station snapshot captured in {duration*1000:.0f} ms, '
+                f'encoded in {(time.perf_counter() - start - duration)*1000:.0f} ms')
+    return snapshot
+
+
+def create_new_data_set(experiment_name, measurement_snapshot, *m_params, async_flush=False,
+                        async_snapshot=False, cached_snapshot=False, flush_policy=None):
     '''
     generates a dataclass for a given set of measurement parameters
 
@@ -41,45 +145,65 @@ def create_new_data_set(experiment_name, measurement_snapshot, *m_params):
         experiment_name (str) : name of experiment
         measurement_snapshot (dict[str,Any]) : snapshot of measurement parameters
         *m_params (m_param_dataset) : datasets of the measurement parameters
+        async_flush (bool) : write the data to the database in a separate thread
+        async_snapshot (bool) : capture the station snapshot in a separate thread.
+            The snapshot is stored in the database when it is ready.
+            The snapshot always uses the cached values of the parameters, because instruments
+            must not be accessed concurrently with the measurement.
+        cached_snapshot (bool) : use the cached values of the parameters for the station snapshot
+        flush_policy (Union[None, str, flush_policy]) : policy for the interval between flushes to the database.
     '''
     SQL_mgr = SQL_dataset_creator()
     if SQL_mgr.conn is None:
         raise Exception('No database connection set up')
 
+    flush_policy = get_flush_policy(flush_policy)
     ds = data_set_raw(exp_name=experiment_name)
-
-    if qc.Station.default is not None:
-        station_snapshot = qc.Station.default.snapshot()
-        snapshot = {'station': station_snapshot}
-    else:
-        logger.warning('No station configured. No snapshot will be stored.')
-        snapshot = {'station': None}
+    spool = data_spool.create() if spool_settings.enabled else None
 
     # intialize the buffers for the measurement
     for m_param in m_params:
-        m_param.init_data_dataclass()
+        m_param.init_data_dataclass(spool)
         ds.measurement_parameters += [m_param]
         ds.measurement_parameters_raw += m_param.to_SQL_data_structure()
+    if spool is not None:
+        # local setpoints of parameters have already been written to a buffer in memory.
+        for m_param_raw in ds.measurement_parameters_raw:
+            if isinstance(m_param_raw.data_buffer, buffer_writer):
+                spool.attach(m_param_raw.data_buffer)
 
-    total_size = 0
+    memory_size = 0
     for m_param_raw in ds.measurement_parameters_raw:
         if m_param_raw.size > DATA_POINTS_MAX:
             raise Exception(f'Measurement with shape {m_param_raw.shape} is too big for storage')
-        total_size += m_param_raw.size
-    if total_size > DATASET_SIZE_MAX:
-        raise Exception(f'Dataset with {total_size} values is too big for storage')
-    if total_size > DATASET_SIZE_WARNING:
-        print(f'Dataset with {total_size} values is quite big for storage')
-
-    snapshot['measurement'] = measurement_snapshot
+        if m_param_raw.chunk_size is None:
+            memory_size += m_param_raw.size
+    if memory_size > DATASET_SIZE_MAX:
+        raise Exception(f'Dataset with {memory_size} values in memory is too big for storage')
+    if memory_size > DATASET_SIZE_WARNING:
+        print(f'Dataset with {memory_size} values in memory is quite big for storage')
+
+    if async_snapshot:
+        # qcodes instruments are not thread safe. Only the cached values can be used.
+        ds.snapshot_pending = _snapshot_executor.submit(capture_snapshot, measurement_snapshot, True)
+    else:
+        ds.snapshot_encoded = capture_snapshot(measurement_snapshot, cached_snapshot)
 
-    # encode and decode to convert all numpy arrays and complex numbers to jsonable lists and dictionaries
-    snapshot_json = json.dumps(snapshot, cls=NumpyJSONEncoder)
-    snapshot = json.loads(snapshot_json)
+    try:
+        SQL_mgr.register_measurement(ds)
+    except BaseException:
+        if spool is not None:
+            spool.remove()
+        raise
 
-    ds.snapshot = snapshot
+    if spool is not None:
+        spool.register(ds)
+        # write spools of measurements that completed while the database was not available.
+        start_spool_replay()
 
-    SQL_mgr.register_measurement(ds)
+    dataset = data_set(ds, flush_policy, spool)
+    if async_flush:
+        dataset.start_async_writer()
 
-    return data_set(ds)
+    return dataset
 
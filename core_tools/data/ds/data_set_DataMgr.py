@@ -2,17 +2,25 @@ import numpy as np
 import copy
 import string
 
+from core_tools.data.SQL.buffer_writer import buffer_reader, chunked_buffer_reader, chunked_buffer_writer
+
 class m_param_origanizer():
     def __init__(self, m_param_raw):
         self.m_param_raw = m_param_raw
+        # indexes for the lookups. The parameters are looked up for every dependency.
+        self.__by_id = {}
+        self.__by_id_set = {}
+        for m_param in m_param_raw:
+            self.__by_id.setdefault(m_param.param_id, []).append(m_param)
+            self.__by_id_set.setdefault((m_param.param_id, m_param.nth_set), m_param)
+        # NOTE: list of set to keep the order of the measurement id's.
+        self.__m_param_ids = list({m_param.param_id_m_param for m_param in m_param_raw})
 
     def get(self, key, nth_set):
-        items = self[key]
-        for i in items:
-            if i.nth_set == nth_set:
-                return i
-
-        raise ValueError('m_param with id {} and set {} not found in this data collection.'.format(key, nth_set))
+        try:
+            return self.__by_id_set[(key, nth_set)]
+        except KeyError:
+            raise ValueError('m_param with id {} and set {} not found in this data collection.'.format(key, nth_set)) from None
 
     def __getitem__(self, key):
         '''
@@ -21,24 +29,16 @@ class m_param_origanizer():
         Returns
             list<m_param_raw> : raw parameters originating from this id.
         '''
-        param_s = []
-        for m_param in self.m_param_raw:
-            if m_param.param_id == key:
-                param_s.append(m_param)
-
-        if len(param_s) != 0:
-            return param_s
-        raise ValueError('m_param with id {} not found in this data collection.'.format(key))
+        try:
+            return list(self.__by_id[key])
+        except KeyError:
+            raise ValueError('m_param with id {} not found in this data collection.'.format(key)) from None
 
     def get_m_param_id(self):
         '''
         get the measurement id's
         '''
-        id_s = set()
-        for m_param in self.m_param_raw:
-            id_s.add(m_param.param_id_m_param)
-
-        return list(id_s)
+        return list(self.__m_param_ids)
 
     def __copy__(self):
         new_m_param = []
@@ -114,19 +114,31 @@ class dataset_data_description():
         self.__setattr__(name, self)
 
     def __call__(self):
+        data_buffer = self.__raw_data.data_buffer
         if self.__raw_data.setpoint is True or self.__raw_data.setpoint_local is True:
-            if self.__raw_data.data_buffer.data.ndim > 1: #over dimensioned
+            # readers have a shape and can read a part of the data.
+            shape = getattr(data_buffer, 'shape', None)
+            ndim = len(shape) if shape is not None else data_buffer.data.ndim
+            if ndim > 1: #over dimensioned
                 # NOTE: Assumes the setpoint does not depend on the other dimensions!
                 #       This will fail when the parameter is swept in alternating direction.
-                idx = [0] * self.__raw_data.data_buffer.data.ndim
+                idx = [0] * ndim
                 idx[self.__raw_data.nth_dim] = slice(None)
 
-                return self.__raw_data.data_buffer.data[tuple(idx)]
+                return data_buffer.read_index(tuple(idx))
 
-        return self.__raw_data.data_buffer.data
+        return data_buffer.data
 
     @property
     def shape(self):
+        data_buffer = self.__raw_data.data_buffer
+        if isinstance(data_buffer, (buffer_reader, chunked_buffer_reader, chunked_buffer_writer)):
+            # determine shape without loading the data
+            shape = data_buffer.shape
+            if ((self.__raw_data.setpoint is True or self.__raw_data.setpoint_local is True)
+                    and len(shape) > 1):
+                return (shape[self.__raw_data.nth_dim], )
+            return shape
         return self().shape
 
     @property
@@ -136,6 +148,16 @@ class dataset_data_description():
     def full(self):
         return self.__raw_data.data_buffer.data
 
+    def _get_data_buffers(self):
+        '''
+        Returns the data buffers of the parameter and its setpoints.
+        '''
+        data_buffers = [self.__raw_data.data_buffer]
+        for repr_attr_overview in self.__repr_attr_overview:
+            for name, description in repr_attr_overview:
+                data_buffers += description._get_data_buffers()
+        return data_buffers
+
     def written(self):
         try:
             return self.__raw_data.data_buffer.cursor
@@ -1,9 +1,16 @@
 from core_tools.data.ds.data_set_DataMgr import m_param_origanizer, dataset_data_description
 from core_tools.data.SQL.SQL_dataset_creator import SQL_dataset_creator
+from core_tools.data.ds.async_writer import async_writer, MAX_PENDING_POINTS
+from core_tools.data.ds.data_spool import CONNECTION_ERRORS
+from core_tools.data.ds.flush_policy import get_flush_policy
+from core_tools.data.SQL.buffer_writer import load_buffers
 
 import datetime
+import logging
 import time
 
+logger = logging.getLogger(__name__)
+
 class data_set_desciptor(object):
     def __init__(self, variable, is_time=False, is_JSON=False):
         self.var = variable
@@ -33,7 +40,6 @@ class data_set:
     sample_name = data_set_desciptor('sample')
 
     metadata = data_set_desciptor('metadata')
-    snapshot = data_set_desciptor('snapshot')
     keywords = data_set_desciptor('keywords')
     starred = data_set_desciptor('starred')
 
@@ -42,12 +48,27 @@ class data_set:
     completed_timestamp = data_set_desciptor('UNIX_stop_time', is_time=True)
     completed_timestamp_raw = data_set_desciptor('UNIX_stop_time')
 
-    def __init__(self, ds_raw):
+    def __init__(self, ds_raw, flush_policy=None, spool=None):
         self.id = None
         self.__data_set_raw = ds_raw
         self.__repr_attr_overview = []
         self.__init_properties(m_param_origanizer(ds_raw.measurement_parameters_raw))
         self.last_commit = time.time()
+        self.__writer = None
+        self.__flush_policy = get_flush_policy(flush_policy)
+        self.__spool = spool
+        self.__completing = False
+
+    @property
+    def snapshot(self):
+        return self.__data_set_raw.get_snapshot()
+
+    @property
+    def flush_statistics(self):
+        '''
+        Statistics of the flushes of the data to the database.
+        '''
+        return self.__flush_policy.statistics
 
     def __len__(self):
         return len(self.__repr_attr_overview)
@@ -88,16 +109,21 @@ class data_set:
 
             self.__repr_attr_overview += [repr_attr_overview]
 
+        # index on label and name. The first parameter with the label or name is returned.
+        self.__labels = {}
+        for minstr in self.__repr_attr_overview:
+            for var_meas in minstr:
+                self.__labels.setdefault(var_meas[1].label, var_meas[1])
+                self.__labels.setdefault(var_meas[1].name, var_meas[1])
+
     def __call__(self, label_variable):
         '''
         extract a meaurement by its label
         '''
-        for minstr in self.__repr_attr_overview:
-            for var_meas in minstr:
-                if var_meas[1].label == label_variable or var_meas[1].name == label_variable:
-                    return var_meas[1]
-
-        raise ValueError(f'Unable to find \'{label_variable}\' in ds with id :{self.exp_id}')
+        try:
+            return self.__labels[label_variable]
+        except (KeyError, TypeError):
+            raise ValueError(f'Unable to find \'{label_variable}\' in ds with id :{self.exp_id}') from None
 
     def add_result(self, input_data):
         '''
@@ -110,46 +136,163 @@ class data_set:
             if m_param.id_info in input_data.keys():
                 m_param.write_data(input_data)
 
-        self.__write_to_db()
+        if self.__writer is not None:
+            self.__writer.data_added()
+        else:
+            self.__write_to_db()
+
+    def start_async_writer(self):
+        '''
+        Write the data to the database in a separate thread.
+        add_result will then only copy the data to the buffers in memory.
+        '''
+        if self.__writer is not None:
+            return
+        self.__writer = async_writer(
+                f'ds_writer_{self.exp_id}',
+                self.__flush,
+                self.__flush_policy.interval,
+                self.__data_set_raw.pending_size,
+                # the spool can hold all data. Never block the measurement.
+                max_pending=None if self.__spool is not None else MAX_PENDING_POINTS)
 
     def mark_completed(self):
         '''
         mark dataset complete. Stop updating the database and allow garbage collector to release memory.
         '''
+        self.__completing = True
         try:
-            self.__write_to_db(True)
+            if self.__writer is not None:
+                writer = self.__writer
+                self.__writer = None
+                writer.stop()
+            self.__flush(wait_snapshot=True)
         finally:
             self.__data_set_raw.completed = True
-            SQL_ds_creator = SQL_dataset_creator()
-            SQL_ds_creator.finish_measurement(self.__data_set_raw)
+            self.__finish()
+
+    def __finish(self):
+        ds_raw = self.__data_set_raw
+        spool = self.__spool
+        if spool is None:
+            SQL_dataset_creator().finish_measurement(ds_raw)
+            return
+        if spool.db_available:
+            try:
+                SQL_dataset_creator().finish_measurement(ds_raw)
+                spool.remove()
+                return
+            except CONNECTION_ERRORS as ex:
+                spool.db_failed(ex)
+        if ds_raw.UNIX_stop_time is None:
+            ds_raw.UNIX_stop_time = time.time()
+        spool.complete(ds_raw)
+
+    def preload(self, parameters=None):
+        '''
+        Reads the data of the parameters from the database with a minimal number of queries.
+        The data of a loaded dataset is otherwise read per parameter when it is first accessed.
+
+        Args:
+            parameters (list[str]) : names or labels of the parameters to load.
+                The setpoints of the parameters are loaded as well. If None all data is loaded.
+        '''
+        load_buffers(self._get_data_buffers(parameters))
+
+    def _get_data_buffers(self, parameters=None):
+        '''
+        Returns the buffers with the data of the parameters and their setpoints.
+        '''
+        if parameters is None:
+            return [m_param.data_buffer for m_param in self.__data_set_raw.measurement_parameters_raw]
+        data_buffers = []
+        for parameter in parameters:
+            data_buffers += self(parameter)._get_data_buffers()
+        return data_buffers
 
     def sync(self):
         '''
         Updates dataset in case only part of the points were downloaded.
         '''
-        if self.completed == False:
+        # data of a measurement written by this process is already in the buffers.
+        if self.completed == False and not self.__data_set_raw.running:
             SQL_ds_creator = SQL_dataset_creator()
-            self.completed = SQL_ds_creator.is_completed(self.exp_uuid)
-            self.__data_set_raw.sync_buffers()
+            completed, write_cursors = SQL_ds_creator.get_sync_state(self.exp_uuid)
+            if len(write_cursors) != len(self.__data_set_raw.measurement_parameters_raw):
+                # old format: write cursors are not in measurement_parameters
+                write_cursors = None
+            self.__data_set_raw.sync_buffers(write_cursors)
+            self.completed = completed
 
     def __write_to_db(self, force = False):
         '''
-        update values every 200ms to the database.
+        update values to the database with the interval of the flush policy.
 
         Args:
             force (bool) : enforce the update
         '''
-        current_time = time.time()
-        # increase flush interval for long measurements to reduce overhead
-        run_duration = current_time - self.__data_set_raw.UNIX_start_time
-        flush_interval = 0.25
-        if run_duration > 10.0: flush_interval *= 2
-        if run_duration > 30.0: flush_interval *= 2
-        if current_time - self.last_commit > flush_interval or force==True:
-            self.__data_set_raw.sync_buffers()
-            SQL_ds_creator = SQL_dataset_creator()
-            SQL_ds_creator.update_write_cursors(self.__data_set_raw)
-            self.last_commit = time.time()
+        if force or time.time() - self.last_commit > self.__flush_policy.interval():
+            self.__flush()
+
+    def __store_snapshot(self, wait):
+        # stores the snapshot captured in a separate thread when it is ready.
+        ds_raw = self.__data_set_raw
+        future = ds_raw.snapshot_pending
+        if future is None or not (wait or future.done()):
+            return
+        if ds_raw.snapshot_encoded is None:
+            try:
+                ds_raw.snapshot_encoded = future.result()
+            except Exception:
+                logger.error('Station snapshot failed. No snapshot will be stored.', exc_info=True)
+                ds_raw.snapshot_pending = None
+                return
+        SQL_dataset_creator().update_snapshot(ds_raw)
+        ds_raw.snapshot_pending = None
+
+    def __flush(self, wait_snapshot=False):
+        start = time.perf_counter()
+        written_size = self.__data_set_raw.written_size()
+        spool = self.__spool
+        if spool is None:
+            self.__write_data(wait_snapshot)
+        else:
+            # all data is first written to the spool. When the database is not available
+            # the data is kept in the spool and the write to the database is retried later.
+            spool.save(self.__data_set_raw)
+            if not spool.retry_due():
+                self.last_commit = time.time()
+                return
+            try:
+                self.__write_data(wait_snapshot)
+            except CONNECTION_ERRORS as ex:
+                self.__data_set_raw.rollback_buffers()
+                spool.db_failed(ex)
+                self.last_commit = time.time()
+                if self.__writer is None and not self.__completing:
+                    # retry in a separate thread. The measurement should not wait for the database.
+                    self.start_async_writer()
+                return
+            spool.db_ok()
+        self.last_commit = time.time()
+        self.__flush_policy.flush_done(time.perf_counter() - start,
+                                       self.__data_set_raw.written_size() - written_size)
+
+    def __write_data(self, wait_snapshot):
+        ds_raw = self.__data_set_raw
+        SQL_ds_creator = SQL_dataset_creator()
+        conn = SQL_ds_creator.conn
+        try:
+            ds_raw.set_connection(conn)
+            self.__store_snapshot(wait=wait_snapshot)
+            ds_raw.sync_buffers()
+            SQL_ds_creator.update_write_cursors(ds_raw)
+        except:
+            # After exception the connection cannot be used anymore.
+            # A new connection will automatically be opened for the next command.
+            conn.close()
+            raise
+        ds_raw.commit_buffers()
 
     def __repr__(self):
         output_print = "DataSet :: {}\n\nid = {}\nuuid = {}\n\n".format(self.name, self.exp_id, self.exp_uuid)
@@ -22,10 +22,12 @@ def dump_data_to_HDF5(exp_uuid, file_location):
     f = h5py.File(f"{file_location}/{exp_uuid}.hdf5", "w")
 
     # TODO use fetch_raw_dataset_by_UUID instead of this copy/pasted code below.
-    if load_ds_queries.check_uuid(SQL_database_manager().conn_local, exp_uuid):
-        conn = SQL_database_manager().conn_local
-    elif load_ds_queries.check_uuid(SQL_database_manager().conn_remote, exp_uuid):
-        conn = SQL_database_manager().conn_remote
+    conn_local = SQL_database_manager().get_connection('reader')
+    conn_remote = SQL_database_manager().get_connection('reader', remote=True)
+    if load_ds_queries.check_uuid(conn_local, exp_uuid):
+        conn = conn_local
+    elif load_ds_queries.check_uuid(conn_remote, exp_uuid):
+        conn = conn_remote
         sync = sync2local
     else:
         raise ValueError("the uuid {}, does not exist in the local/remote database.".format(exp_uuid))
@@ -36,16 +38,14 @@ def dump_data_to_HDF5(exp_uuid, file_location):
     if data['stop_time'] is None:
         data['stop_time'] = data['start_time']
 
-    if data['snapshot'] is not None:
-        data['snapshot'] = json.loads(data['snapshot'].tobytes())
-
     if data['metadata'] is not None:
         data['metadata'] = json.loads(data['metadata'].tobytes())
 
     ds = data_set_raw(exp_id=data['id'], exp_uuid=data['uuid'], exp_name=data['exp_name'],
         set_up = data['set_up'], project = data['project'], sample = data['sample'],
         UNIX_start_time=data['start_time'].timestamp(), UNIX_stop_time=data['stop_time'].timestamp(),
-        SQL_datatable=data['exp_data_location'],snapshot=data['snapshot'], metadata=data['metadata'],
+        SQL_datatable=data['exp_data_location'], metadata=data['metadata'],
+        snapshot_encoded=load_ds_queries.get_snapshot(conn, data),
         keywords=data['keywords'], completed=data['completed'],)
 
     var_names =    ("param_id", "nth_set", "nth_dim", "param_id_m_param",
@@ -58,7 +58,7 @@ def dump_data_to_HDF5(exp_uuid, file_location):
     for row in return_data:
         raw_data_row = m_param_raw(*row)
         raw_data_row.data_buffer = raw_data_row.oid # buffer_reader(conn, raw_data_row.oid, raw_data_row.shape)
-        data = buffer_reader(conn, raw_data_row.oid, raw_data_row.shape)
+        data = buffer_reader(raw_data_row.oid, raw_data_row.shape, remote=conn is conn_remote)
         f.create_dataset(f"{raw_data_row.oid}", data.buffer.shape)
         f[f"{raw_data_row.oid}"][:] = data.buffer
         data_raw.append(raw_data_row)
@@ -1,7 +1,9 @@
 from core_tools.data.SQL.connect import sample_info
-from core_tools.data.SQL.buffer_writer import buffer_reference
+from core_tools.data.SQL.snapshot_storage import stored_snapshot
+from concurrent.futures import Future
 from dataclasses import dataclass, field
 import copy
+import numpy as np
 
 
 @dataclass
@@ -22,11 +24,16 @@ class data_set_raw:
     UNIX_stop_time : int = None
 
     snapshot : dict = None
+    snapshot_encoded : stored_snapshot = None
+    # snapshot that is captured in a separate thread
+    snapshot_pending : Future = None
     metadata : dict = None
     keywords : list = field(default_factory=lambda: [])
 
     completed : bool = False
     starred : bool = False
+    # measurement is written by this process
+    running : bool = False
 
     def generate_keywords(self):
         set_param = []
@@ -46,15 +53,58 @@ class data_set_raw:
         get_param = {p:None for p in get_param}
         return list(set_param.keys())[::-1] + list(get_param.keys())
 
-    def sync_buffers(self):
+    def get_snapshot(self):
+        # the snapshot is decoded on first access
+        if self.snapshot is None:
+            snapshot_encoded = self.snapshot_encoded
+            if snapshot_encoded is None and self.snapshot_pending is not None:
+                snapshot_encoded = self.snapshot_pending.result()
+            if snapshot_encoded is not None:
+                self.snapshot = snapshot_encoded.decode()
+        return self.snapshot
+
+    def sync_buffers(self, write_cursors=None):
+        if write_cursors is None:
+            for m_param in self.measurement_parameters_raw:
+                m_param.data_buffer.sync()
+        else:
+            for m_param, write_cursor in zip(self.measurement_parameters_raw, write_cursors):
+                m_param.data_buffer.sync(write_cursor)
+
+    def set_connection(self, conn):
+        for m_param in self.measurement_parameters_raw:
+            if m_param.data_buffer.conn is not conn:
+                m_param.data_buffer.set_connection(conn)
+
+    def commit_buffers(self):
+        for m_param in self.measurement_parameters_raw:
+            m_param.data_buffer.commit()
+
+    def rollback_buffers(self):
+        for m_param in self.measurement_parameters_raw:
+            m_param.data_buffer.rollback()
+
+    def pending_size(self):
+        # number of values in the buffers that is not yet written to the database
+        pending = 0
         for m_param in self.measurement_parameters_raw:
-            m_param.data_buffer.sync()
+            pending += m_param.data_buffer.cursor - m_param.data_buffer.cursor_db
+
+        return pending
+
+    def written_size(self):
+        # number of bytes written to the database
+        size = 0
+        for m_param in self.measurement_parameters_raw:
+            size += m_param.data_buffer.cursor_db*np.dtype(m_param.dtype).itemsize
+
+        return size
 
     def size(self):
         # size in bytes
         size = 0
         for m_param in self.measurement_parameters_raw:
-            size += m_param.data_buffer.cursor*8 #(64 bit numbers)
+            size += m_param.data_buffer.cursor*np.dtype(m_param.dtype).itemsize
 
         return size
 
@@ -75,9 +125,12 @@ class m_param_raw:
     size : int
     oid : int
     data_buffer : any = None
+    dtype : str = 'float64' # numpy dtype name
+    chunk_size : int = None # number of values per large object if stored in chunks
 
     def __copy__(self):
-        data_buffer = buffer_reference(self.data_buffer.data)
+        data_buffer = self.data_buffer.reference()
         return m_param_raw(copy.copy(self.param_id), copy.copy(self.nth_set), copy.copy(self.nth_dim), copy.copy(self.param_id_m_param), copy.copy(self.setpoint),
             copy.copy(self.setpoint_local), copy.copy(self.name_gobal), copy.copy(self.name), copy.copy(self.label),
-            copy.copy(self.unit), copy.copy(self.dependency), copy.copy(self.shape), copy.copy(self.size), copy.copy(self.oid), data_buffer)
\ No newline at end of file
+            copy.copy(self.unit), copy.copy(self.dependency), copy.copy(self.shape), copy.copy(self.size), copy.copy(self.oid), data_buffer,
+            self.dtype, self.chunk_size)
\ No newline at end of file
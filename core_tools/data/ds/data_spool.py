@@ -0,0 +1,411 @@
+'''
+Local write-ahead spool of the data of a running measurement.
+
+With the spool enabled the buffers of a measurement are memory mapped files in the spool directory.
+All data is written to the spool first and then written to the database by the flushes.
+When the database is not reachable the measurement continues and the data is kept in the spool.
+The data is written to the database when the connection has been restored.
+
+The spool of a measurement is a directory with a JSON manifest and a .npy file per parameter.
+A snapshot that has not been stored in the database is kept in snapshot.json.
+The manifest contains the oids of the large objects and the number of values in the spool
+and in the database. The spool is removed when all data has been committed to the database.
+Spools of measurements that completed while the database was not reachable are
+replayed in a background thread.
+'''
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+import psycopg2
+
+from core_tools.data.SQL.connect import SQL_conn_info_local
+from core_tools.data.SQL.buffer_writer import chunked_buffer_writer, empty_buffer, write_lobject
+from core_tools.data.SQL.snapshot_storage import stored_snapshot
+from core_tools.data.SQL.queries.dataset_creation_queries import (
+        measurement_overview_queries,
+        measurement_parameters_queries,
+        snapshot_store_queries,
+        )
+
+logger = logging.getLogger(__name__)
+
+# errors caused by a lost or unavailable database connection.
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class spool_settings:
+    enabled = False
+    directory = '~/.core_tools/spool'
+    # time between retries to write to the database. It is doubled on every retry up to retry_max.
+    retry_interval = 1.0
+    retry_max = 30.0
+    # maximum time to wait for a snapshot that is still being captured when a measurement is spooled.
+    snapshot_timeout = 60.0
+
+
+def set_spool(enabled=True, directory=None):
+    '''
+    Enables the local write-ahead spool for new measurements.
+
+    Args:
+        enabled (bool) : enable the spool.
+        directory (str) : directory for the spool files. Default: '~/.core_tools/spool'
+    '''
+    spool_settings.enabled = enabled
+    if directory is not None:
+        spool_settings.directory = directory
+
+
+def _spool_root():
+    return os.path.expanduser(spool_settings.directory)
+
+
+def _write_json(path, data):
+    _write_text(path, json.dumps(data))
+
+
+def _write_text(path, text):
+    # write to temporary file and replace manifest, to never leave a corrupt manifest.
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as fp:
+        fp.write(text)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp_path, path)
+
+
+class data_spool:
+    '''
+    Spool of a single measurement.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.manifest = {'exp_uuid': None, 'completed': False, 'parameters': []}
+        self._files = []
+        # manifest as last written to disk
+        self._saved_manifest = None
+        self._retry_time = None
+        self._retry_interval = spool_settings.retry_interval
+
+    @staticmethod
+    def create():
+        path = os.path.join(_spool_root(), f'{time.strftime("%Y%m%d_%H%M%S")}_{uuid.uuid4().hex[:8]}')
+        os.makedirs(path)
+        return data_spool(path)
+
+    def allocate(self, shape, dtype, fill=True):
+        '''
+        Returns a memory mapped file for the data of a parameter.
+
+        Args:
+            shape (list[int]) : shape of the data
+            dtype (str) : numpy dtype of the data
+            fill (bool) : if True fill the buffer with NaN for floating point and complex data.
+        '''
+        file_name = f'param_{len(self._files)}.npy'
+        buffer = np.lib.format.open_memmap(os.path.join(self.path, file_name), mode='w+',
+                                           dtype=dtype, shape=tuple(shape))
+        if fill:
+            buffer[...] = empty_buffer(1, dtype)
+        self._files.append((file_name, buffer))
+        return buffer
+
+    def attach(self, data_buffer):
+        '''
+        Moves the data of an existing buffer writer to the spool.
+        '''
+        if isinstance(data_buffer.buffer, np.memmap):
+            return
+        buffer = self.allocate(data_buffer.shape, data_buffer.dtype, fill=False)
+        buffer.ravel()[:] = data_buffer.buffer
+        data_buffer.buffer = buffer.ravel()
+
+    def register(self, ds_raw):
+        '''
+        Stores the description of the registered measurement in the manifest.
+        '''
+        parameters = []
+        for param_index, m_param in enumerate(ds_raw.measurement_parameters_raw):
+            data_buffer = m_param.data_buffer
+            if isinstance(data_buffer, chunked_buffer_writer):
+                buffer = data_buffer.spool_buffer
+                chunk_oids = data_buffer.chunk_oids
+            else:
+                buffer = data_buffer.buffer
+                chunk_oids = None
+            file_name = next(file_name for file_name, spool_buffer in self._files
+                             if np.may_share_memory(spool_buffer, buffer))
+            parameters.append({
+                'param_index': param_index,
+                'file': file_name,
+                'dtype': m_param.dtype,
+                'size': m_param.size,
+                'oid': m_param.oid,
+                'chunk_size': m_param.chunk_size,
+                'chunk_oids': chunk_oids,
+                'cursor': 0,
+                'cursor_db': 0,
+                })
+        self.manifest.update({
+            'exp_uuid': ds_raw.exp_uuid,
+            'exp_id': ds_raw.exp_id,
+            'parameters': parameters,
+            })
+        self.save(ds_raw)
+
+    def save(self, ds_raw):
+        '''
+        Writes the spooled data to disk and updates the cursors in the manifest.
+        Only the files with new data are synced and the manifest is only written when it changed.
+        '''
+        cursors = [(m_param.data_buffer.cursor, m_param.data_buffer.cursor_committed)
+                   for m_param in ds_raw.measurement_parameters_raw]
+        modified_files = set()
+        for parameter, (cursor, cursor_db) in zip(self.manifest['parameters'], cursors):
+            if cursor != parameter['cursor']:
+                modified_files.add(parameter['file'])
+            parameter['cursor'] = cursor
+            parameter['cursor_db'] = cursor_db
+        first_save = self._saved_manifest is None
+        for file_name, buffer in self._files:
+            if first_save or file_name in modified_files:
+                buffer.flush()
+        manifest = json.dumps(self.manifest)
+        if manifest != self._saved_manifest:
+            _write_text(os.path.join(self.path, 'manifest.json'), manifest)
+            self._saved_manifest = manifest
+
+    @property
+    def db_available(self):
+        '''
+        False if the last access to the database failed.
+        '''
+        return self._retry_time is None
+
+    def retry_due(self):
+        '''
+        Returns True if the database should be accessed. After a connection error
+        the database is only accessed after the retry interval.
+        '''
+        return self._retry_time is None or time.perf_counter() > self._retry_time
+
+    def db_failed(self, exception):
+        if self._retry_time is None:
+            logger.warning(f'Database not available. Data is kept in spool {self.path}. ({exception})')
+        else:
+            self._retry_interval = min(2*self._retry_interval, spool_settings.retry_max)
+        self._retry_time = time.perf_counter() + self._retry_interval
+
+    def db_ok(self):
+        if self._retry_time is not None:
+            logger.warning(f'Database available again. Writing data from spool {self.path}')
+            self._retry_time = None
+            self._retry_interval = spool_settings.retry_interval
+
+    def complete(self, ds_raw):
+        '''
+        Marks the measurement as completed in the spool. The spool will be written
+        to the database in a background thread.
+        '''
+        snapshot_pending = ds_raw.snapshot_pending is not None
+        if snapshot_pending and ds_raw.snapshot_encoded is None:
+            try:
+                ds_raw.snapshot_encoded = ds_raw.snapshot_pending.result(
+                        timeout=spool_settings.snapshot_timeout)
+            except Exception:
+                logger.error(f'Station snapshot of measurement {ds_raw.exp_id} not available. '
+                             'No snapshot will be stored.', exc_info=True)
+        if snapshot_pending and ds_raw.snapshot_encoded is not None:
+            _write_text(os.path.join(self.path, 'snapshot.json'), ds_raw.snapshot_encoded.to_json())
+        self.manifest['completed'] = True
+        self.manifest['stop_time'] = ds_raw.UNIX_stop_time
+        self.manifest['snapshot_pending'] = snapshot_pending
+        # explicit marker for a snapshot that has not been captured.
+        self.manifest['snapshot_missing'] = snapshot_pending and ds_raw.snapshot_encoded is None
+        self.save(ds_raw)
+        logger.error(f'Database not available at end of measurement {ds_raw.exp_id}. '
+                     f'The data is stored in spool {self.path} and will be written '
+                     'to the database when it is available.')
+        start_spool_replay()
+
+    def remove(self):
+        self._files = []
+        _remove_spool(self.path)
+
+
+def _remove_spool(path):
+    try:
+        shutil.rmtree(path)
+    except OSError:
+        # on Windows files cannot be removed while they are memory mapped.
+        # Mark as written. It will be removed later.
+        logger.debug(f'Spool {path} not removed', exc_info=True)
+        try:
+            _write_json(os.path.join(path, 'manifest.json'), {'written': True})
+        except OSError:
+            pass
+
+
+def _connect_local():
+    info = SQL_conn_info_local
+    return psycopg2.connect(dbname=info.dbname, user=info.user,
+                            password=info.passwd, host=info.host, port=info.port)
+
+
+def _write_param(conn, path, parameter):
+    cursor_db = parameter['cursor_db']
+    cursor = parameter['cursor']
+    if cursor <= cursor_db:
+        return
+    data = np.load(os.path.join(path, parameter['file']), mmap_mode='r').ravel()
+    chunk_size = parameter['chunk_size']
+    if chunk_size is None:
+        oids = [parameter['oid']]
+        chunk_size = data.size
+    else:
+        oids = parameter['chunk_oids']
+    pos = cursor_db
+    while pos < cursor:
+        i_chunk, offset = divmod(pos, chunk_size)
+        n = min(cursor - pos, chunk_size - offset)
+        lobject = conn.lobject(oids[i_chunk], 'w')
+        try:
+            lobject.seek(offset*data.itemsize)
+            write_lobject(lobject, data[pos:pos+n])
+        finally:
+            lobject.close()
+        pos += n
+
+
+def replay_spool(path):
+    '''
+    Writes the data of a spooled measurement to the database and removes the spool.
+
+    Args:
+        path (str) : directory of the spool
+    '''
+    with open(os.path.join(path, 'manifest.json')) as fp:
+        manifest = json.load(fp)
+    if manifest.get('written', False):
+        _remove_spool(path)
+        return
+    exp_uuid = manifest['exp_uuid']
+    if exp_uuid is None:
+        # measurement was never registered in the database.
+        _remove_spool(path)
+        return
+    logger.info(f'Writing spooled measurement {manifest.get("exp_id")} to database')
+    conn = _connect_local()
+    try:
+        parameters = manifest['parameters']
+        for parameter in parameters:
+            _write_param(conn, path, parameter)
+        measurement_parameters_queries.update_cursors(
+                conn, exp_uuid, [parameter['cursor'] for parameter in parameters],
+                flag_data_unsynchronized=True)
+        snapshot_path = os.path.join(path, 'snapshot.json')
+        snapshot = None
+        if manifest.get('snapshot_missing'):
+            logger.warning(f'Spooled measurement {manifest.get("exp_id")} has no snapshot')
+        elif manifest.get('snapshot_pending') and os.path.exists(snapshot_path):
+            with open(snapshot_path) as fp:
+                snapshot = stored_snapshot.from_json(fp.read())
+            measurement_overview_queries.update_snapshot(conn, exp_uuid, snapshot)
+        if manifest['completed']:
+            data_size = sum(parameter['cursor']*np.dtype(parameter['dtype']).itemsize
+                            for parameter in parameters)
+            measurement_overview_queries.update_measurement(
+                conn, exp_uuid,
+                stop_time=manifest['stop_time'],
+                completed=True,
+                # NOTE: column data_size is INT.
+                data_size=min(data_size, 2**31-1),
+                table_synchronized=False,
+                data_synchronized=False)
+        conn.commit()
+        if snapshot is not None:
+            if snapshot.station_hash is not None:
+                snapshot_store_queries.set_stored(conn, snapshot)
+    finally:
+        conn.close()
+    _remove_spool(path)
+
+
+def get_spools(include_incomplete=False):
+    '''
+    Returns the directories of the spooled measurements.
+
+    Args:
+        include_incomplete (bool) : include the spools of measurements that did not complete.
+            These are measurements that are still running, or that were aborted by a crash of the process.
+    '''
+    root = _spool_root()
+    if not os.path.isdir(root):
+        return []
+    spools = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        try:
+            with open(os.path.join(path, 'manifest.json')) as fp:
+                manifest = json.load(fp)
+        except (OSError, ValueError):
+            continue
+        if include_incomplete or manifest.get('completed', False) or manifest.get('written', False):
+            spools.append(path)
+    return spools
+
+
+def replay_spools(include_incomplete=False):
+    '''
+    Writes the data of all spooled measurements to the database.
+
+    Args:
+        include_incomplete (bool) : also write the spools of measurements that did not complete,
+            e.g. because the process crashed. Do not use this while a measurement is running.
+    '''
+    for path in get_spools(include_incomplete):
+        replay_spool(path)
+
+
+class _spool_replayer:
+    lock = threading.Lock()
+    thread = None
+
+
+def _replay_loop():
+    retry_interval = spool_settings.retry_interval
+    while True:
+        try:
+            replay_spools()
+            return
+        except CONNECTION_ERRORS as ex:
+            logger.info(f'Database not available for replay of spool ({ex})')
+        except Exception:
+            logger.error('Replay of spool failed', exc_info=True)
+            return
+        time.sleep(retry_interval)
+        retry_interval = min(2*retry_interval, spool_settings.retry_max)
+
+
+def _run_replay():
+    try:
+        _replay_loop()
+    finally:
+        with _spool_replayer.lock:
+            _spool_replayer.thread = None
+
+
+def start_spool_replay():
+    '''
+    Starts a background thread that writes the spools of completed measurements to the database.
+    '''
+    with _spool_replayer.lock:
+        if _spool_replayer.thread is None:
+            _spool_replayer.thread = threading.Thread(target=_run_replay, name='spool_replay', daemon=True)
+            _spool_replayer.thread.start()
@@ -0,0 +1,168 @@
+'''
+Policies for the interval between two flushes of the data of a running measurement to the database.
+
+A flush writes the new data to the large objects and commits the write cursors.
+Every flush has a fixed overhead (round trips and commit). Flushing less often reduces
+the load on the database, but increases the delay of the data in live plotting.
+'''
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+import time
+
+
+@dataclass
+class flush_statistics:
+    '''
+    Statistics of the flushes of a measurement.
+
+    Args:
+        n_flushes (int) : number of flushes
+        total_duration (float) : total time [s] spent in flushes
+        max_duration (float) : maximum duration [s] of a flush
+        last_duration (float) : duration [s] of the last flush
+        total_bytes (int) : total number of bytes written
+        last_bytes (int) : number of bytes written in the last flush
+        interval (float) : current interval [s] between flushes
+    '''
+    n_flushes: int = 0
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+    last_duration: float = 0.0
+    total_bytes: int = 0
+    last_bytes: int = 0
+    interval: float = 0.0
+
+    @property
+    def mean_duration(self):
+        return self.total_duration / self.n_flushes if self.n_flushes else 0.0
+
+    @property
+    def mean_bytes(self):
+        return self.total_bytes / self.n_flushes if self.n_flushes else 0.0
+
+
+class flush_policy(ABC):
+    '''
+    Base class of flush policies. The policy determines the time between two flushes.
+    '''
+    def __init__(self):
+        self.statistics = flush_statistics(interval=self.interval())
+
+    @abstractmethod
+    def interval(self):
+        '''
+        Returns:
+            float : time [s] between two flushes.
+        '''
+
+    def flush_done(self, duration, n_bytes):
+        '''
+        Must be called after every flush.
+
+        Args:
+            duration (float) : duration [s] of the flush
+            n_bytes (int) : number of bytes written
+        '''
+        stats = self.statistics
+        stats.n_flushes += 1
+        stats.total_duration += duration
+        stats.max_duration = max(stats.max_duration, duration)
+        stats.last_duration = duration
+        stats.total_bytes += n_bytes
+        stats.last_bytes = n_bytes
+        stats.interval = self.interval()
+
+
+class fixed_flush_policy(flush_policy):
+    '''
+    Flushes with a fixed interval.
+    '''
+    def __init__(self, interval=0.25):
+        '''
+        Args:
+            interval (float) : time [s] between two flushes.
+        '''
+        self._interval = interval
+        super().__init__()
+
+    def interval(self):
+        return self._interval
+
+
+class adaptive_flush_policy(flush_policy):
+    '''
+    Adapts the flush interval to the measured flush latency and data rate.
+
+    The interval is chosen such that the fraction of the time spent in flushes
+    does not exceed max_load. The interval is shortened when the data written per flush
+    exceeds max_flush_size. The interval is bounded by min_interval and max_staleness.
+    '''
+    # weight of new value in exponential moving average
+    _alpha = 0.2
+
+    def __init__(self, min_interval=0.25, max_staleness=2.0, max_load=0.05,
+                 max_flush_size=64*1024**2):
+        '''
+        Args:
+            min_interval (float) : minimum time [s] between two flushes.
+            max_staleness (float) : maximum time [s] between two flushes.
+                This is the maximum delay of data in live plotting.
+            max_load (float) : maximum fraction of time spent in flushes.
+            max_flush_size (int) : preferred maximum number of bytes per flush.
+        '''
+        self.min_interval = min_interval
+        self.max_staleness = max_staleness
+        self.max_load = max_load
+        self.max_flush_size = max_flush_size
+        self._latency = None
+        self._data_rate = None
+        self._last_flush = time.perf_counter()
+        super().__init__()
+
+    def _average(self, average, value):
+        if average is None:
+            return value
+        return (1 - self._alpha) * average + self._alpha * value
+
+    def interval(self):
+        interval = self.min_interval
+        if self._latency is not None:
+            interval = self._latency / self.max_load
+        if self._data_rate:
+            interval = min(interval, self.max_flush_size / self._data_rate)
+        return min(max(interval, self.min_interval), self.max_staleness)
+
+    def flush_done(self, duration, n_bytes):
+        now = time.perf_counter()
+        elapsed = now - self._last_flush
+        self._last_flush = now
+        self._latency = self._average(self._latency, duration)
+        if elapsed > 0:
+            self._data_rate = self._average(self._data_rate, n_bytes / elapsed)
+        super().flush_done(duration, n_bytes)
+
+
+flush_policies = {
+    'adaptive': adaptive_flush_policy,
+    'latency': lambda: adaptive_flush_policy(min_interval=0.05, max_staleness=0.25, max_load=0.2),
+    'throughput': lambda: adaptive_flush_policy(min_interval=1.0, max_staleness=10.0, max_load=0.01),
+    'fixed': fixed_flush_policy,
+    }
+
+
+def get_flush_policy(policy=None):
+    '''
+    Returns a new flush policy.
+
+    Args:
+        policy (Union[None, str, flush_policy]) : policy object or name of the policy:
+            'adaptive', 'latency', 'throughput' or 'fixed'. None returns the default 'adaptive'.
+    '''
+    if policy is None:
+        policy = 'adaptive'
+    if isinstance(policy, flush_policy):
+        return policy
+    if policy not in flush_policies:
+        raise ValueError(f"Unknown flush policy '{policy}'. "
+                         f"Options: {list(flush_policies.keys())}")
+    return flush_policies[policy]()
@@ -38,6 +38,7 @@ def to_raw_param(xr_param, param_id,
         shape=str(data.shape),
         size=-1,
         oid=-1,
+        dtype=data.dtype.name,
         )
     raw_param.data_buffer = buffer_reference(data)
     return raw_param
@@ -1,5 +1,7 @@
 from core_tools.data.SQL.SQL_connection_mgr import SQL_database_manager
-from core_tools.data.SQL.buffer_writer import buffer_writer, buffer_reader
+from core_tools.data.SQL.buffer_writer import (
+        buffer_writer, buffer_reader, chunked_buffer_writer, empty_buffer,
+        CHUNKED_STORAGE_MIN_SIZE)
 from core_tools.data.ds.data_set_raw import m_param_raw
 from dataclasses import dataclass, field
 
@@ -8,12 +10,13 @@ import numpy as np
 
 
 class dataclass_raw_parent:
-    def generate_data_buffer(self, setpoint_shape=[]):
+    def generate_data_buffer(self, setpoint_shape=[], spool=None):
         '''
         generate the buffers that are needed to write the data to the database.
 
         Args:
             setpoint_shape (list) : shape of the setpoints (if applicable) (measurent param is measured exactly the same amount of times than the setpoint)
+            spool (data_spool) : if not None the buffers are allocated in the spool.
         '''
         SQL_mgr = SQL_database_manager()
 
@@ -22,14 +25,28 @@ class dataclass_raw_parent:
             if i <= len(self.oid): # write data
                 if len(self.data) > i: #this is statement is kinda dirty..
                     arr=self.data[i]
+                elif np.prod(shape) > CHUNKED_STORAGE_MIN_SIZE:
+                    # large data is not kept in memory, but stored in chunks.
+                    spool_buffer = None
+                    if spool is not None:
+                        spool_buffer = spool.allocate([np.prod(shape)], self.dtype, fill=False)
+                    data_buffer = chunked_buffer_writer(SQL_mgr.conn_local, shape, self.dtype,
+                                                        spool_buffer=spool_buffer)
+                    self.data.append(None)
+                    self.oid.append(None)
+                    self.data_buffer.append(data_buffer)
+                    continue
+                elif spool is not None:
+                    arr = spool.allocate(shape, self.dtype)
+                    self.data.append(arr)
                 else:
-                    arr = np.full(shape, np.nan, order='C')
+                    arr = empty_buffer(shape, self.dtype)
                     self.data.append(arr)
                 data_buffer = buffer_writer(SQL_mgr.conn_local, arr)
                 self.oid.append(data_buffer.oid)
             else: # load data
                 oid = self.oid[i]
-                data_buffer = buffer_reader(SQL_mgr.conn_local, oid, shape)
+                data_buffer = buffer_reader(oid, shape, self.dtype)
                 arr = data_buffer.buffer
                 self.data.append(arr)
 
@@ -48,15 +65,15 @@ class dataclass_raw_parent:
             raise KeyError(txt)
         data_in = input_data[self.id_info]
 
+        # NOTE: the data is not flattened, because this could make a copy.
+        #       The writer copies the data directly into its buffer.
         if len(self.data) == 1:
             # data in is not a iterator
-            data = np.ravel(np.asarray(data_in))
-            self.data_buffer[0].write(data)
+            self.data_buffer[0].write(np.asarray(data_in))
         else:
             # data_in expected to be a iterator
             for i in range(len(data_in)):
-                data = np.ravel(np.asarray(data_in[i]))
-                self.data_buffer[i].write(data)
+                self.data_buffer[i].write(np.asarray(data_in[i]))
 
     def to_SQL_data_structure(self, m_param_id, setpoint, setpoint_local, nth_dim=0, dependencies=[]):
         '''
@@ -71,9 +88,12 @@ class dataclass_raw_parent:
         '''
         data_items = list()
         for i in range(len(self.data)):
+            data_buffer = self.data_buffer[i]
+            chunk_size = data_buffer.chunk_size if isinstance(data_buffer, chunked_buffer_writer) else None
             data_items +=[m_param_raw(self.uuid_dc, i, nth_dim, m_param_id, setpoint, setpoint_local,
                 self.name, self.names[i], self.labels[i],
-                self.units[i], dependencies[i], self.data[i].shape, self.data[i].size, self.oid[i], self.data_buffer[i])]
+                self.units[i], dependencies[i], data_buffer.shape, int(np.prod(data_buffer.shape)), self.oid[i], data_buffer,
+                data_buffer.dtype.name, chunk_size)]
 
         return data_items
 
@@ -91,6 +111,7 @@ class setpoint_dataclass(dataclass_raw_parent):
     oid : list = field(default_factory=lambda: [])
     data_buffer : list = field(default_factory=lambda: [])
     uuid_dc : int = field(default_factory=lambda: int.from_bytes(uuid.uuid1().bytes, byteorder='big', signed=True)>>64)
+    dtype : str = 'float64'
 
     def __repr__(self):
         description = "id :: {} \tname :: {}\tnpt :: {}\n".format(self.id_info, self.name, self.npt)
@@ -106,7 +127,8 @@ class setpoint_dataclass(dataclass_raw_parent):
         return dep_tot
 
     def __copy__(self):
-        return setpoint_dataclass(self.id_info, self.npt, self.name, self.names, self.labels, self.units, self.shapes, self.nth_set)
+        return setpoint_dataclass(self.id_info, self.npt, self.name, self.names, self.labels, self.units, self.shapes, self.nth_set,
+                                  dtype=self.dtype)
 
 @dataclass
 class m_param_dataclass(dataclass_raw_parent):
@@ -122,6 +144,7 @@ class m_param_dataclass(dataclass_raw_parent):
     oid : list = field(default_factory=lambda: [])
     data_buffer : list = field(default_factory=lambda: [])
     uuid_dc : int = field(default_factory=lambda: int.from_bytes(uuid.uuid1().bytes, byteorder='big', signed=True)>>64)
+    dtype : str = 'float64'
     __initialized : bool = False
 
     def write_data(self, input_data):
@@ -151,18 +174,21 @@ class m_param_dataclass(dataclass_raw_parent):
 
         return data_items
 
-    def init_data_dataclass(self):
+    def init_data_dataclass(self, spool=None):
         '''
         initialize the arrays in the dataset.
+
+        Args:
+            spool (data_spool) : if not None the buffers are allocated in the spool.
         '''
         setpoint_shape = []
         for setpoint in self.setpoints:
             setpoint_shape += [setpoint.npt]
 
         for setpoint in self.setpoints:
-            setpoint.generate_data_buffer(setpoint_shape)
+            setpoint.generate_data_buffer(setpoint_shape, spool)
 
-        self.generate_data_buffer(setpoint_shape)
+        self.generate_data_buffer(setpoint_shape, spool)
         self.__initialized = True
 
     @property
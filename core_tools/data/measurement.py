@@ -40,8 +40,31 @@ class Measurement:
     class used to describe a measurement.
     '''
 
-    def __init__(self, name, silent=False):
+    def __init__(self, name, silent=False, async_flush=False,
+                 async_snapshot=False, cached_snapshot=False, flush_policy=None):
+        '''
+        Args:
+            name (str) : name of the measurement
+            silent (bool) : if True do not print the id of the measurement
+            async_flush (bool) : if True the data is written to the database in a separate thread
+                and add_result does not wait for the database.
+            async_snapshot (bool) : if True the station snapshot is captured in a separate thread
+                while the measurement starts. Parameters changed during the first points of
+                the measurement can then already have the new value in the snapshot.
+                The snapshot is then always made with the cached parameter values,
+                because the instruments cannot be accessed from a separate thread.
+            cached_snapshot (bool) : if True the snapshot uses the cached parameter values
+                instead of getting the values from the instruments.
+            flush_policy (Union[None, str, flush_policy]) : policy for the interval between two writes
+                of the data to the database: 'adaptive' (default), 'latency', 'throughput', 'fixed',
+                or a new flush_policy object. The statistics of the flushes are available in
+                `dataset.flush_statistics`.
+        '''
         self.silent = silent
+        self.async_flush = async_flush
+        self.async_snapshot = async_snapshot
+        self.cached_snapshot = cached_snapshot
+        self.flush_policy = flush_policy
         self.setpoints = dict()
         self.m_param = dict()
         self.dataset = None
@@ -81,11 +104,19 @@ class Measurement:
         self.setpoints[setpoint_parameter_spec.id_info] = setpoint_parameter_spec
         self._add_param_snapshot(parameter)
 
-    def register_get_parameter(self, parameter, *setpoints):
+    def register_get_parameter(self, parameter, *setpoints, dtype='float64'):
         '''
         register parameters that you want to get in a measurement
+
+        Args:
+            parameter (qcodes parameter) : parameter to be admitted to the measurement class
+            setpoints (qcodes parameter) : setpoint parameters registered with register_set_parameter.
+            dtype (str or np.dtype) : data type to store the values. E.g. 'float32', 'int16', 'complex64'.
         '''
         validate_param_name(parameter.name)
+        dtype = np.dtype(dtype)
+        if dtype.kind not in 'iufc':
+            raise ValueError(f'Data type {dtype} not supported')
         param_id = id(parameter)
 
         if param_id in self.setpoints.keys() or param_id in self.m_param.keys():
@@ -104,7 +135,8 @@ class Measurement:
         if isinstance(parameter, qc.Parameter):
             m_param_parameter_spec = m_param_dataclass(
                 id(parameter), parameter.name,
-                [parameter.name], [parameter.label], [parameter.unit])
+                [parameter.name], [parameter.label], [parameter.unit],
+                dtype=dtype.name)
 
         if isinstance(parameter, qc.MultiParameter):
             if len(parameter.names) == 0:
@@ -114,7 +146,8 @@ class Measurement:
             m_param_parameter_spec = m_param_dataclass(
                 id(parameter), parameter.name,
                 list(parameter.names), list(parameter.labels),
-                list(parameter.units), list(parameter.shapes))
+                list(parameter.units), list(parameter.shapes),
+                dtype=dtype.name)
 
             setpoint_local_parameter_spec = None
             for i in range(len(parameter.setpoints)):
@@ -188,7 +221,11 @@ class Measurement:
                 raise Exception('Measurement parameters do not return any data.')
             else:
                 raise Exception('No measurement parameters specified')
-        self.dataset = create_new_data_set(self.name, self.snapshot, *self.m_param.values())
+        self.dataset = create_new_data_set(self.name, self.snapshot, *self.m_param.values(),
+                                           async_flush=self.async_flush,
+                                           async_snapshot=self.async_snapshot,
+                                           cached_snapshot=self.cached_snapshot,
+                                           flush_policy=self.flush_policy)
         msg = f'Starting measurement with id : {self.dataset.exp_id} - {self.name}'
         logger.info(msg)
         if not self.silent:
@@ -1,6 +1,7 @@
 from functools import partial
 from core_tools import __version__ as ct_version
 from core_tools.drivers.hardware.hardware import hardware as hw_parent
+from core_tools.utility.snapshot_state import snapshot_uses_cache
 
 import qcodes as qc
 import numpy as np
@@ -195,9 +196,11 @@ class gates(qc.Instrument):
         return res
 
     def snapshot_base(self, update=False, params_to_skip_update=None):
-        # update real and virtual gates cached values by getting them.
-        for gate_name in self._all_gate_names:
-            self.get(gate_name)
+        # update real and virtual gates cached values by getting them,
+        # unless the snapshot is captured with the cached values.
+        if not snapshot_uses_cache():
+            for gate_name in self._all_gate_names:
+                self.get(gate_name)
 
         return super().snapshot_base(update, params_to_skip_update)
 
@@ -8,6 +8,8 @@ from .db_connection import (
         connect_remote_db,
         connect_local_and_remote_db)
 from .sample_info import set_sample_info
+from core_tools.data.SQL.snapshot_storage import set_snapshot_storage
+from core_tools.data.ds.data_spool import set_spool
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +18,7 @@ def configure(filename):
     cfg = load_configuration(filename)
     _configure_logging(cfg)
     _configure_sample(cfg)
+    _configure_data_storage(cfg)
     _connect_to_db(cfg)
 
 
@@ -26,6 +29,17 @@ def _configure_sample(cfg):
     set_sample_info(project, setup, sample)
 
 
+def _configure_data_storage(cfg):
+    compression = cfg.get('data_storage.snapshot_compression', None)
+    deduplicate = cfg.get('data_storage.snapshot_deduplication', False)
+    delta = cfg.get('data_storage.snapshot_delta', False)
+    delta_base_interval = cfg.get('data_storage.snapshot_delta_base_interval', 50)
+    set_snapshot_storage(compression, deduplicate, delta, delta_base_interval)
+    spool = cfg.get('data_storage.spool', False)
+    spool_directory = cfg.get('data_storage.spool_directory', None)
+    set_spool(spool, spool_directory)
+
+
 def _connect_to_db(cfg):
     use_local = cfg.get('local_database') is not None
     use_remote = cfg.get('remote_database') is not None
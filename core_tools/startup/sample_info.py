@@ -21,5 +21,7 @@ def set_sample_info(project=None, setup=None, sample=None):
     if is_connected():
         db_mgr = SQL_database_manager()
         if not db_mgr.SQL_conn_info_local.readonly:
-            conn_local = db_mgr.conn_local
+            conn_local = db_mgr.get_connection('metadata')
             sample_info_queries.add_sample(conn_local)
+            # commit to release the row lock. The writer also inserts the sample info.
+            conn_local.commit()
@@ -0,0 +1,34 @@
+'''
+State of the station snapshot that is captured in the current thread.
+
+Instruments that get parameter values in snapshot_base can check snapshot_uses_cache()
+to skip these reads when the snapshot must be made with the cached values.
+'''
+from contextlib import contextmanager
+import threading
+
+_snapshot_state = threading.local()
+
+
+def snapshot_uses_cache():
+    '''
+    Returns True if the station snapshot captured in the current thread must use the
+    cached parameter values.
+    '''
+    return getattr(_snapshot_state, 'cached', False)
+
+
+@contextmanager
+def snapshot_from_cache(cached=True):
+    '''
+    Context in which snapshot_uses_cache() returns `cached` for the current thread.
+
+    Args:
+        cached (bool) : snapshot must use the cached parameter values.
+    '''
+    previous = snapshot_uses_cache()
+    _snapshot_state.cached = cached
+    try:
+        yield
+    finally:
+        _snapshot_state.cached = previous
@@ -51,14 +51,14 @@ class variable_mgr():
     def __init__(self):
         # fetch the connection from the database object, no need to connect multiple times.
         if self.conn_local is None:
-            self.conn_local = SQL_database_manager().conn_local
+            self.conn_local = SQL_database_manager().get_connection('metadata')
 
             self.__GUI = None
             self.data = dict()
             self.vars = dict()
             self.__load_variables()
         elif self.conn_local.closed:
-            self.conn_local = SQL_database_manager().conn_local
+            self.conn_local = SQL_database_manager().get_connection('metadata')
 
     def __repr__(self):
         c=self.__class__
@@ -0,0 +1,85 @@
+'''
+Benchmark of the write cursor update that is executed on every flush of a running measurement.
+Compares the set-based update with the old implementation with one UPDATE per parameter.
+'''
+import time
+
+import numpy as np
+import qcodes as qc
+from psycopg2.extensions import cursor as pg_cursor
+from qcodes import ManualParameter
+
+import core_tools as ct
+from core_tools.data.measurement import Measurement
+from core_tools.data.SQL.SQL_connection_mgr import SQL_database_manager
+from core_tools.data.SQL.SQL_common_commands import execute_statement
+from core_tools.data.SQL.SQL_dataset_creator import SQL_dataset_creator
+
+
+class counting_cursor(pg_cursor):
+    n_execute = 0
+
+    def execute(self, query, vars=None):
+        counting_cursor.n_execute += 1
+        return super().execute(query, vars)
+
+
+def update_write_cursors_old(conn, ds_raw):
+    statement = ""
+    for index, item in enumerate(ds_raw.measurement_parameters_raw):
+        statement += (
+                "UPDATE measurement_parameters "
+                f"SET write_cursor = {item.data_buffer.cursor_db} "
+                f"WHERE exp_uuid = {ds_raw.exp_uuid} AND param_index = {index}; ")
+    execute_statement(conn, statement)
+    execute_statement(conn,
+                      "UPDATE global_measurement_overview SET data_synchronized = False "
+                      f"WHERE uuid = {ds_raw.exp_uuid}")
+    conn.commit()
+
+
+def update_write_cursors_new(conn, ds_raw):
+    SQL_dataset_creator().update_write_cursors(ds_raw)
+
+
+def benchmark(name, update_function, conn, ds_raw, n_flush=200):
+    buffers = [m_param.data_buffer for m_param in ds_raw.measurement_parameters_raw]
+    conn.cursor_factory = counting_cursor
+    counting_cursor.n_execute = 0
+    t_flush = []
+    try:
+        for i in range(n_flush):
+            for buffer in buffers:
+                buffer.cursor_db = i % buffer.buffer.size
+            t_start = time.perf_counter()
+            update_function(conn, ds_raw)
+            t_flush.append(time.perf_counter() - t_start)
+    finally:
+        conn.cursor_factory = pg_cursor
+
+    t_flush = np.array(t_flush) * 1000
+    # round trips: statements + commit
+    round_trips = counting_cursor.n_execute / n_flush + 1
+    print(f'{name:<10} {len(buffers):4} parameters: {round_trips:.0f} round trips/flush, '
+          f'latency/flush mean {np.mean(t_flush):6.2f} ms, median {np.median(t_flush):6.2f} ms, '
+          f'max {np.max(t_flush):6.2f} ms')
+
+
+ct.configure('./setup_config/ct_config_measurement.yaml')
+
+station = qc.Station()
+x = ManualParameter('x', initial_value=0)
+
+for n_channels in [1, 10, 50]:
+    channels = [ManualParameter(f'ch{i}', initial_value=0) for i in range(n_channels)]
+
+    meas = Measurement('benchmark_cursor_update', silent=True)
+    meas.register_set_parameter(x, 100)
+    for ch in channels:
+        meas.register_get_parameter(ch, x)
+
+    with meas:
+        ds_raw = meas.dataset._data_set__data_set_raw
+        conn = SQL_database_manager().conn_local
+        benchmark('old', update_write_cursors_old, conn, ds_raw)
+        benchmark('set-based', update_write_cursors_new, conn, ds_raw)
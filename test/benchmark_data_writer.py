@@ -0,0 +1,46 @@
+'''
+Benchmark of write_data / DataWriter.
+Compares the bulk write of the arrays with the old implementation that adds the values one by one.
+'''
+import time
+
+import numpy as np
+import qcodes as qc
+
+import core_tools as ct
+from core_tools.data.data_writer import DataWriter, Axis, Data
+from core_tools.data.ds.data_set import load_by_uuid
+
+
+def benchmark(n, bulk):
+    x = np.linspace(-1, 1, n)
+    y = np.linspace(0, 10, n)
+    values = np.random.randn(n, n)
+    t_start = time.perf_counter()
+    ds = DataWriter(
+            'benchmark_data_writer',
+            Axis('x', 'x', 'mV', x),
+            Axis('y', 'y', 'mV', y),
+            Data('z', 'z', 'mV', values),
+            ).run(bulk=bulk)
+    t_write = time.perf_counter() - t_start
+
+    ds = load_by_uuid(ds.exp_uuid)
+    assert np.array_equal(ds.m1(), values)
+    assert np.array_equal(ds.m1.x(), x)
+    assert np.array_equal(ds.m1.y(), y)
+
+    name = 'bulk' if bulk else 'per value'
+    print(f'{name:<10} {n:5}x{n:<5}: {t_write:7.3f} s, {n*n/t_write/1e6:7.3f} M values/s')
+
+
+ct.configure('./setup_config/ct_config_measurement.yaml')
+
+station = qc.Station()
+
+for n in [100, 300]:
+    benchmark(n, bulk=False)
+    benchmark(n, bulk=True)
+
+for n in [1000, 3000]:
+    benchmark(n, bulk=True)
@@ -0,0 +1,40 @@
+'''
+Benchmark of the construction of a dataset with many parameters,
+e.g. a multi-channel single-shot measurement.
+'''
+import time
+
+import numpy as np
+import qcodes as qc
+from qcodes import ManualParameter
+
+import core_tools as ct
+from core_tools.data.measurement import Measurement
+from core_tools.data.ds.data_set import load_by_uuid
+
+
+n_channels = 600
+
+ct.configure('./setup_config/ct_config_measurement.yaml')
+
+station = qc.Station()
+shot = ManualParameter('shot', initial_value=0)
+channels = [ManualParameter(f'ch{i}', initial_value=0) for i in range(n_channels)]
+
+meas = Measurement('benchmark_dataset_construction', silent=True)
+meas.register_set_parameter(shot, 10)
+for ch in channels:
+    meas.register_get_parameter(ch, shot)
+with meas:
+    for i in range(10):
+        meas.add_result((shot, i), *[(ch, np.random.rand()) for ch in channels])
+exp_uuid = meas.dataset.exp_uuid
+
+t_start = time.perf_counter()
+ds = load_by_uuid(exp_uuid)
+print(f'load dataset with {n_channels} parameters {(time.perf_counter() - t_start)*1000:6.1f} ms')
+
+t_start = time.perf_counter()
+for ch in channels:
+    ds(ch.name)
+print(f'lookup of {n_channels} parameters by label {(time.perf_counter() - t_start)*1000:6.1f} ms')
@@ -0,0 +1,49 @@
+'''
+Benchmark of loading many datasets.
+Compares a loop over load_by_uuid with load_many.
+'''
+import time
+
+import numpy as np
+import qcodes as qc
+from qcodes import ManualParameter
+
+import core_tools as ct
+from core_tools.data.measurement import Measurement
+from core_tools.data.ds.data_set import load_by_uuid, load_many
+
+
+n_datasets = 500
+
+ct.configure('./setup_config/ct_config_measurement.yaml')
+
+station = qc.Station()
+x = ManualParameter('x', initial_value=0)
+channels = [ManualParameter(f'ch{i}', initial_value=0) for i in range(4)]
+
+uuids = []
+for i in range(n_datasets):
+    meas = Measurement('benchmark_load_many', silent=True)
+    meas.register_set_parameter(x, 100)
+    for ch in channels:
+        meas.register_get_parameter(ch, x)
+    with meas:
+        for j in range(100):
+            meas.add_result((x, j), *[(ch, np.random.rand()) for ch in channels])
+    uuids.append(meas.dataset.exp_uuid)
+
+
+def analyse(ds):
+    return [np.mean(ds(ch.name)()) for ch in channels]
+
+
+t_start = time.perf_counter()
+for exp_uuid in uuids:
+    analyse(load_by_uuid(exp_uuid))
+print(f'load_by_uuid loop {time.perf_counter() - t_start:6.3f} s')
+
+for n_workers in [1, 4]:
+    t_start = time.perf_counter()
+    for ds in load_many(uuids, n_workers=n_workers):
+        analyse(ds)
+    print(f'load_many (n_workers={n_workers}) {time.perf_counter() - t_start:6.3f} s')
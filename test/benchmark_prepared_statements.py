@@ -0,0 +1,135 @@
+'''
+Benchmark of the recurring queries of measurements, data loading and the data browser.
+Compares the latency of the queries composed and sent as text on every call
+with the prepared statements.
+'''
+import itertools
+import time
+
+import numpy as np
+import qcodes as qc
+from psycopg2 import sql
+from qcodes import ManualParameter
+
+import core_tools as ct
+from core_tools.data.measurement import Measurement
+from core_tools.data.SQL.SQL_connection_mgr import SQL_database_manager
+from core_tools.data.SQL.SQL_common_commands import (
+        execute_statement, execute_query, select_elements_in_table, update_table)
+from core_tools.data.SQL.queries.dataset_creation_queries import (
+        measurement_overview_queries, measurement_parameters_queries)
+from core_tools.data.SQL.queries.dataset_loading_queries import load_ds_queries
+from core_tools.data.SQL.queries.dataset_gui_queries import query_for_measurement_results
+
+
+var_names = ("param_id", "nth_set", "nth_dim", "param_id_m_param",
+             "setpoint", "setpoint_local", "name_gobal", "name", "label",
+             "unit", "depencies", "shape", "total_size", "oid", "dtype", "chunk_size")
+
+
+def update_cursors_old(conn, exp_uuid, cursors):
+    cursors = ", ".join(f"({index},{cursor})" for index, cursor in enumerate(cursors))
+    statement = (
+            "UPDATE measurement_parameters AS p "
+            "SET write_cursor = c.write_cursor "
+            f"FROM (VALUES {cursors}) AS c(param_index, write_cursor) "
+            f"WHERE p.exp_uuid = {exp_uuid} AND p.param_index = c.param_index "
+            "AND p.write_cursor IS DISTINCT FROM c.write_cursor; "
+            "UPDATE global_measurement_overview SET data_synchronized = False "
+            f"WHERE uuid = {exp_uuid} AND data_synchronized IS NOT False; ")
+    execute_statement(conn, statement)
+
+
+def update_overview_old(conn, exp_uuid):
+    update_table(conn, 'global_measurement_overview',
+                 ['stop_time', 'data_size', 'data_synchronized', 'table_synchronized'],
+                 [sql.SQL("TO_TIMESTAMP({})").format(sql.Literal(time.time())), 1000, 'False', 'False'],
+                 ('uuid', exp_uuid))
+
+
+def is_completed_old(conn, exp_uuid):
+    return execute_query(conn, f"SELECT completed FROM global_measurement_overview where uuid = {exp_uuid};")
+
+
+def id_to_uuid_old(conn, exp_id):
+    return execute_query(conn, f"SELECT id, uuid FROM global_measurement_overview WHERE id = {exp_id};")
+
+
+def max_id_old(conn, max_id, project, set_up, sample):
+    return execute_query(conn,
+        "SELECT max(id) from global_measurement_overview "
+        f"WHERE id >= {max_id} AND sample = '{sample}' AND set_up = '{set_up}' AND project = '{project}' ;")
+
+
+def parameters_old(conn, exp_uuid):
+    return select_elements_in_table(conn, 'measurement_parameters', var_names,
+                                    where=("exp_uuid", exp_uuid),
+                                    order_by=("param_index", "ASC"),
+                                    dict_cursor=False)
+
+
+def benchmark(name, function, conn, n_calls=500):
+    t_call = []
+    for i in range(n_calls):
+        t_start = time.perf_counter()
+        function()
+        t_call.append(time.perf_counter() - t_start)
+        conn.commit()
+    t_call = np.array(t_call) * 1000
+    print(f'{name:<28} latency/call mean {np.mean(t_call):6.3f} ms, median {np.median(t_call):6.3f} ms')
+
+
+ct.configure('./setup_config/ct_config_measurement.yaml')
+
+station = qc.Station()
+x = ManualParameter('x', initial_value=0)
+channels = [ManualParameter(f'ch{i}', initial_value=0) for i in range(10)]
+
+meas = Measurement('benchmark_prepared_statements', silent=True)
+meas.register_set_parameter(x, 100)
+for ch in channels:
+    meas.register_get_parameter(ch, x)
+
+with meas:
+    ds_raw = meas.dataset._data_set__data_set_raw
+    exp_uuid = ds_raw.exp_uuid
+    exp_id = ds_raw.exp_id
+    n_params = len(ds_raw.measurement_parameters_raw)
+    # the cursors change on every flush
+    cursor_values = itertools.count()
+    conn = SQL_database_manager().conn_local
+    reader = SQL_database_manager().get_connection('reader')
+    gui_filter = (ds_raw.project, ds_raw.set_up, ds_raw.sample)
+
+    cases = [
+        ('cursor update',
+         lambda: update_cursors_old(conn, exp_uuid, [next(cursor_values)]*n_params),
+         lambda: measurement_parameters_queries.update_cursors(
+                conn, exp_uuid, [next(cursor_values)]*n_params, True),
+         conn),
+        ('overview update',
+         lambda: update_overview_old(conn, exp_uuid),
+         lambda: measurement_overview_queries.update_measurement(
+                conn, exp_uuid, stop_time=time.time(), data_size=1000,
+                data_synchronized=False, table_synchronized=False),
+         conn),
+        ('is_completed',
+         lambda: is_completed_old(reader, exp_uuid),
+         lambda: measurement_overview_queries.is_completed(reader, exp_uuid),
+         reader),
+        ('id_to_uuid',
+         lambda: id_to_uuid_old(reader, exp_id),
+         lambda: load_ds_queries.id_to_uuid(reader, exp_id),
+         reader),
+        ('max(id) polling',
+         lambda: max_id_old(reader, exp_id, *gui_filter),
+         lambda: query_for_measurement_results.detect_new_meaurements(exp_id, False, *gui_filter),
+         reader),
+        ('parameter rows',
+         lambda: parameters_old(reader, exp_uuid),
+         lambda: load_ds_queries.get_parameter_rows(reader, exp_uuid, var_names),
+         reader),
+        ]
+    for name, function_old, function_new, connection in cases:
+        benchmark(f'{name} (text)', function_old, connection)
+        benchmark(f'{name} (prepared)', function_new, connection)
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from core_tools.data.ds.async_writer import async_writer
+
+
+class fake_buffers:
+    '''
+    Counts the values added and written. The flush can be blocked with an event.
+    '''
+    def __init__(self, exception=None):
+        self.pending = 0
+        self.n_flushes = 0
+        self.exception = exception
+        self.release = threading.Event()
+        self.release.set()
+
+    def add(self, n):
+        self.pending += n
+
+    def flush(self):
+        self.release.wait()
+        self.n_flushes += 1
+        if self.exception is not None:
+            raise self.exception
+        self.pending = 0
+
+    def pending_points(self):
+        return self.pending
+
+
+def _create_writer(buffers, max_pending=None):
+    # long flush interval: only flush on request or stop.
+    return async_writer('test_writer', buffers.flush, lambda: 10.0, buffers.pending_points,
+                        max_pending=max_pending)
+
+
+def test_backpressure_blocks_at_max_pending():
+    buffers = fake_buffers()
+    writer = _create_writer(buffers, max_pending=100)
+    buffers.add(100)
+    # not above max_pending: does not block and does not flush.
+    writer.data_added()
+    assert buffers.n_flushes == 0
+
+    buffers.release.clear()
+    buffers.add(1)
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (writer.data_added(), done.set()))
+    thread.start()
+    assert not done.wait(0.3)
+
+    buffers.release.set()
+    assert done.wait(5.0)
+    thread.join()
+    assert buffers.pending == 0
+    assert buffers.n_flushes == 1
+    writer.stop()
+
+
+def test_exception_raised_in_data_added():
+    buffers = fake_buffers(exception=ValueError('flush failed'))
+    writer = _create_writer(buffers, max_pending=10)
+    buffers.add(20)
+    with pytest.raises(Exception) as exc_info:
+        writer.data_added()
+    assert isinstance(exc_info.value.__cause__, ValueError)
+    # the exception is raised again on every call.
+    with pytest.raises(Exception):
+        writer.data_added()
+    with pytest.raises(Exception):
+        writer.stop()
+
+
+def test_exception_raised_in_stop():
+    buffers = fake_buffers(exception=ValueError('flush failed'))
+    writer = _create_writer(buffers)
+    buffers.add(5)
+    with pytest.raises(Exception) as exc_info:
+        writer.stop()
+    assert isinstance(exc_info.value.__cause__, ValueError)
+    assert not writer._thread.is_alive()
+
+
+def test_stop_flushes_remaining_data():
+    buffers = fake_buffers()
+    writer = _create_writer(buffers)
+    buffers.add(5)
+    writer.data_added()
+    time.sleep(0.1)
+    assert buffers.n_flushes == 0
+    writer.stop()
+    assert buffers.pending == 0
+    assert buffers.n_flushes == 1
+    assert not writer._thread.is_alive()
@@ -0,0 +1,96 @@
+import random
+import types
+
+import pytest
+
+import core_tools.data.ds.flush_policy as flush_policy_module
+from core_tools.data.ds.flush_policy import (
+        adaptive_flush_policy, fixed_flush_policy, flush_policy, get_flush_policy)
+
+
+class fake_clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = fake_clock()
+    monkeypatch.setattr(flush_policy_module, 'time', types.SimpleNamespace(perf_counter=clock.perf_counter))
+    return clock
+
+
+def _flush(policy, clock, duration, n_bytes):
+    # the next flush starts after the current interval.
+    clock.now += policy.interval() + duration
+    policy.flush_done(duration, n_bytes)
+    return policy.interval()
+
+
+def test_interval_bounded(clock):
+    random.seed(1)
+    policy = adaptive_flush_policy(min_interval=0.25, max_staleness=2.0, max_load=0.05,
+                                   max_flush_size=10_000)
+    assert policy.interval() == 0.25
+    for _ in range(500):
+        duration = random.choice([0.0, 1e-4, 0.01, 0.1, 1.0, 10.0])
+        n_bytes = random.choice([0, 100, 10_000, 10**6, 10**9])
+        interval = _flush(policy, clock, duration, n_bytes)
+        assert 0.25 <= interval <= 2.0
+        assert policy.statistics.interval == interval
+
+
+def test_interval_grows_with_latency(clock):
+    policy = adaptive_flush_policy(min_interval=0.25, max_staleness=2.0, max_load=0.05)
+    for _ in range(20):
+        interval = _flush(policy, clock, 0.001, 1000)
+    assert interval == 0.25
+
+    intervals = [_flush(policy, clock, 0.04, 1000) for _ in range(20)]
+    assert intervals == sorted(intervals)
+    assert intervals[-1] > 0.25
+    # latency / max_load = 0.8 s
+    assert intervals[-1] == pytest.approx(0.8, rel=0.05)
+
+    for _ in range(20):
+        interval = _flush(policy, clock, 1.0, 1000)
+    assert interval == 2.0
+
+
+def test_interval_shrinks_above_max_flush_size(clock):
+    policy = adaptive_flush_policy(min_interval=0.1, max_staleness=10.0, max_load=0.05,
+                                   max_flush_size=1_000_000)
+    for _ in range(20):
+        interval = _flush(policy, clock, 0.1, 1000)
+    # limited by latency: 0.1 / 0.05 = 2.0 s
+    assert interval == pytest.approx(2.0, rel=0.05)
+
+    intervals = [_flush(policy, clock, 0.1, 4_000_000) for _ in range(20)]
+    assert intervals[-1] < interval
+    assert all(0.1 <= value <= 10.0 for value in intervals)
+    assert intervals[-1] == pytest.approx(0.1)
+
+
+def test_fixed_flush_policy():
+    policy = fixed_flush_policy(0.5)
+    policy.flush_done(0.1, 1000)
+    assert policy.interval() == 0.5
+    assert policy.statistics.n_flushes == 1
+    assert policy.statistics.last_bytes == 1000
+
+
+def test_get_flush_policy():
+    assert isinstance(get_flush_policy(), adaptive_flush_policy)
+    assert isinstance(get_flush_policy('fixed'), fixed_flush_policy)
+    policy = fixed_flush_policy(1.0)
+    assert get_flush_policy(policy) is policy
+    with pytest.raises(ValueError):
+        get_flush_policy('unknown')
+
+
+def test_flush_policy_is_abstract():
+    with pytest.raises(TypeError):
+        flush_policy()
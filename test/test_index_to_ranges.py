@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from core_tools.data.SQL.buffer_writer import index_to_ranges
+
+
+def _select(data, ranges, shape):
+    flat = data.ravel()
+    values = [flat[start:stop] for start, stop in ranges]
+    return np.concatenate(values + [flat[:0]]).reshape(shape)
+
+
+@pytest.mark.parametrize('index', [
+    np.s_[5:3],
+    np.s_[3:3],
+    np.s_[:, 7:2],
+    np.s_[2, 4:4],
+    np.s_[5:3:-1],
+    np.s_[3:5:-1],
+    np.s_[8:2:-2],
+    np.s_[2:8:3, 5],
+    np.s_[1:4],
+    np.s_[:, 1:4],
+    np.s_[-1],
+    np.s_[:],
+    ])
+def test_index_to_ranges(index):
+    shape = (10, 10)
+    data = np.arange(100).reshape(shape)
+    ranges, out_shape = index_to_ranges(shape, index)
+    expected = data[index]
+    assert out_shape == expected.shape
+    assert all(start < stop for start, stop in ranges)
+    np.testing.assert_array_equal(_select(data, ranges, out_shape), expected)
+
+
+def test_empty_slice():
+    assert index_to_ranges((10, 10), (slice(5, 3),)) == ([], (0, 10))
+    assert index_to_ranges((10, 10), (slice(None), slice(5, 3))) == ([], (10, 0))
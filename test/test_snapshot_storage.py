@@ -0,0 +1,118 @@
+import copy
+import json
+
+import pytest
+
+from core_tools.data.SQL.snapshot_storage import (
+        json_diff, json_patch, set_snapshot_storage, stored_snapshot, zstandard)
+
+
+@pytest.fixture(autouse=True)
+def default_storage():
+    yield
+    set_snapshot_storage()
+
+
+def _round_trip(base, new):
+    patch = json_diff(base, new)
+    # the patch must be JSON serializable.
+    patch = json.loads(json.dumps(patch))
+    return json_patch(copy.deepcopy(base), patch)
+
+
+@pytest.mark.parametrize('base, new', [
+    ({}, {}),
+    ({'a': 1}, {'a': 1}),
+    ({'a': 1}, {'a': 2}),
+    ({'a': 1, 'b': 2}, {'a': 1}),
+    ({'a': 1}, {'a': 1, 'b': {'c': [1, 2]}}),
+    ({'a': {'b': {'c': 1, 'd': 2}}}, {'a': {'b': {'c': 3}, 'e': 4}}),
+    ({'a': [1, 2, 3]}, {'a': [1, 2]}),
+    ({'a': [1, 2]}, {'a': [1, 2, 3, 4]}),
+    ({'a': None}, {'a': 1}),
+    ({'a': 1}, {'a': None}),
+    ({'a': None, 'b': {'c': None}}, {'a': None, 'b': None}),
+    ({'a': {'b': 1}}, {'a': 5}),
+    ({'a': 1}, {'a': 1.0}),
+    ({'a': True}, {'a': 1}),
+    ({'a/b': 1, 'c~d': 2}, {'a/b': 2, 'c~d': {'x': 1}}),
+    ({'a': 1}, None),
+    (None, {'a': 1}),
+    ([1, 2], [3]),
+    ])
+def test_json_patch_round_trip(base, new):
+    result = _round_trip(base, new)
+    assert result == new
+    assert json.dumps(result) == json.dumps(new)
+
+
+def test_json_diff_unchanged():
+    base = {'a': {'b': [1, 2], 'c': None}}
+    assert json_diff(base, copy.deepcopy(base)) == []
+
+
+def _station(value):
+    return {
+        'instruments': {
+            f'dac{i}': {'parameters': {f'p{j}': {'value': j*0.1, 'unit': 'mV', 'label': f'gate {j}'}
+                                       for j in range(50)}}
+            for i in range(4)},
+        'parameters': {'x': {'value': value, 'unit': None}},
+        }
+
+
+def _encode(station, measurement):
+    return stored_snapshot.encode(json.dumps(station).encode('ascii'),
+                                  json.dumps(measurement).encode('ascii'))
+
+
+compressions = [None, 'zlib',
+                pytest.param('zstd', marks=pytest.mark.skipif(zstandard is None,
+                                                              reason='zstandard not installed'))]
+
+
+@pytest.mark.parametrize('compression', compressions)
+@pytest.mark.parametrize('deduplicate', [False, True])
+def test_encode_decode_full(compression, deduplicate):
+    set_snapshot_storage(compression, deduplicate=deduplicate)
+    station = _station(1.0)
+    measurement = {'x': {'label': 'x'}}
+    snapshot = _encode(station, measurement)
+    assert snapshot.data_format == compression
+    assert snapshot.base_hash is None
+    assert (snapshot.station_hash is not None) == deduplicate
+    assert snapshot.decode() == {'station': station, 'measurement': measurement}
+
+
+@pytest.mark.parametrize('compression', compressions)
+def test_encode_decode_delta(compression):
+    set_snapshot_storage(compression, delta=True)
+    measurement = {'x': {'label': 'x'}}
+    full = _encode(_station(1.0), measurement)
+    assert full.base_hash is None
+
+    station = _station(2.0)
+    del station['instruments']['dac3']['parameters']['p7']
+    station['instruments']['dac1']['parameters']['p3']['value'] = None
+    delta = _encode(station, measurement)
+    assert delta.base_hash == full.station_hash
+    assert delta.station_hash != full.station_hash
+    assert delta.station_format == compression
+    assert delta.decode() == {'station': station, 'measurement': measurement}
+    # the base is not modified by applying the patch.
+    assert delta.decode() == {'station': station, 'measurement': measurement}
+
+    # identical station snapshot is stored as the same full snapshot.
+    same = _encode(_station(1.0), measurement)
+    assert same.station_hash == full.station_hash
+    assert same.base_hash is None
+
+
+def test_stored_snapshot_json():
+    set_snapshot_storage('zlib', delta=True)
+    _encode(_station(1.0), {})
+    snapshot = _encode(_station(2.0), {})
+    assert snapshot.base_data is not None
+    copied = stored_snapshot.from_json(snapshot.to_json())
+    assert copied == snapshot
+    assert copied.decode() == snapshot.decode()